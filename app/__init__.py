@@ -1,5 +1,5 @@
 from flask import Flask
-from app.extensions import ma, limiter, cache
+from app.extensions import ma, limiter, cache, migrate
 from app.models import db
 from app.blueprints.customers import customers_bp
 from app.blueprints.mechanics import mechanics_bp
@@ -7,6 +7,14 @@ from app.blueprints.service_tickets import service_tickets_bp
 from flask_swagger_ui import get_swaggerui_blueprint
 from app.blueprints.part_descriptions import part_descriptions_bp
 from app.blueprints.serialized_parts import serialized_parts_bp
+from app.util.instrumentation import init_instrumentation
+from app.util.engine import init_engine_profile
+from app.util.serialization import init_json_provider
+from app.util.rollups import rebuild_ticket_counts_command, rebuild_stock_counts_command
+from app.util.sqlite_cache import cache_stats_command
+from app.util.search import rebuild_search_index_command, include_in_migrations, init_search_indexes
+from app.util.seed import seed_command
+from app.util.audit import db_audit_command
 
 SWAGGER_URL = '/api/docs' # sets endpoint for docs
 API_URL = '/static/swagger.yaml' # grabs the host url from swagger file
@@ -30,8 +38,29 @@ def create_app(config_name):
     db.init_app(app)
     limiter.init_app(app)
     cache.init_app(app)
+    # batch mode, SQLite can't ALTER most things in place
+    migrate.init_app(app, db, render_as_batch=True, include_name=include_in_migrations)
 
+    # per-config SQLite pragmas (WAL etc.), pooling comes from SQLALCHEMY_ENGINE_OPTIONS
+    init_engine_profile(app, db)
 
+    # full-text indexes missing from a database made before them
+    init_search_indexes(app, db)
+
+    # orjson for JSON responses when installed, same bytes as Flask's own encoder
+    init_json_provider(app)
+
+    # opt-in per-request query/serialization timing (Server-Timing header)
+    if app.config.get('SERVER_TIMING'):
+        init_instrumentation(app, db, cache)
+
+    # register cli commands
+    app.cli.add_command(rebuild_ticket_counts_command)
+    app.cli.add_command(rebuild_stock_counts_command)
+    app.cli.add_command(cache_stats_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(db_audit_command)
 
     # register blueprints
     app.register_blueprint(customers_bp, url_prefix='/customers')
@@ -0,0 +1,109 @@
+import asyncio
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, request
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from app.util.async_db import async_views, create_async_engine_for, create_async_sessionmaker
+
+
+def scope_environ(scope):
+    # enough of a WSGI environ for Flask to build a request context and match routes
+    headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+    host = headers.get('Host') or '{}:{}'.format(*(scope.get('server') or ('localhost', 80)))
+    client = scope.get('client') or ('127.0.0.1', 0)
+    return EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}",
+        query_string=scope['query_string'].decode('latin-1'),
+        method=scope['method'],
+        headers=headers,
+        environ_overrides={'REMOTE_ADDR': client[0]},
+    ).get_environ()
+
+
+class AsyncReadApp:
+    """ASGI app serving the hot GET routes on SQLAlchemy's asyncio engine.
+
+    Requests whose Flask endpoint has an async view (see async_view) run on the
+    event loop, so one process holds many in-flight reads while they wait on the
+    database. Everything else, writes included, goes to the Flask app unchanged.
+    Async views still run inside a Flask request context with the app's
+    before/after request hooks, so rate limits, caching, ETags and Server-Timing
+    behave as they do under WSGI. The hooks, like the cache lookups in
+    conditional_get and cached_entity, make blocking calls (the SQLite cache and
+    limiter storages wait on file locks), so they run in worker threads rather
+    than on the event loop.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = create_async_engine_for(flask_app)
+        self.sessionmaker = create_async_sessionmaker(self.engine)
+
+        # Server-Timing query counts, when init_instrumentation is on for the app
+        instrument_engine = flask_app.extensions.get('request_timing')
+        if instrument_engine is not None:
+            instrument_engine(self.engine.sync_engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            environ = scope_environ(scope)
+            view = self.match(environ)
+            if view is not None:
+                response = await self.dispatch(view, environ)
+                if response is not None:
+                    return await self.send_response(response, send, head=scope['method'] == 'HEAD')
+
+        return await self.wsgi(scope, receive, send)
+
+    def match(self, environ):
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            # 404s, 405s and slash redirects are Flask's to answer
+            return None
+        return async_views.get(endpoint)
+
+    async def dispatch(self, view, environ):
+        app = self.flask_app
+        view, unless = view
+
+        async with self.sessionmaker() as session:
+            with app.request_context(environ):
+                if unless is not None and unless():
+                    return None
+
+                g.async_session = session
+                try:
+                    try:
+                        rv = await asyncio.to_thread(app.preprocess_request)
+                        if rv is None:
+                            rv = await view(**request.view_args)
+                    except Exception as e:
+                        rv = app.handle_user_exception(e)
+                    return await asyncio.to_thread(app.finalize_request, rv)
+                except Exception as e:
+                    return app.handle_exception(e)
+
+    async def send_response(self, response, send, head=False):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': b'' if head else response.get_data()})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 customers_bp = Blueprint("customers_bp", __name__)
 
-from . import routes
\ No newline at end of file
+from . import routes, async_routes
\ No newline at end of file
@@ -0,0 +1,77 @@
+from flask import request, jsonify
+from sqlalchemy import select
+from app.models import Customer
+from .schemas import customer_schema, customers_schema, customer_load_options
+from .routes import customer_search_query
+from . import customers_bp
+from app.util.async_db import async_view, async_session
+from app.util.pagination import (
+    keyset_page_query,
+    keyset_page,
+    offset_page_query,
+    offset_page,
+    paginated_response,
+    add_next_page_headers,
+    PaginationError,
+)
+from app.util.streaming import get_stream_format
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.search import MIN_SEARCH_LENGTH
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+
+# ----- Async Customer Routes (ASGI read path, see app/asgi.py) -----
+# Get all customers
+@async_view(customers_bp, 'get_customers', unless=get_stream_format)
+@conditional_get('customer')
+async def get_customers():
+    try:
+        schema, load_options = sparse_fieldset(customers_schema, customer_load_options)
+        query, per_page = keyset_page_query(select(Customer).options(*load_options), Customer.id)
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    customers, next_cursor = keyset_page((await async_session().scalars(query)).all(), Customer.id, per_page)
+
+    if customers:
+        return paginated_response(schema, customers, next_cursor), 200
+    return jsonify({"error": "No customers found"}), 404
+
+# Get a customer
+@async_view(customers_bp, 'get_customer')
+@conditional_get('customer')
+@cached_entity('customer')
+async def get_customer(customer_id):
+    try:
+        schema, load_options = sparse_fieldset(customer_schema, customer_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    customer = await async_session().get(Customer, customer_id, options=load_options)
+
+    if customer:
+        return schema.jsonify(customer), 200
+
+    return jsonify({"error": "Invalid customer ID"}), 400
+
+# Search customers by part of their name, email or phone
+@async_view(customers_bp, 'search_customer')
+async def search_customer():
+    term = (request.args.get('q') or request.args.get('email') or '').strip()
+    try:
+        schema, load_options = sparse_fieldset(customers_schema, customer_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(term) < MIN_SEARCH_LENGTH:
+        return schema.jsonify([]), 200
+
+    session = async_session()
+    try:
+        query, page, per_page = offset_page_query(customer_search_query(term, session, load_options))
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    customers, next_page = offset_page((await session.scalars(query)).all(), page, per_page)
+
+    return add_next_page_headers(schema.jsonify(customers), next_page), 200
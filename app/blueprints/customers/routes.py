@@ -1,10 +1,25 @@
-from flask import Flask, request, jsonify
-from sqlalchemy import select
+from flask import Flask, request, jsonify, current_app
+from sqlalchemy import select, func, or_
 from marshmallow import ValidationError
-from app.models import Customer, db
-from .schemas import customer_schema, customers_schema  
+from app.models import Customer, CustomerTicketCount, ServiceTicket, db
+from .schemas import customer_schema, customers_schema, customer_load_options
 from . import customers_bp
 from app.extensions import limiter, cache
+from app.util.pagination import (
+    keyset_paginate,
+    offset_paginate,
+    add_next_page_headers,
+    paginated_response,
+    add_pagination_headers,
+    get_per_page,
+    encode_cursor,
+    decode_cursor_keys,
+    PaginationError,
+)
+from app.util.streaming import get_stream_format, stream_collection
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.search import customer_search_index, fts_phrase, MIN_SEARCH_LENGTH
+from app.util.fieldsets import sparse_fieldset, FieldsetError
 
 
 # ----- Customer Routes -----
@@ -34,30 +49,43 @@ def create_customer():
 # Get all customers
 @customers_bp.route("/", methods=["GET"])
 @limiter.exempt
+@conditional_get('customer')
 def get_customers():
     try:
-        page = int(request.args.get('page'))
-        per_page = int(request.args.get('per_page'))
-        query = select(Customer)
-        customers = db.paginate(query, page=page, per_page=per_page)
-        return customers_schema.jsonify(customers), 200
-    except:
-        query = select(Customer)
-    customers = db.session.execute(query).scalars().all()
+        schema, load_options = sparse_fieldset(customers_schema, customer_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(Customer).options(*load_options)
+
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_collection(query, Customer.id, schema, stream_format)
+
+    try:
+        customers, next_cursor = keyset_paginate(query, Customer.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
     if customers:
-        return customers_schema.jsonify(customers), 200
+        return paginated_response(schema, customers, next_cursor), 200
     return jsonify({"error": "No customers found"}), 404
 
 # Get a customer
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
 @limiter.exempt
-@cache.cached(timeout=30)
+@conditional_get('customer')
+@cached_entity('customer')
 def get_customer(customer_id):
-    customer = db.session.get(Customer, customer_id)
+    try:
+        schema, load_options = sparse_fieldset(customer_schema, customer_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    customer = db.session.get(Customer, customer_id, options=load_options)
 
     if customer:
-        return customer_schema.jsonify(customer), 200
+        return schema.jsonify(customer), 200
     
     return jsonify({"error": "Invalid customer ID"}), 400
 
@@ -106,27 +134,76 @@ def delete_customer(customer_id):
 # Path query to find most valuable customer
 @customers_bp.route('/most-valuable', methods=['GET'])
 def get_most_valuable():
-    # return list of customers with the most service tickets
-
-    query = select(Customer)
-    customers = db.session.execute(query).scalars().all()
-
-    customers.sort(key=lambda customer: len(customer.tickets),reverse=True)
-
-    return customers_schema.jsonify(customers), 200  
-
-# Query parameter to search customer by email
+    # return customers ranked by number of service tickets, counted by the database
+    try:
+        schema, load_options = sparse_fieldset(customers_schema, customer_load_options)
+        limit = get_per_page('limit', default=10)
+        after = request.args.get('after')
+        last_id, last_count = decode_cursor_keys(after, 'count') if after else (None, None)
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_rollup = current_app.config.get('CUSTOMER_TICKET_ROLLUP', False)
+    if use_rollup:
+        # precomputed counts, the read walks ix_customer_ticket_counts_rank
+        ticket_count = CustomerTicketCount.ticket_count
+        customer_id = CustomerTicketCount.customer_id
+        query = select(Customer, ticket_count).join(CustomerTicketCount).where(ticket_count > 0)
+    else:
+        ticket_count = func.count(ServiceTicket.id).label('ticket_count')
+        customer_id = Customer.id
+        query = select(Customer, ticket_count).join(Customer.tickets).group_by(Customer.id)
+
+    if after:
+        keyset = (ticket_count < last_count) | ((ticket_count == last_count) & (customer_id < last_id))
+        query = query.where(keyset) if use_rollup else query.having(keyset)
+
+    query = (
+        query.order_by(ticket_count.desc(), customer_id.desc())
+        .limit(limit + 1)
+        .options(*load_options)
+    )
+    rows = db.session.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0].id, count=rows[-1][1])
+
+    customers = schema.dump([customer for customer, _ in rows])
+    for customer, (_, count) in zip(customers, rows):
+        customer['ticket_count'] = count
+
+    return add_pagination_headers(jsonify(customers), next_cursor), 200
+
+# Search customers by part of their name, email or phone
 @customers_bp.route('/search', methods=['GET'])
 def search_customer():
-    email = request.args.get('email')
+    # ?email= was the original parameter, kept for existing clients
+    term = (request.args.get('q') or request.args.get('email') or '').strip()
+    try:
+        schema, load_options = sparse_fieldset(customers_schema, customer_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
 
-    #* search for exact email
-    # query = select(Customer).where(Customer.email == email)
-    #* search for part of email
-    query = select(Customer).where(Customer.email.like(f"%{email}%"))
-    customer = db.session.execute(query).scalars().first()
+    if len(term) < MIN_SEARCH_LENGTH:
+        return schema.jsonify([]), 200
+
+    try:
+        customers, next_page = offset_paginate(customer_search_query(term, db.session, load_options))
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return customer_schema.jsonify(customer), 200 
+    return add_next_page_headers(schema.jsonify(customers), next_page), 200
 
 
+def customer_search_query(term, session, load_options=customer_load_options):
+    query = select(Customer).options(*load_options)
+    if customer_search_index.is_supported(session):
+        # name matches rank above email, email above phone
+        return customer_search_index.match(query, fts_phrase(term), weights=(10.0, 5.0, 2.0))
 
+    pattern = f"%{term}%"
+    return query.where(or_(
+        Customer.name.ilike(pattern), Customer.email.ilike(pattern), Customer.phone.ilike(pattern)
+    )).order_by(Customer.id)
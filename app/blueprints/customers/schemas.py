@@ -1,12 +1,16 @@
-from app.extensions import ma
-from app.models import Customer
+from sqlalchemy.orm import selectinload, raiseload
+from app.extensions import BaseSchema
+from app.models import Customer, ServiceTicket
 
 # Customer Schema
-class CustomerSchema(ma.SQLAlchemyAutoSchema):
+class CustomerSchema(BaseSchema):
     class Meta:
         model = Customer
         include_relationships = True
 
 
 customer_schema = CustomerSchema()
-customers_schema = CustomerSchema(many=True)
\ No newline at end of file
+customers_schema = CustomerSchema(many=True)
+
+# Loader options matching what CustomerSchema dumps: ticket ids and nothing else
+customer_load_options = (selectinload(Customer.tickets).load_only(ServiceTicket.id), raiseload('*'))
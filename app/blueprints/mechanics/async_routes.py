@@ -0,0 +1,45 @@
+from flask import jsonify
+from sqlalchemy import select
+from app.models import Mechanic
+from .schemas import mechanic_schema, mechanics_schema, mechanic_load_options
+from . import mechanics_bp
+from app.util.async_db import async_view, async_session
+from app.util.pagination import keyset_page_query, keyset_page, paginated_response, PaginationError
+from app.util.streaming import get_stream_format
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+
+# ----- Async Mechanic Routes (ASGI read path, see app/asgi.py) -----
+# Get all mechanics
+@async_view(mechanics_bp, 'get_mechanics', unless=get_stream_format)
+@conditional_get('mechanic')
+async def get_mechanics():
+    try:
+        schema, load_options = sparse_fieldset(mechanics_schema, mechanic_load_options)
+        query, per_page = keyset_page_query(select(Mechanic).options(*load_options), Mechanic.id)
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    mechanics, next_cursor = keyset_page((await async_session().scalars(query)).all(), Mechanic.id, per_page)
+
+    if mechanics:
+        return paginated_response(schema, mechanics, next_cursor), 200
+    return jsonify({"error": "No mechanics found"}), 404
+
+# Get a mechanic
+@async_view(mechanics_bp, 'get_mechanic')
+@conditional_get('mechanic')
+@cached_entity('mechanic')
+async def get_mechanic(mechanic_id):
+    try:
+        schema, load_options = sparse_fieldset(mechanic_schema, mechanic_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mechanic = await async_session().get(Mechanic, mechanic_id, options=load_options)
+
+    if mechanic:
+        return schema.jsonify(mechanic), 200
+
+    return jsonify({"error": "Invalid mechanic ID"}), 400
@@ -1,15 +1,30 @@
+from datetime import date
 from flask import Flask, request, jsonify
-from sqlalchemy import select
+from sqlalchemy import select, func, literal
 from marshmallow import ValidationError
-from .schemas import mechanic_schema, mechanics_schema, login_schema
+from .schemas import mechanic_schema, mechanics_schema, login_schema, mechanic_load_options
 from . import mechanics_bp
-from app.models import Mechanic, db
+from app.models import Mechanic, ServiceTicket, SerializedPart, PartDescription, db, service_mechanic
 from app.extensions import limiter, cache
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.util.pagination import (
+    keyset_paginate,
+    offset_paginate,
+    paginated_response,
+    add_next_page_headers,
+    PaginationError,
+)
+from app.util.streaming import get_stream_format, stream_collection
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+from app.util.billing import labor_rate
+from app.util.passwords import password_hasher, PasswordHasherBusy
 from app.util.auth import encode_token
 from jose import jwt
 from app.util.auth import token_required
 
+LEADERBOARD_CACHE_TIMEOUT = 60
+LEADERBOARD_SORTS = ('revenue', 'tickets', 'parts')
+
 
 # ----- Mechanic Routes -----
 # Login Route
@@ -23,7 +38,19 @@ def login_mechanic():
     query = select(Mechanic).where(Mechanic.email == creds["email"])
     mechanic = db.session.execute(query).scalars().first()
 
-    if mechanic and check_password_hash(mechanic.password, creds["password"]):
+    valid = False
+    if mechanic:
+        try:
+            valid, new_hash = password_hasher.verify(mechanic.password, creds["password"])
+        except PasswordHasherBusy as e:
+            return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+
+    if valid:
+        # hashed with an older PASSWORD_HASH_METHOD, store it at the current cost
+        if new_hash:
+            mechanic.password = new_hash
+            db.session.commit()
+
         # grant  and return a token
         token = encode_token(mechanic.id, role='mechanic')
         return jsonify({
@@ -50,7 +77,10 @@ def create_mechanic():
     if mechanic:
         return jsonify({"error": "Email already taken"}), 400
     
-    mechanic_data['password'] = generate_password_hash(mechanic_data['password'])
+    try:
+        mechanic_data['password'] = password_hasher.hash(mechanic_data['password'])
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
 
     new_mechanic = Mechanic(**mechanic_data)
     db.session.add(new_mechanic)
@@ -60,30 +90,118 @@ def create_mechanic():
 
 # Get all mechanics
 @mechanics_bp.route("/", methods=["GET"])
+@conditional_get('mechanic')
 def get_mechanics():
     try:
-        page = int(request.args.get('page'))
-        per_page = int(request.args.get('per_page'))
-        query = select(Mechanic)
-        mechanics = db.paginate(query, page=page, per_page=per_page)
-        return mechanics_schema.jsonify(mechanics), 200
-    except:
-        query = select(Mechanic)
-    mechanics = db.session.execute(query).scalars().all()
+        schema, load_options = sparse_fieldset(mechanics_schema, mechanic_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(Mechanic).options(*load_options)
+
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_collection(query, Mechanic.id, schema, stream_format)
+
+    try:
+        mechanics, next_cursor = keyset_paginate(query, Mechanic.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
     if mechanics:
-        return mechanics_schema.jsonify(mechanics), 200
+        return paginated_response(schema, mechanics, next_cursor), 200
     return jsonify({"error": "No mechanics found"}), 404
 
+# Mechanic workload over a period, e.g. /leaderboard?start=2024-01-01&end=2024-01-31&sort=tickets
+@mechanics_bp.route('/leaderboard', methods=['GET'])
+@limiter.exempt
+@cache.cached(timeout=LEADERBOARD_CACHE_TIMEOUT, query_string=True)
+def get_leaderboard():
+    try:
+        start = date.fromisoformat(request.args.get('start', date.min.isoformat()))
+        end = date.fromisoformat(request.args.get('end', date.max.isoformat()))
+    except ValueError:
+        return jsonify({"error": "start and end must be dates (YYYY-MM-DD)"}), 400
+
+    sort = request.args.get('sort', 'revenue')
+    if sort not in LEADERBOARD_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(LEADERBOARD_SORTS)}"}), 400
+
+    try:
+        rows, next_page = offset_paginate(leaderboard_query(start, end, sort), scalars=False)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    leaderboard = [
+        {
+            "mechanic_id": row.id,
+            "name": row.name,
+            "tickets": row.tickets,
+            "parts": row.parts,
+            "revenue": round(row.revenue, 2),
+        }
+        for row in rows
+    ]
+    return add_next_page_headers(jsonify(leaderboard), next_page), 200
+
+
+def leaderboard_query(start, end, sort):
+    # tickets in the period, via ix_service_tickets_service_date
+    tickets = (
+        select(ServiceTicket.id)
+        .where(ServiceTicket.service_date.between(start, end))
+        .cte('period_tickets')
+    )
+    # parts are totalled per ticket first so the mechanic join can't multiply them; an IN
+    # rather than a join, so the period's tickets drive ix_serialized_parts_ticket lookups
+    # instead of a walk of the whole index
+    parts = (
+        select(
+            SerializedPart.ticket_id,
+            func.count(SerializedPart.id).label('part_count'),
+            func.sum(PartDescription.price).label('parts_total'),
+        )
+        .join(PartDescription, PartDescription.id == SerializedPart.desc_id)
+        .where(SerializedPart.ticket_id.in_(select(tickets.c.id)))
+        .group_by(SerializedPart.ticket_id)
+        .subquery()
+    )
+
+    ticket_count = func.count(service_mechanic.c.ticket_id)
+    # every mechanic on a ticket is credited with its parts and their own labor
+    revenue = func.coalesce(func.sum(parts.c.parts_total), 0) + ticket_count * literal(labor_rate())
+    metrics = {
+        'tickets': ticket_count.label('tickets'),
+        'parts': func.coalesce(func.sum(parts.c.part_count), 0).label('parts'),
+        'revenue': revenue.label('revenue'),
+    }
+
+    return (
+        select(Mechanic.id, Mechanic.name, *metrics.values())
+        .select_from(service_mechanic)
+        .join(tickets, tickets.c.id == service_mechanic.c.ticket_id)
+        .join(Mechanic, Mechanic.id == service_mechanic.c.mechanic_id)
+        .outerjoin(parts, parts.c.ticket_id == service_mechanic.c.ticket_id)
+        .group_by(Mechanic.id, Mechanic.name)
+        .order_by(metrics[sort].desc(), Mechanic.id)
+    )
+
+
 # Get a mechanic
 @mechanics_bp.route('/<int:mechanic_id>', methods=['GET'])
 @limiter.limit("20/hr")
-@cache.cached(timeout=60)
+@conditional_get('mechanic')
+@cached_entity('mechanic')
 def get_mechanic(mechanic_id):
-    mechanic = db.session.get(Mechanic, mechanic_id)
+    try:
+        schema, load_options = sparse_fieldset(mechanic_schema, mechanic_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mechanic = db.session.get(Mechanic, mechanic_id, options=load_options)
 
     if mechanic:
-        return mechanic_schema.jsonify(mechanic), 200
+        return schema.jsonify(mechanic), 200
     
     return jsonify({"error": "Invalid mechanic ID"}), 400
 
@@ -110,10 +228,13 @@ def update_mechanic(mechanic_id):
     if db.mechanic and db.mechanic != mechanic:
         return jsonify({"error": "Email already associated with another account"}), 400
     
+    try:
+        mechanic_data['password'] = password_hasher.hash(mechanic_data['password'])
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+
     for fields, value in mechanic_data.items():
         setattr(mechanic, fields, value)
-    
-    mechanic_data['password'] = generate_password_hash(mechanic_data['password'])
 
     db.session.commit()
     return mechanic_schema.jsonify(mechanic), 200
@@ -1,13 +1,17 @@
-from app.extensions import ma
-from app.models import Mechanic
+from sqlalchemy.orm import selectinload, raiseload
+from app.extensions import BaseSchema
+from app.models import Mechanic, ServiceTicket
 
 # Mechanic Schema
 
-class MechanicSchema(ma.SQLAlchemyAutoSchema):
+class MechanicSchema(BaseSchema):
     class Meta:
         model = Mechanic
         include_relationships = True
 
 mechanic_schema = MechanicSchema()
 mechanics_schema = MechanicSchema(many=True)
-login_schema = MechanicSchema(exclude=['name', 'salary'])
\ No newline at end of file
+login_schema = MechanicSchema(exclude=['name', 'salary'])
+
+# Loader options matching what MechanicSchema dumps: ticket ids and nothing else
+mechanic_load_options = (selectinload(Mechanic.tickets).load_only(ServiceTicket.id), raiseload('*'))
@@ -0,0 +1,77 @@
+from flask import jsonify
+from sqlalchemy import select
+from app.models import PartDescription
+from .schemas import part_description_schema, part_descriptions_schema, part_description_load_options
+from .routes import part_search_query
+from . import part_descriptions_bp
+from app.util.async_db import async_view, async_session
+from app.util.pagination import (
+    keyset_page_query,
+    keyset_page,
+    offset_page_query,
+    offset_page,
+    paginated_response,
+    add_next_page_headers,
+    PaginationError,
+)
+from app.util.streaming import get_stream_format
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+
+# ----- Async part_description Routes (ASGI read path, see app/asgi.py) -----
+# Get all part_descriptions
+@async_view(part_descriptions_bp, 'get_part_descriptions', unless=get_stream_format)
+@conditional_get('part_description')
+async def get_part_descriptions():
+    try:
+        schema, load_options = sparse_fieldset(part_descriptions_schema, part_description_load_options)
+        query, per_page = keyset_page_query(
+            select(PartDescription).options(*load_options), PartDescription.id
+        )
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    part_descriptions, next_cursor = keyset_page(
+        (await async_session().scalars(query)).all(), PartDescription.id, per_page
+    )
+
+    if part_descriptions:
+        return paginated_response(schema, part_descriptions, next_cursor), 200
+    return jsonify({"error": "No part_descriptions found"}), 404
+
+# Get a part_description
+@async_view(part_descriptions_bp, 'get_part_description')
+@conditional_get('part_description')
+@cached_entity('part_description')
+async def get_part_description(part_description_id):
+    try:
+        schema, load_options = sparse_fieldset(part_description_schema, part_description_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    part_description = await async_session().get(PartDescription, part_description_id, options=load_options)
+
+    if part_description:
+        return schema.jsonify(part_description), 200
+
+    return jsonify({"error": "Invalid part_description ID"}), 400
+
+# Search the parts catalog by part name and brand
+@async_view(part_descriptions_bp, 'search_by_part_name')
+async def search_by_part_name():
+    session = async_session()
+    try:
+        schema, load_options = sparse_fieldset(part_descriptions_schema, part_description_load_options)
+        query = part_search_query(session, load_options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query, page, per_page = offset_page_query(query)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    part_descriptions, next_page = offset_page((await session.scalars(query)).all(), page, per_page)
+
+    return add_next_page_headers(schema.jsonify(part_descriptions), next_page), 200
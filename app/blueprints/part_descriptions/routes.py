@@ -1,10 +1,21 @@
 from flask import Flask, request, jsonify
-from sqlalchemy import select
+from sqlalchemy import select, func, or_
 from marshmallow import ValidationError
 from app.models import db, PartDescription
-from .schemas import part_description_schema, part_descriptions_schema  
+from .schemas import part_description_schema, part_descriptions_schema, part_description_load_options
 from . import part_descriptions_bp
 from app.extensions import limiter, cache
+from app.util.pagination import (
+    keyset_paginate,
+    offset_paginate,
+    paginated_response,
+    add_next_page_headers,
+    PaginationError,
+)
+from app.util.streaming import get_stream_format, stream_collection
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+from app.util.search import part_search_index, MIN_SEARCH_LENGTH
 
 
 # ----- part_description Routes -----
@@ -28,30 +39,43 @@ def create_part_description():
 # Get all part_descriptions
 @part_descriptions_bp.route("/", methods=["GET"])
 @limiter.exempt
+@conditional_get('part_description')
 def get_part_descriptions():
     try:
-        page = int(request.args.get('page'))
-        per_page = int(request.args.get('per_page'))
-        query = select(PartDescription)
-        part_descriptions = db.paginate(query, page=page, per_page=per_page)
-        return part_descriptions_schema.jsonify(part_descriptions), 200
-    except:
-        query = select(PartDescription)
-    part_descriptions = db.session.execute(query).scalars().all()
+        schema, load_options = sparse_fieldset(part_descriptions_schema, part_description_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(PartDescription).options(*load_options)
+
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_collection(query, PartDescription.id, schema, stream_format)
+
+    try:
+        part_descriptions, next_cursor = keyset_paginate(query, PartDescription.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
     if part_descriptions:
-        return part_descriptions_schema.jsonify(part_descriptions), 200
+        return paginated_response(schema, part_descriptions, next_cursor), 200
     return jsonify({"error": "No part_descriptions found"}), 404
 
 # Get a part_description
 @part_descriptions_bp.route('/<int:part_description_id>', methods=['GET'])
 @limiter.exempt
-@cache.cached(timeout=30)
+@conditional_get('part_description')
+@cached_entity('part_description')
 def get_part_description(part_description_id):
-    part_description = db.session.get(PartDescription, part_description_id)
+    try:
+        schema, load_options = sparse_fieldset(part_description_schema, part_description_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    part_description = db.session.get(PartDescription, part_description_id, options=load_options)
 
     if part_description:
-        return part_description_schema.jsonify(part_description), 200
+        return schema.jsonify(part_description), 200
     
     return jsonify({"error": "Invalid part_description ID"}), 400
 
@@ -101,18 +125,60 @@ def get_most_valuable():
 
     return part_descriptions_schema.jsonify(part_descriptions), 200  
 
-# Query parameter to search part_description by email
+# Search the parts catalog by part name and brand
 @part_descriptions_bp.route('/search', methods=['GET'])
+@limiter.exempt
 def search_by_part_name():
-    name = request.args.get('name')
+    try:
+        schema, load_options = sparse_fieldset(part_descriptions_schema, part_description_load_options)
+        query = part_search_query(db.session, load_options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        part_descriptions, next_page = offset_paginate(query)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    #* search for exact email
-    # query = select(part_description).where(part_description.email == email)
-    #* search for part of email
-    query = select(part_description).where(part_description.part_name.like(f"%{name}%"))
-    part_description = db.session.execute(query).scalars().first()
+    return add_next_page_headers(schema.jsonify(part_descriptions), next_page), 200
 
-    return part_description_schema.jsonify(part_description), 200 
 
+def part_search_query(session, load_options=part_description_load_options):
+    # from the request's search args, a ValueError's message is the error for the client
 
+    # ?name= was the original parameter, kept for existing clients
+    term = (request.args.get('q') or request.args.get('name') or '').strip()
 
+    query = select(PartDescription).options(*load_options)
+
+    brand = request.args.get('brand')
+    if brand:
+        query = query.where(func.lower(PartDescription.brand) == brand.lower())
+
+    try:
+        min_price, max_price = (
+            float(request.args[arg]) if arg in request.args else None for arg in ('min_price', 'max_price')
+        )
+    except ValueError:
+        raise ValueError("min_price and max_price must be numbers")
+    if min_price is not None:
+        query = query.where(PartDescription.price >= min_price)
+    if max_price is not None:
+        query = query.where(PartDescription.price <= max_price)
+
+    if not term:
+        return query.order_by(PartDescription.id)
+    if len(term) < MIN_SEARCH_LENGTH:
+        # too short for trigrams, match the start of the name or brand instead
+        pattern = f"{term}%"
+        return query.where(or_(
+            PartDescription.part_name.ilike(pattern), PartDescription.brand.ilike(pattern)
+        )).order_by(PartDescription.part_name, PartDescription.id)
+    if part_search_index.is_supported(session):
+        # part name matches rank above brand matches
+        return part_search_index.fuzzy_match(query, term, weights=(10.0, 5.0))
+
+    for word in term.split():
+        pattern = f"%{word}%"
+        query = query.where(or_(PartDescription.part_name.ilike(pattern), PartDescription.brand.ilike(pattern)))
+    return query.order_by(PartDescription.id)
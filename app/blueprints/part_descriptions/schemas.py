@@ -1,12 +1,16 @@
-from app.extensions import ma
-from app.models import PartDescription
+from sqlalchemy.orm import selectinload, raiseload
+from app.extensions import BaseSchema
+from app.models import PartDescription, SerializedPart
 
 # Customer Schema
-class PartDescriptionSchema(ma.SQLAlchemyAutoSchema):
+class PartDescriptionSchema(BaseSchema):
     class Meta:
         model = PartDescription
         include_relationships = True
 
 
 part_description_schema = PartDescriptionSchema()
-part_descriptions_schema = PartDescriptionSchema(many=True)
\ No newline at end of file
+part_descriptions_schema = PartDescriptionSchema(many=True)
+
+# Loader options matching what PartDescriptionSchema dumps: serialized part ids and nothing else
+part_description_load_options = (selectinload(PartDescription.serialized_parts).load_only(SerializedPart.id), raiseload('*'))
@@ -0,0 +1,75 @@
+from flask import jsonify
+from sqlalchemy import select
+from app.models import SerializedPart
+from .schemas import serialized_part_schema, serialized_parts_schema, serialized_part_load_options
+from .routes import stock_query, requested_description_ids
+from . import serialized_parts_bp
+from app.util.async_db import async_view, async_session
+from app.util.pagination import keyset_page_query, keyset_page, paginated_response, PaginationError
+from app.util.streaming import get_stream_format
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+
+# ----- Async serialized_part Routes (ASGI read path, see app/asgi.py) -----
+# Get all serialized_parts
+@async_view(serialized_parts_bp, 'get_serialized_parts', unless=get_stream_format)
+@conditional_get('serialized_part')
+async def get_serialized_parts():
+    try:
+        schema, load_options = sparse_fieldset(serialized_parts_schema, serialized_part_load_options)
+        query, per_page = keyset_page_query(
+            select(SerializedPart).options(*load_options), SerializedPart.id
+        )
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    serialized_parts, next_cursor = keyset_page(
+        (await async_session().scalars(query)).all(), SerializedPart.id, per_page
+    )
+
+    if serialized_parts:
+        return paginated_response(schema, serialized_parts, next_cursor), 200
+    return jsonify({"error": "No serialized_parts found"}), 404
+
+# Get a serialized_part
+@async_view(serialized_parts_bp, 'get_serialized_part')
+@conditional_get('serialized_part')
+@cached_entity('serialized_part')
+async def get_serialized_part(serialized_part_id):
+    try:
+        schema, load_options = sparse_fieldset(serialized_part_schema, serialized_part_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    serialized_part = await async_session().get(SerializedPart, serialized_part_id, options=load_options)
+
+    if serialized_part:
+        return schema.jsonify(serialized_part), 200
+
+    return jsonify({"error": "Invalid serialized_part ID"}), 400
+
+# Find on hand amount of part by description ID
+@async_view(serialized_parts_bp, 'get_individual_stock')
+async def get_individual_stock(description_id):
+    stock = (await async_session().execute(stock_query([description_id]))).first()
+
+    if not stock:
+        return jsonify({"error": "Invalid part_description ID"}), 400
+
+    return jsonify({"item": stock.part_name, "quantity": stock.quantity}), 200
+
+# Find on hand amounts for many descriptions at once, e.g. /stock?ids=1,2,3
+@async_view(serialized_parts_bp, 'get_bulk_stock')
+async def get_bulk_stock():
+    try:
+        description_ids = requested_description_ids()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stock = (await async_session().execute(stock_query(description_ids))).all()
+
+    return jsonify([
+        {"desc_id": row.id, "item": row.part_name, "quantity": row.quantity}
+        for row in stock
+    ]), 200
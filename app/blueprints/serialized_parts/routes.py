@@ -1,11 +1,19 @@
+from collections import Counter
 from flask import Flask, request, jsonify
-from sqlalchemy import select
+from sqlalchemy import select, insert, func
 from marshmallow import ValidationError
-from app.models import PartDescription, db, SerializedPart
+from app.models import PartDescription, PartStockCount, ServiceTicket, db, SerializedPart, bump_stock_count
 from app.blueprints.part_descriptions import part_descriptions_bp
-from .schemas import serialized_part_schema, serialized_parts_schema  
+from .schemas import serialized_part_schema, serialized_parts_schema, serialized_part_load_options
 from . import serialized_parts_bp
 from app.extensions import limiter, cache
+from app.util.pagination import keyset_paginate, paginated_response, PaginationError
+from app.util.streaming import get_stream_format, stream_collection
+from app.util.entity_cache import cached_entity, conditional_get, mark_stale
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+MAX_STOCK_IDS = 500
+MAX_BULK_PARTS = 10000
 
 
 # ----- serialized_part Routes -----
@@ -29,33 +37,111 @@ def create_serialized_part():
     }), 201
 
 
+# Receive a shipment of serialized_parts in one transaction
+@serialized_parts_bp.route("/bulk", methods=["POST"])
+@limiter.limit("25/hour")
+def bulk_create_serialized_parts():
+    payload = request.json or {}
+
+    if 'parts' in payload:
+        try:
+            rows = serialized_parts_schema.load(payload['parts'])
+        except ValidationError as e:
+            return jsonify(e.messages), 400
+    else:
+        try:
+            desc_id = int(payload['desc_id'])
+            quantity = int(payload['quantity'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Send either parts or desc_id and quantity"}), 400
+        rows = [{"desc_id": desc_id} for _ in range(quantity)]
+
+    if not 0 < len(rows) <= MAX_BULK_PARTS:
+        return jsonify({"error": f"Between 1 and {MAX_BULK_PARTS} parts per request"}), 400
+
+    # validate the whole batch with one lookup per referenced table
+    desc_ids = {row['desc_id'] for row in rows}
+    ticket_ids = {row['ticket_id'] for row in rows if row.get('ticket_id') is not None}
+    found_descs = set(db.session.execute(select(PartDescription.id).where(PartDescription.id.in_(desc_ids))).scalars())
+    found_tickets = set(db.session.execute(select(ServiceTicket.id).where(ServiceTicket.id.in_(ticket_ids))).scalars())
+    if desc_ids - found_descs:
+        return jsonify({"error": f"Invalid part_description IDs: {sorted(desc_ids - found_descs)}"}), 400
+    if ticket_ids - found_tickets:
+        return jsonify({"error": f"Invalid service_ticket IDs: {sorted(ticket_ids - found_tickets)}"}), 400
+
+    rows = [{"desc_id": row['desc_id'], "ticket_id": row.get('ticket_id')} for row in rows]
+    connection = db.session.connection()
+    if connection.dialect.insert_returning:
+        new_ids = db.session.execute(
+            insert(SerializedPart).returning(SerializedPart.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    else:
+        # MySQL has no INSERT ... RETURNING, so take each id as the row goes in
+        statement = insert(SerializedPart.__table__)
+        new_ids = [connection.execute(statement, row).inserted_primary_key[0] for row in rows]
+
+    # Core inserts skip the ORM events, so bring the stock counts up to date here
+    for desc_id, count in Counter(row['desc_id'] for row in rows if row['ticket_id'] is None).items():
+        bump_stock_count(connection, desc_id, count)
+
+    # Core inserts skip the flush hooks too: the new parts join the serialized_part
+    # collection, and description payloads list their part ids
+    mark_stale(db.session, 'serialized_part', *new_ids)
+    mark_stale(db.session, 'part_description', *desc_ids)
+    db.session.commit()
+
+    response = {
+        "message": f"Added {len(new_ids)} serialized parts to database",
+        "count": len(new_ids),
+        "first_id": min(new_ids),
+        "last_id": max(new_ids),
+    }
+    if max(new_ids) - min(new_ids) + 1 != len(new_ids):
+        # another writer interleaved with us, the range alone would be misleading
+        response["ids"] = new_ids
+    return jsonify(response), 201
+
+
 # Get all serialized_parts
 @serialized_parts_bp.route("/", methods=["GET"])
 @limiter.exempt
+@conditional_get('serialized_part')
 def get_serialized_parts():
     try:
-        page = int(request.args.get('page'))
-        per_page = int(request.args.get('per_page'))
-        query = select(SerializedPart)
-        serialized_parts = db.paginate(query, page=page, per_page=per_page)
-        return serialized_parts_schema.jsonify(serialized_parts), 200
-    except:
-        query = select(SerializedPart)
-    serialized_parts = db.session.execute(query).scalars().all()
+        schema, load_options = sparse_fieldset(serialized_parts_schema, serialized_part_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(SerializedPart).options(*load_options)
+
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_collection(query, SerializedPart.id, schema, stream_format)
+
+    try:
+        serialized_parts, next_cursor = keyset_paginate(query, SerializedPart.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
     if serialized_parts:
-        return serialized_parts_schema.jsonify(serialized_parts), 200
+        return paginated_response(schema, serialized_parts, next_cursor), 200
     return jsonify({"error": "No serialized_parts found"}), 404
 
 # Get a serialized_part
 @serialized_parts_bp.route('/<int:serialized_part_id>', methods=['GET'])
 @limiter.exempt
-@cache.cached(timeout=30)
+@conditional_get('serialized_part')
+@cached_entity('serialized_part')
 def get_serialized_part(serialized_part_id):
-    serialized_part = db.session.get(SerializedPart, serialized_part_id)
+    try:
+        schema, load_options = sparse_fieldset(serialized_part_schema, serialized_part_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    serialized_part = db.session.get(SerializedPart, serialized_part_id, options=load_options)
 
     if serialized_part:
-        return serialized_part_schema.jsonify(serialized_part), 200
+        return schema.jsonify(serialized_part), 200
     
     return jsonify({"error": "Invalid serialized_part ID"}), 400
 
@@ -107,24 +193,65 @@ def get_most_valuable():
 
 # Find on hand amount of part by description ID
 @serialized_parts_bp.route("/stock/<int:description_id>", methods=["GET"])
+@limiter.exempt
 def get_individual_stock(description_id):
-    part_description = db.session.get(PartDescription, description_id)
-
-    parts = part_description.serialized_parts
+    stock = db.session.execute(stock_query([description_id])).first()
 
-    count = 0
-    for part in parts:
-        if not part.ticket_id:
-            count += 1
+    if not stock:
+        return jsonify({"error": "Invalid part_description ID"}), 400
 
     return jsonify(
-        {"item": part_description.part_name,
-        "quantity": count
-
+        {"item": stock.part_name,
+        "quantity": stock.quantity
     }
-    )
+    ), 200
 
+# Find on hand amounts for many descriptions at once, e.g. /stock?ids=1,2,3
+@serialized_parts_bp.route("/stock", methods=["GET"])
+@limiter.exempt
+def get_bulk_stock():
+    try:
+        description_ids = requested_description_ids()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stock = db.session.execute(stock_query(description_ids)).all()
+
+    return jsonify([
+        {"desc_id": row.id, "item": row.part_name, "quantity": row.quantity}
+        for row in stock
+    ]), 200
 
 
+def requested_description_ids():
+    # ?ids=1,2,3, a ValueError's message is the error for the client
+    try:
+        description_ids = {int(desc_id) for desc_id in request.args.get('ids', '').split(',') if desc_id}
+    except ValueError:
+        raise ValueError("ids must be a comma separated list of integers")
+
+    if not description_ids:
+        raise ValueError("No part_description IDs given")
+    if len(description_ids) > MAX_STOCK_IDS:
+        raise ValueError(f"At most {MAX_STOCK_IDS} part_description IDs per request")
+    return description_ids
 
 
+def stock_query(description_ids):
+    # primary key lookups on part_descriptions and part_stock_counts; descriptions with no
+    # counter row yet (databases from before the counters) are counted on the free-parts index
+    counted = (
+        select(func.count(SerializedPart.id))
+        .where(SerializedPart.desc_id == PartDescription.id, SerializedPart.ticket_id.is_(None))
+        .scalar_subquery()
+    )
+    return (
+        select(
+            PartDescription.id,
+            PartDescription.part_name,
+            func.coalesce(PartStockCount.on_hand, counted).label('quantity'),
+        )
+        .outerjoin(PartStockCount, PartStockCount.desc_id == PartDescription.id)
+        .where(PartDescription.id.in_(description_ids))
+        .order_by(PartDescription.id)
+    )
@@ -1,12 +1,16 @@
-from app.extensions import ma
+from sqlalchemy.orm import raiseload
+from app.extensions import BaseSchema
 from app.models import SerializedPart
 
 # Customer Schema
-class SerializedPartSchema(ma.SQLAlchemyAutoSchema):
+class SerializedPartSchema(BaseSchema):
     class Meta:
         model = SerializedPart
         include_fk = True
 
 
 serialized_part_schema = SerializedPartSchema()
-serialized_parts_schema = SerializedPartSchema(many=True)
\ No newline at end of file
+serialized_parts_schema = SerializedPartSchema(many=True)
+
+# SerializedPartSchema only dumps columns, so no relationship should ever load
+serialized_part_load_options = (raiseload('*'),)
@@ -0,0 +1,50 @@
+from flask import jsonify
+from sqlalchemy import select
+from app.models import ServiceTicket
+from .schemas import service_ticket_schema, service_tickets_schema, service_ticket_load_options
+from . import service_tickets_bp
+from app.util.async_db import async_view, async_session
+from app.util.pagination import keyset_page_query, keyset_page, paginated_response, PaginationError
+from app.util.streaming import get_stream_format
+from app.util.entity_cache import cached_entity, conditional_get
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+
+
+# ----- Async Service Ticket Routes (ASGI read path, see app/asgi.py) -----
+# Get all service_tickets
+@async_view(service_tickets_bp, 'get_service_tickets', unless=get_stream_format)
+@conditional_get('service_ticket')
+async def get_service_tickets():
+    try:
+        schema, load_options = sparse_fieldset(service_tickets_schema, service_ticket_load_options)
+        query, per_page = keyset_page_query(
+            select(ServiceTicket).options(*load_options), ServiceTicket.id
+        )
+    except (FieldsetError, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    service_tickets, next_cursor = keyset_page(
+        (await async_session().scalars(query)).all(), ServiceTicket.id, per_page
+    )
+
+    if service_tickets:
+        return paginated_response(schema, service_tickets, next_cursor), 200
+    return jsonify({"error": "No service_tickets found"}), 404
+
+
+# Get a service_ticket
+@async_view(service_tickets_bp, 'get_service_ticket')
+@conditional_get('service_ticket')
+@cached_entity('service_ticket')
+async def get_service_ticket(service_ticket_id):
+    try:
+        schema, load_options = sparse_fieldset(service_ticket_schema, service_ticket_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    service_ticket = await async_session().get(ServiceTicket, service_ticket_id, options=load_options)
+
+    if service_ticket:
+        return schema.jsonify(service_ticket), 200
+
+    return jsonify({"error": "Invalid service_ticket ID"}), 400
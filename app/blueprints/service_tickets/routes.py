@@ -1,10 +1,11 @@
 from functools import cache
 from flask import Flask, request, jsonify
-from sqlalchemy import select
+from datetime import date
+from sqlalchemy import select, update, func
 from marshmallow import ValidationError
-from .schemas import service_ticket_schema, service_tickets_schema
+from .schemas import service_ticket_schema, service_tickets_schema, service_ticket_load_options
 from . import service_tickets_bp
-from app.models import Customer, db, Mechanic, PartDescription, SerializedPart, ServiceTicket
+from app.models import Customer, db, Mechanic, PartDescription, SerializedPart, ServiceTicket, bump_stock_count, service_mechanic
 from app.blueprints.mechanics.schemas import mechanic_schema, mechanics_schema
 from app.blueprints.serialized_parts.schemas import (
     serialized_part_schema,
@@ -13,6 +14,14 @@ from app.blueprints.serialized_parts.schemas import (
 from app.blueprints.serialized_parts.schemas import serialized_part_schema
 from app.extensions import limiter, cache
 from app.util.auth import token_required, admin_required
+from app.util.pagination import keyset_paginate, paginated_response, PaginationError
+from app.util.streaming import get_stream_format, stream_collection
+from app.util.entity_cache import cached_entity, conditional_get, mark_stale
+from app.util.fieldsets import sparse_fieldset, FieldsetError
+from app.util.billing import labor_rate
+
+MAX_CART_QUANTITY = 1000
+MAX_INVOICE_IDS = 500
 
 
 # ----- Service Ticket Routes -----
@@ -39,31 +48,44 @@ def create_ServiceTicket():
 # Get all service_tickets
 @service_tickets_bp.route("/", methods=["GET"])
 @limiter.exempt
+@conditional_get('service_ticket')
 def get_service_tickets():
     try:
-        page = int(request.args.get("page"))
-        per_page = int(request.args.get("per_page"))
-        query = select(ServiceTicket)
-        service_tickets = db.paginate(query, page=page, per_page=per_page)
-        return service_tickets_schema.jsonify(service_tickets), 200
-    except:
-        query = select(ServiceTicket)
-    service_tickets = db.session.execute(query).scalars().all()
+        schema, load_options = sparse_fieldset(service_tickets_schema, service_ticket_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(ServiceTicket).options(*load_options)
+
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_collection(query, ServiceTicket.id, schema, stream_format)
+
+    try:
+        service_tickets, next_cursor = keyset_paginate(query, ServiceTicket.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
     if service_tickets:
-        return service_tickets_schema.jsonify(service_tickets), 200
+        return paginated_response(schema, service_tickets, next_cursor), 200
     return jsonify({"error": "No service_tickets found"}), 404
 
 
 # Get a service_ticket
 @service_tickets_bp.route("/<int:service_ticket_id>", methods=["GET"])
 @limiter.exempt
-@cache.cached(timeout=30)
+@conditional_get('service_ticket')
+@cached_entity('service_ticket')
 def get_service_ticket(service_ticket_id):
-    service_ticket = db.session.get(ServiceTicket, service_ticket_id)
+    try:
+        schema, load_options = sparse_fieldset(service_ticket_schema, service_ticket_load_options)
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+
+    service_ticket = db.session.get(ServiceTicket, service_ticket_id, options=load_options)
 
     if service_ticket:
-        return service_ticket_schema.jsonify(service_ticket), 200
+        return schema.jsonify(service_ticket), 200
 
     return jsonify({"error": "Invalid service_ticket ID"}), 400
 
@@ -175,8 +197,8 @@ def add_part(ticket_id, part_id):
     part = db.session.get(SerializedPart, part_id)
 
     if ticket and part:
-        if not part.ticket_id:
-            ticket.serialized_parts.append(part)
+        free_part = select(SerializedPart.id).where(SerializedPart.id == part_id)
+        if reserve_parts(ticket_id, part.desc_id, free_part):
             db.session.commit()
             return jsonify(
                 {
@@ -198,7 +220,7 @@ def remove_part(ticket_id, part_id):
     part = db.session.get(SerializedPart, part_id)
 
     if ticket and part:
-        if not part.ticket_id:
+        if part.ticket_id == ticket.id:
             ticket.serialized_parts.remove(part)
             db.session.commit()
             return jsonify(
@@ -211,22 +233,177 @@ def remove_part(ticket_id, part_id):
         return jsonify({"error": "Part not assigned to this service ticket"}), 400
     return jsonify({"error": "Invalid service ticket or part ID"}), 400
 
+# Reserve free serialized parts of a description for a service_ticket
 @service_tickets_bp.route("/<int:ticket_id>/add-to-cart/<int:description_id>", methods=["PUT"])
 def add_to_cart(ticket_id, description_id):
     ticket = db.session.get(ServiceTicket, ticket_id)
-    description = db.session.get(PartDescription, description)
+    description = db.session.get(PartDescription, description_id)
 
-    parts = description.serialized_parts
+    if not (ticket and description):
+        return jsonify({"error": "Invalid service ticket or part description ID"}), 400
+
+    quantity = request.args.get("quantity", (request.get_json(silent=True) or {}).get("quantity", 1))
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        return jsonify({"error": "quantity must be an integer"}), 400
+    if not 1 <= quantity <= MAX_CART_QUANTITY:
+        return jsonify({"error": f"quantity must be between 1 and {MAX_CART_QUANTITY}"}), 400
+
+    free_parts = (
+        select(SerializedPart.id)
+        .where(SerializedPart.desc_id == description_id)
+        .order_by(SerializedPart.id)
+        .limit(quantity)
+    )
+    part_ids = reserve_parts(ticket_id, description_id, free_parts)
+
+    if len(part_ids) < quantity:
+        # all or nothing, give back whatever this request did get
+        db.session.rollback()
+        available = db.session.execute(
+            select(func.count(SerializedPart.id)).where(
+                SerializedPart.desc_id == description_id, SerializedPart.ticket_id.is_(None)
+            )
+        ).scalar()
+        return jsonify(
+            {
+                "error": f"Not enough {description.part_name} in stock",
+                "requested": quantity,
+                "available": available,
+            }
+        ), 409
+
+    db.session.commit()
+    parts = db.session.execute(
+        select(SerializedPart).where(SerializedPart.id.in_(part_ids)).order_by(SerializedPart.id)
+    ).scalars().all()
+    return jsonify(
+        {
+            "message": f"successfully added {quantity} part(s) to the ticket",
+            "ticket": service_ticket_schema.dump(ticket),
+            "parts": serialized_parts_schema.dump(parts),
+        }
+    ), 200
+
+
+def reserve_parts(ticket_id, desc_id, free_parts):
+    """Assign the parts selected by free_parts to a ticket, and return their ids.
+
+    The UPDATE only takes parts whose ticket_id is still NULL when it runs, so
+    concurrent requests can never both get the same part; a request that loses a
+    race just gets fewer ids back. Locked rows are skipped where the database
+    supports it (SQLite serializes writers anyway). Runs in the session's
+    transaction, the caller commits or rolls back.
+    """
+    free_parts = free_parts.where(SerializedPart.ticket_id.is_(None)).with_for_update(skip_locked=True)
+    claim = update(SerializedPart.__table__).where(SerializedPart.ticket_id.is_(None)).values(ticket_id=ticket_id)
+    connection = db.session.connection()
+    if connection.dialect.update_returning:
+        # one statement, the parts are picked and taken together
+        part_ids = connection.execute(
+            claim.where(SerializedPart.id.in_(free_parts.scalar_subquery())).returning(SerializedPart.id)
+        ).scalars().all()
+    else:
+        # MySQL can't UPDATE a table it selects from in a subquery, or return the rows
+        # it updated: lock the parts first, then take them
+        part_ids = connection.execute(free_parts).scalars().all()
+        if part_ids and connection.execute(claim.where(SerializedPart.id.in_(part_ids))).rowcount != len(part_ids):
+            part_ids = connection.execute(
+                select(SerializedPart.id).where(SerializedPart.id.in_(part_ids), SerializedPart.ticket_id == ticket_id)
+            ).scalars().all()
+
+    if part_ids:
+        # a Core UPDATE skips the ORM hooks that keep stock counts and cached payloads current
+        bump_stock_count(connection, desc_id, -len(part_ids))
+        mark_stale(db.session, "serialized_part", *part_ids)
+        mark_stale(db.session, "part_description", desc_id)
+        mark_stale(db.session, "service_ticket", ticket_id)
+        db.session.expire_all()
+    return part_ids
+
+
+# Invoice for a service_ticket
+@service_tickets_bp.route("/<int:ticket_id>/invoice", methods=["GET"])
+def get_invoice(ticket_id):
+    row = db.session.execute(invoice_query().where(ServiceTicket.id == ticket_id)).first()
+
+    if not row:
+        return jsonify({"error": "Invalid service_ticket ID"}), 400
+
+    return jsonify(invoice(row, labor_rate())), 200
+
+
+# Invoices for many service_tickets, e.g. /invoices?ids=1,2,3 or /invoices?start=2024-01-01&end=2024-01-31
+@service_tickets_bp.route("/invoices", methods=["GET"])
+def get_invoices():
+    query = invoice_query()
+
+    if 'ids' in request.args:
+        try:
+            ticket_ids = {int(ticket_id) for ticket_id in request.args['ids'].split(',') if ticket_id}
+        except ValueError:
+            return jsonify({"error": "ids must be a comma separated list of integers"}), 400
+        if not ticket_ids:
+            return jsonify({"error": "No service_ticket IDs given"}), 400
+        if len(ticket_ids) > MAX_INVOICE_IDS:
+            return jsonify({"error": f"At most {MAX_INVOICE_IDS} service_ticket IDs per request"}), 400
+        query = query.where(ServiceTicket.id.in_(ticket_ids))
+    elif 'start' in request.args or 'end' in request.args:
+        try:
+            start = date.fromisoformat(request.args.get('start', date.min.isoformat()))
+            end = date.fromisoformat(request.args.get('end', date.max.isoformat()))
+        except ValueError:
+            return jsonify({"error": "start and end must be dates (YYYY-MM-DD)"}), 400
+        # ids from ix_service_tickets_service_date first; filtering the grouped query directly
+        # lets SQLite walk the whole table in id order instead when it has no statistics
+        period = select(ServiceTicket.id).where(ServiceTicket.service_date.between(start, end))
+        query = query.where(ServiceTicket.id.in_(period))
+    else:
+        return jsonify({"error": "Give ids or a start/end date range"}), 400
+
+    rate = labor_rate()
+    invoices = [invoice(row, rate) for row in db.session.execute(query)]
+
+    return jsonify({
+        "invoices": invoices,
+        "count": len(invoices),
+        "total": round(sum(item["total"] for item in invoices), 2),
+    }), 200
+
+
+def invoice_query():
+    # parts are summed by one join and group by; mechanics are counted in a subquery so
+    # they don't multiply the part rows. One query however many tickets match.
+    mechanic_count = (
+        select(func.count())
+        .where(service_mechanic.c.ticket_id == ServiceTicket.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            ServiceTicket.id,
+            ServiceTicket.service_date,
+            ServiceTicket.customer_id,
+            func.count(SerializedPart.id).label('part_count'),
+            func.coalesce(func.sum(PartDescription.price), 0).label('parts_total'),
+            mechanic_count.label('mechanic_count'),
+        )
+        .outerjoin(SerializedPart, SerializedPart.ticket_id == ServiceTicket.id)
+        .outerjoin(PartDescription, PartDescription.id == SerializedPart.desc_id)
+        .group_by(ServiceTicket.id)
+        .order_by(ServiceTicket.id)
+    )
 
-    for part in parts:
-        if not part.ticket_id:
-            ticket.serializd_parts.append(part)
-            return jsonify(
-                {
-                    "message": f"successfully added part to the ticket",
-                    "ticket": service_ticket_schema.dump(ticket),
-                    "parts": serialized_parts_schema.dump(ticket.serialized_parts),
-                }
-            ), 200
-        
 
+def invoice(row, rate):
+    labor_total = round(row.mechanic_count * rate, 2)
+    parts_total = round(row.parts_total, 2)
+    return {
+        "ticket_id": row.id,
+        "service_date": row.service_date.isoformat(),
+        "customer_id": row.customer_id,
+        "parts": {"count": row.part_count, "total": parts_total},
+        "labor": {"mechanics": row.mechanic_count, "rate": rate, "total": labor_total},
+        "total": round(parts_total + labor_total, 2),
+    }
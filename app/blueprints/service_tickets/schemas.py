@@ -1,11 +1,15 @@
-from app.extensions import ma
+from sqlalchemy.orm import raiseload
+from app.extensions import BaseSchema
 from app.models import ServiceTicket
 
 # Service Ticket Schema
-class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
+class ServiceTicketSchema(BaseSchema):
     class Meta:
         model = ServiceTicket
         include_fk = True
 
 service_ticket_schema = ServiceTicketSchema()
-service_tickets_schema = ServiceTicketSchema(many=True)
\ No newline at end of file
+service_tickets_schema = ServiceTicketSchema(many=True)
+
+# ServiceTicketSchema only dumps columns, so no relationship should ever load
+service_ticket_load_options = (raiseload('*'),)
@@ -1,11 +1,51 @@
+from time import perf_counter
 from flask_marshmallow import Marshmallow
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from flask_migrate import Migrate
+from app.util.instrumentation import current_timing
+from app.util.serialization import compile_dump
+from app.util import sqlite_limiter  # registers the sqlite:// RATELIMIT_STORAGE_URI scheme
 ma = Marshmallow()
 limiter = Limiter(
     get_remote_address,
     default_limits=['200 per day', '75 per hour'] # Default rate limits
 )
 
-cache = Cache()
\ No newline at end of file
+cache = Cache()
+
+# schema changes to existing databases go through migrations/ (flask db upgrade)
+migrate = Migrate()
+
+
+# Base for every blueprint schema, times dumps when request instrumentation is on
+class BaseSchema(ma.SQLAlchemyAutoSchema):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # generated once per schema instance; None means marshmallow does every dump
+        self._compiled_dump = compile_dump(self)
+
+    def dump(self, obj, *, many=None):
+        timing = current_timing()
+        if timing is None:
+            return self._dump(obj, many)
+
+        started = perf_counter()
+        try:
+            return self._dump(obj, many)
+        finally:
+            timing.serialize_time += perf_counter() - started
+
+    def _dump(self, obj, many):
+        # the compiled path only takes plain instances of the schema's model
+        dump = self._compiled_dump
+        model = self.opts.model
+        many = self.many if many is None else bool(many)
+        if dump is not None:
+            if not many and type(obj) is model:
+                return dump(obj)
+            if many and isinstance(obj, list) and all(type(item) is model for item in obj):
+                return [dump(item) for item in obj]
+        return super().dump(obj, many=many)
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, insert, update, delete
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from datetime import date
 from typing import List
@@ -14,6 +15,9 @@ service_mechanic = db.Table(
     Base.metadata,
     db.Column("ticket_id", db.ForeignKey("service_tickets.id")),
     db.Column("mechanic_id", db.ForeignKey("mechanics.id")),
+    # workload reads go ticket -> mechanic, ticket listings on a mechanic go the other way
+    db.Index("ix_service_mechanic_ticket", "ticket_id", "mechanic_id"),
+    db.Index("ix_service_mechanic_mechanic", "mechanic_id", "ticket_id"),
 )
 
 # * ---------- Models ----------
@@ -51,6 +55,15 @@ class ServiceTicket(Base):
     mechanics: Mapped[List["Mechanic"]] = db.relationship(secondary=service_mechanic, back_populates="tickets")
     serialized_parts: Mapped[List["SerializedPart"]] = db.relationship(back_populates="ticket")
 
+    __table_args__ = (
+        # date range reports (invoices, mechanic workload)
+        db.Index("ix_service_tickets_service_date", "service_date"),
+        # a customer's tickets, loaded with every customer payload
+        db.Index("ix_service_tickets_customer", "customer_id"),
+        # the one-ticket-per-VIN-per-day check on update
+        db.Index("ix_service_tickets_vin_date", "VIN", "service_date"),
+    )
+
 class PartDescription(Base):
     __tablename__ = "part_descriptions"
 
@@ -61,6 +74,11 @@ class PartDescription(Base):
 
     serialized_parts: Mapped[List["SerializedPart"]] = db.relationship(back_populates="description")
 
+    __table_args__ = (
+        # the case-insensitive brand filter on catalog search
+        db.Index("ix_part_descriptions_brand", db.func.lower(brand)),
+    )
+
 class SerializedPart(Base):
     __tablename__ = "serialized_parts"
 
@@ -69,4 +87,129 @@ class SerializedPart(Base):
     ticket_id: Mapped[int] = mapped_column(db.ForeignKey("service_tickets.id"), nullable=True)
 
     description: Mapped["PartDescription"] = db.relationship(back_populates="serialized_parts")
-    ticket: Mapped["ServiceTicket"] = db.relationship(back_populates="serialized_parts")
\ No newline at end of file
+    ticket: Mapped["ServiceTicket"] = db.relationship(back_populates="serialized_parts")
+
+    __table_args__ = (
+        # free units of a description, in the order reservations take them
+        db.Index(
+            "ix_serialized_parts_free",
+            "desc_id",
+            "id",
+            sqlite_where=db.text("ticket_id IS NULL"),
+            postgresql_where=db.text("ticket_id IS NULL"),
+        ),
+        # parts on a ticket, for invoices
+        db.Index("ix_serialized_parts_ticket", "ticket_id"),
+        # every unit of a description, free or not, loaded with description payloads
+        db.Index("ix_serialized_parts_desc", "desc_id"),
+    )
+
+# * ---------- Rollups ----------
+class CustomerTicketCount(Base):
+    __tablename__ = "customer_ticket_counts"
+
+    customer_id: Mapped[int] = mapped_column(db.ForeignKey("customers.id"), primary_key=True)
+    ticket_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+    __table_args__ = (
+        # ranking reads walk this index from the highest count down
+        db.Index("ix_customer_ticket_counts_rank", "ticket_count", "customer_id"),
+    )
+
+
+class PartStockCount(Base):
+    __tablename__ = "part_stock_counts"
+
+    # serialized parts of this description with no ticket_id
+    desc_id: Mapped[int] = mapped_column(db.ForeignKey("part_descriptions.id"), primary_key=True)
+    on_hand: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+def _bump_ticket_count(connection, customer_id, delta):
+    # only existing rows, made with the customer; a customer from before the rollup
+    # has none until `flask rebuild-ticket-counts` and is left out of rollup reads
+    counts = CustomerTicketCount.__table__
+    connection.execute(
+        update(counts)
+        .where(counts.c.customer_id == customer_id)
+        .values(ticket_count=counts.c.ticket_count + delta)
+    )
+
+
+def bump_stock_count(connection, desc_id, delta):
+    # public so bulk Core inserts, which skip the ORM events below, can keep stock in step.
+    # Only existing rows are bumped: a description without one predates the counters and
+    # is counted from serialized_parts until `flask db upgrade` or `flask rebuild-stock-counts` (see stock_query)
+    counts = PartStockCount.__table__
+    connection.execute(
+        update(counts).where(counts.c.desc_id == desc_id).values(on_hand=counts.c.on_hand + delta)
+    )
+
+
+@event.listens_for(Customer, "after_insert")
+def _start_ticket_count(mapper, connection, customer):
+    connection.execute(insert(CustomerTicketCount.__table__).values(customer_id=customer.id, ticket_count=0))
+
+
+@event.listens_for(ServiceTicket, "after_insert")
+def _count_new_ticket(mapper, connection, ticket):
+    _bump_ticket_count(connection, ticket.customer_id, 1)
+
+
+@event.listens_for(ServiceTicket, "after_delete")
+def _uncount_deleted_ticket(mapper, connection, ticket):
+    _bump_ticket_count(connection, ticket.customer_id, -1)
+
+
+@event.listens_for(ServiceTicket, "after_update")
+def _move_ticket_count(mapper, connection, ticket):
+    history = inspect(ticket).attrs.customer_id.history
+    if history.deleted and history.added:
+        _bump_ticket_count(connection, history.deleted[0], -1)
+        _bump_ticket_count(connection, history.added[0], 1)
+
+
+@event.listens_for(Customer, "after_delete")
+def _drop_ticket_count(mapper, connection, customer):
+    counts = CustomerTicketCount.__table__
+    connection.execute(delete(counts).where(counts.c.customer_id == customer.id))
+
+
+@event.listens_for(PartDescription, "after_insert")
+def _start_stock_count(mapper, connection, description):
+    connection.execute(insert(PartStockCount.__table__).values(desc_id=description.id, on_hand=0))
+
+
+@event.listens_for(SerializedPart, "after_insert")
+def _stock_new_part(mapper, connection, part):
+    if part.ticket_id is None:
+        bump_stock_count(connection, part.desc_id, 1)
+
+
+@event.listens_for(SerializedPart, "after_delete")
+def _unstock_deleted_part(mapper, connection, part):
+    if part.ticket_id is None:
+        bump_stock_count(connection, part.desc_id, -1)
+
+
+@event.listens_for(SerializedPart, "after_update")
+def _restock_moved_part(mapper, connection, part):
+    # covers add_part/remove_part (ticket_id) as well as re-describing a part (desc_id)
+    state = inspect(part)
+    desc_history = state.attrs.desc_id.history
+    ticket_history = state.attrs.ticket_id.history
+    if not (desc_history.has_changes() or ticket_history.has_changes()):
+        return
+
+    old_desc = desc_history.deleted[0] if desc_history.deleted else part.desc_id
+    old_ticket = ticket_history.deleted[0] if ticket_history.deleted else part.ticket_id
+    if old_ticket is None:
+        bump_stock_count(connection, old_desc, -1)
+    if part.ticket_id is None:
+        bump_stock_count(connection, part.desc_id, 1)
+
+
+@event.listens_for(PartDescription, "after_delete")
+def _drop_stock_count(mapper, connection, description):
+    counts = PartStockCount.__table__
+    connection.execute(delete(counts).where(counts.c.desc_id == description.id))
@@ -0,0 +1,53 @@
+from flask import g
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.models import db
+from app.util.engine import set_sqlite_pragmas
+
+# asyncio driver for each database the sync app can run on
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+async_views = {}
+
+
+def async_view(blueprint, endpoint, unless=None):
+    """Register f as the async version of a blueprint view, served by the ASGI read path.
+
+    unless is called in the request context; when it returns something truthy the
+    request goes to the Flask view instead (e.g. streamed responses).
+    """
+    def decorator(f):
+        async_views[f'{blueprint.name}.{endpoint}'] = (f, unless)
+        return f
+
+    return decorator
+
+
+def create_async_engine_for(app):
+    # the URL Flask-SQLAlchemy actually connects to, so relative SQLite paths resolve the same way
+    with app.app_context():
+        url = db.engine.url
+
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend} databases")
+
+    engine = create_async_engine(
+        url.set(drivername=ASYNC_DRIVERS[backend]),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    )
+    if backend == 'sqlite' and app.config.get('SQLITE_PRAGMAS'):
+        set_sqlite_pragmas(engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+    return engine
+
+
+def create_async_sessionmaker(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def async_session():
+    # the AsyncSession the ASGI read path opened for this request
+    return g.async_session
@@ -0,0 +1,286 @@
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import date
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_caching.backends import NullCache
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app.extensions import cache, limiter
+from app.models import db, Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart
+from app.util.auth import encode_token
+
+# requests that exercise every route against the fixture rows below, as
+# (method, url, json). Deletes go last and only touch rows nothing else uses.
+AUDIT_REQUESTS = {
+    'customers_bp.create_customer': [
+        ('POST', '/customers/', {'name': 'New', 'email': 'new@example.com', 'phone': '555-0199'}),
+    ],
+    'customers_bp.get_customers': [('GET', '/customers/', None), ('GET', '/customers/?page=2&per_page=1', None)],
+    'customers_bp.get_customer': [('GET', '/customers/1', None)],
+    'customers_bp.get_most_valuable': [('GET', '/customers/most-valuable', None)],
+    'customers_bp.search_customer': [('GET', '/customers/search?q=ada@ex', None)],
+    'customers_bp.update_customer': [
+        ('PUT', '/customers/1', {'name': 'Ada', 'email': 'ada@example.com', 'phone': '555-0101'}),
+    ],
+    'mechanics_bp.login_mechanic': [('POST', '/mechanics/login', {'email': 'mech@example.com', 'password': 'audit'})],
+    'mechanics_bp.create_mechanic': [
+        ('POST', '/mechanics/', {'name': 'New', 'email': 'new@example.com', 'salary': 50000, 'password': 'audit'}),
+    ],
+    'mechanics_bp.get_mechanics': [('GET', '/mechanics/', None)],
+    'mechanics_bp.get_leaderboard': [('GET', '/mechanics/leaderboard?start=2024-01-01&end=2024-01-31', None)],
+    'mechanics_bp.get_mechanic': [('GET', '/mechanics/1', None)],
+    'mechanics_bp.update_mechanic': [
+        ('PUT', '/mechanics/1', {'name': 'Mech', 'email': 'mech@example.com', 'salary': 60000, 'password': 'audit'}),
+    ],
+    'part_descriptions_bp.create_part_description': [
+        ('POST', '/part-descriptions/', {'part_name': 'Oil Filter', 'brand': 'Fram', 'price': 9.5}),
+    ],
+    'part_descriptions_bp.get_part_descriptions': [('GET', '/part-descriptions/', None)],
+    'part_descriptions_bp.get_part_description': [('GET', '/part-descriptions/1', None)],
+    'part_descriptions_bp.get_most_valuable': [('GET', '/part-descriptions/most-valuable', None)],
+    'part_descriptions_bp.search_by_part_name': [
+        ('GET', '/part-descriptions/search?q=brake', None),
+        ('GET', '/part-descriptions/search?brand=acme&max_price=50', None),
+    ],
+    'part_descriptions_bp.update_part_description': [
+        ('PUT', '/part-descriptions/1', {'part_name': 'Brake Pads', 'brand': 'Acme', 'price': 45.0}),
+    ],
+    'serialized_parts_bp.create_serialized_part': [('POST', '/serialized-parts/', {'desc_id': 1})],
+    'serialized_parts_bp.bulk_create_serialized_parts': [
+        ('POST', '/serialized-parts/bulk', {'desc_id': 1, 'quantity': 2}),
+    ],
+    'serialized_parts_bp.get_serialized_parts': [('GET', '/serialized-parts/', None)],
+    'serialized_parts_bp.get_serialized_part': [('GET', '/serialized-parts/1', None)],
+    'serialized_parts_bp.get_most_valuable': [('GET', '/serialized-parts/most-valuable', None)],
+    'serialized_parts_bp.get_individual_stock': [('GET', '/serialized-parts/stock/1', None)],
+    'serialized_parts_bp.get_bulk_stock': [('GET', '/serialized-parts/stock?ids=1,2', None)],
+    'serialized_parts_bp.update_serialized_part': [('PUT', '/serialized-parts/3', {'desc_id': 1})],
+    'service_tickets_bp.create_ServiceTicket': [
+        ('POST', '/service-tickets/', {'service_date': '2024-01-20', 'VIN': '1HGCM82633A000003',
+                                       'service_desc': 'Oil change', 'customer_id': 1}),
+    ],
+    'service_tickets_bp.get_service_tickets': [('GET', '/service-tickets/', None)],
+    'service_tickets_bp.get_service_ticket': [('GET', '/service-tickets/1', None)],
+    'service_tickets_bp.update_service_ticket': [
+        ('PUT', '/service-tickets/1', {'service_date': '2024-01-05', 'VIN': '1HGCM82633A000001',
+                                       'service_desc': 'Brake job', 'customer_id': 1}),
+    ],
+    'service_tickets_bp.add_mechanic': [('PUT', '/service-tickets/2/add-mechanic/1', None)],
+    'service_tickets_bp.remove_mechanic': [('DELETE', '/service-tickets/2/remove-mechanic/1', None)],
+    'service_tickets_bp.add_part': [('PUT', '/service-tickets/1/add-part/2', None)],
+    'service_tickets_bp.remove_part': [('DELETE', '/service-tickets/1/remove-part/2', None)],
+    'service_tickets_bp.add_to_cart': [('PUT', '/service-tickets/1/add-to-cart/1?quantity=1', None)],
+    'service_tickets_bp.get_invoice': [('GET', '/service-tickets/1/invoice', None)],
+    'service_tickets_bp.get_invoices': [
+        ('GET', '/service-tickets/invoices?ids=1,2', None),
+        ('GET', '/service-tickets/invoices?start=2024-01-01&end=2024-01-31', None),
+    ],
+    'service_tickets_bp.delete_service_ticket': [('DELETE', '/service-tickets/3', None)],
+    'serialized_parts_bp.delete_serialized_part': [('DELETE', '/serialized-parts/5', None)],
+    'part_descriptions_bp.delete_part_description': [('DELETE', '/part-descriptions/2', None)],
+    'mechanics_bp.delete_mechanic': [('DELETE', '/mechanics/2', None)],
+    'customers_bp.delete_customer': [('DELETE', '/customers/2', None)],
+}
+# not backed by the database
+SKIPPED = {'static', 'swagger_ui.show'}
+# routes that read a whole table by design; reported, but not counted as failures
+KNOWN_SCANS = {
+    'customers_bp.get_most_valuable': 'counts every customer\'s tickets unless CUSTOMER_TICKET_ROLLUP is on',
+    'part_descriptions_bp.get_most_valuable': 'ranks every part description in Python',
+    'serialized_parts_bp.get_most_valuable': 'ranks every serialized part in Python',
+}
+
+# "SCAN <table>" reads every row; scans of subqueries, CTEs and FTS tables are not table scans
+SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?$')
+# a sort, grouping or DISTINCT no index serves, every matching row goes through it first
+TEMP_B_TREE = re.compile(r'^USE TEMP B-TREE FOR (.+)$')
+AGGREGATE = re.compile(r'\b(?:count|sum|avg|min|max|total|group_concat)\(', re.IGNORECASE)
+
+
+def add_fixture(session):
+    # just enough rows for every route to get past its lookups and run its real queries
+    pads = PartDescription(part_name='Brake Pads', brand='Acme', price=45.0)
+    ada = Customer(name='Ada', email='ada@example.com', phone='555-0101')
+    mechanic = Mechanic(name='Mech', email='mech@example.com', salary=50000,
+                        password=generate_password_hash('audit', 'pbkdf2:sha256:1000'))
+    tickets = [
+        ServiceTicket(service_date=date(2024, 1, 5), VIN=f'1HGCM82633A00000{i}', service_desc='Brake job', customer=ada)
+        for i in (1, 2, 3)
+    ]
+    tickets[0].mechanics = [mechanic]
+    session.add_all([
+        ada,
+        Customer(name='Bob', email='bob@example.com', phone='555-0102'),
+        mechanic,
+        Mechanic(name='Spare', email='spare@example.com', salary=50000, password='!audit'),
+        PartDescription(part_name='Wiper Blade', brand='Bosch', price=12.0),
+        SerializedPart(description=pads, ticket=tickets[0]),
+        *[SerializedPart(description=pads) for _ in range(4)],
+    ])
+    session.commit()
+
+
+def copy_schema(source, target):
+    # every table, index, trigger and full-text table of the database, without its rows
+    virtual = [name for name, sql in source.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+               if sql and sql.startswith('CREATE VIRTUAL TABLE')]
+    rows = source.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    ).fetchall()
+    for kind, name, sql in rows:
+        if kind == 'table' and any(name.startswith(f'{vt}_') for vt in virtual):
+            continue  # FTS shadow tables, created along with their virtual table
+        target.execute(sql)
+
+    # planner statistics, so plans come out as they would on the real data
+    if source.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        target.execute('ANALYZE sqlite_master')
+        target.execute('DELETE FROM sqlite_stat1')
+        target.executemany('INSERT INTO sqlite_stat1 VALUES (?, ?, ?)', source.execute('SELECT * FROM sqlite_stat1'))
+    target.commit()
+
+
+def full_scans(connection, statement, parameters, tables):
+    """What an EXPLAIN QUERY PLAN of statement reads in full, as lines for the report.
+
+    Tables read row by row, and for a statement with no WHERE, sorts, groupings or
+    DISTINCTs done in a temp b-tree, which take every row of the table. A scan that
+    a LIMIT cuts short is left out, see bounded.
+    """
+    statement_text = ' '.join(statement.split())
+    scans, sorts = [], []
+    for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()):
+        scan, sort = SCAN.match(row[-1]), TEMP_B_TREE.match(row[-1])
+        if scan and scan.group(1) in tables:
+            scans.append(f"scans {scan.group(1)}" + (f" via {scan.group(2)}" if scan.group(2) else ""))
+        elif sort and ' WHERE ' not in statement_text:
+            sorts.append(f"sorts every row in a temp b-tree for {sort.group(1)}")
+    if bounded(statement_text) and not sorts:
+        return []
+    return scans + sorts
+
+
+def bounded(statement):
+    # a LIMIT stops a scan after the page (e.g. a first page walked in key order), unless
+    # every row has to be filtered, grouped, aggregated or deduplicated first; an ORDER BY
+    # no index serves shows up as a temp b-tree in the plan. statement is on one line,
+    # SQLAlchemy starts each clause on a new one
+    return (
+        ' LIMIT ' in statement
+        and not any(clause in statement for clause in (' WHERE ', ' GROUP BY ', ' DISTINCT '))
+        and not AGGREGATE.search(statement)
+    )
+
+
+def audit_routes(app, path):
+    """Run AUDIT_REQUESTS against the SQLite database at path, return {endpoint: [(statement, parameters)]}."""
+    engine = db.engine
+    statements = {}
+    current = []
+
+    def use_scratch(dialect, conn_rec, cargs, cparams):
+        # a new connection rather than editing cargs, which the engine reuses for every connect
+        return dialect.loaded_dbapi.connect(path, *cargs[1:], **cparams)
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('PRAGMA'):
+            # executemany gets a list of parameter sets, one plan covers them all
+            current.append((statement, parameters[0] if isinstance(parameters, list) else parameters))
+
+    headers = {'Authorization': 'Bearer ' + encode_token(1, role='mechanic')}
+    saved_cache = app.extensions['cache'][cache]
+    saved_limiter = limiter.enabled
+
+    engine.dispose()
+    event.listen(engine, 'do_connect', use_scratch)
+    # responses must come from the database, and the audit mustn't use up real rate limits
+    app.extensions['cache'][cache] = NullCache()
+    limiter.enabled = False
+    try:
+        add_fixture(db.session)
+        db.session.remove()
+
+        client = app.test_client()
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            for endpoint, requests in AUDIT_REQUESTS.items():
+                for method, url, body in requests:
+                    current.clear()
+                    response = client.open(url, method=method, json=body, headers=headers)
+                    if response.status_code >= 500:
+                        click.echo(f"warning: {method} {url} failed with {response.status_code}")
+                    statements.setdefault(endpoint, []).extend(current)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    finally:
+        db.session.remove()
+        event.remove(engine, 'do_connect', use_scratch)
+        engine.dispose()
+        app.extensions['cache'][cache] = saved_cache
+        limiter.enabled = saved_limiter
+
+    return statements
+
+
+@click.command("db-audit")
+@click.option("--verbose", "-v", is_flag=True, help="Print every query plan, not just full scans.")
+@with_appcontext
+def db_audit_command(verbose):
+    """EXPLAIN the queries every route issues and flag the ones that scan whole tables.
+
+    Routes run against an empty copy of the database's schema (and its ANALYZE
+    statistics) with a few fixture rows, so the audit never touches real data.
+    Exits with status 1 when a full scan is found.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException("db-audit reads SQLite query plans, point SQLALCHEMY_DATABASE_URI at SQLite")
+
+    app = current_app._get_current_object()
+    unaudited = {rule.endpoint for rule in app.url_map.iter_rules()} - set(AUDIT_REQUESTS) - SKIPPED
+    for endpoint in sorted(unaudited):
+        click.echo(f"warning: {endpoint} has no audit request")
+
+    handle, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(handle)
+    try:
+        with db.engine.connect() as source:
+            target = sqlite3.connect(path)
+            copy_schema(source.connection.dbapi_connection, target)
+        tables = {name for name, in target.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'customers' not in tables:
+            raise click.ClickException("The database has no tables yet, run flask db upgrade first")
+
+        statements = audit_routes(app, path)
+
+        flagged = 0
+        for endpoint, queries in statements.items():
+            seen = set()
+            for statement, parameters in queries:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                scans = full_scans(target, statement, parameters, tables)
+                if scans and endpoint not in KNOWN_SCANS:
+                    flagged += 1
+                if scans or verbose:
+                    label = ('known' if endpoint in KNOWN_SCANS else 'FULL SCAN') if scans else 'ok'
+                    click.echo(f"{label:<9} {endpoint}")
+                    click.echo(f"          {' '.join(statement.split())}")
+                    for scan in scans:
+                        click.echo(f"          {scan}")
+                    if scans and endpoint in KNOWN_SCANS:
+                        click.echo(f"          {KNOWN_SCANS[endpoint]}")
+        target.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    click.echo(f"{sum(len(q) for q in statements.values())} queries from {len(statements)} routes, "
+               f"{flagged} with full scans")
+    if flagged:
+        raise SystemExit(1)
@@ -2,7 +2,11 @@ from jose import JWTError, jwt
 import jose
 from datetime import datetime, timedelta, timezone
 from functools import wraps
+from collections import OrderedDict
 from flask import request, jsonify
+import hashlib
+import threading
+import time
 import os
 
 SECRET_KEY = os.environ.get('SECRET_KEY') or "super secret secrets"
@@ -19,29 +23,98 @@ def encode_token(user_id, role='user'):
     return token
 
 
+class TokenCache:
+    """Bounded LRU of already-verified token payloads, keyed by token digest.
+
+    Entries drop out at the token's own exp claim, so a cached token can never
+    outlive what jwt.decode would have allowed.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, expires_at, data):
+        with self._lock:
+            self._entries[key] = (expires_at, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+token_cache = TokenCache(maxsize=int(os.environ.get('TOKEN_CACHE_SIZE', 1024)))
+
+
+def decode_token(token):
+    key = hashlib.sha256(token.encode()).hexdigest()
+    data = token_cache.get(key)
+
+    if data is None:
+        data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        if 'exp' in data:  # tokens without an expiry are verified every time
+            token_cache.set(key, data['exp'], data)
+
+    return data
+
+
+def authenticate():
+    # returns (token data, None) or (None, error response) for the current request
+    token = None
+
+    # Check if token is passed in the headers
+    auth_header = request.headers.get('Authorization', '').split()
+    if len(auth_header) == 2:
+        token = auth_header[1]
+
+    if not token:
+        return None, (jsonify({'error': 'Token is missing!'}), 401)
+
+    try:
+        data = decode_token(token)
+    except jose.exceptions.ExpiredSignatureError:
+        return None, (jsonify({'error': 'Token has expired!'}), 401)
+    except jose.exceptions.JWTError:
+        return None, (jsonify({'error': 'Invalid token!'}), 401)
+
+    request.user_id = data['sub']
+    return data, None
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        # Check if token is passed in the headers
-        if 'Authorization' in request.headers:
-            # headers dictionary in rewuests, authorization key
-            token = request.headers['Authorization'].split()[1]
-
-        if not token:
-            return jsonify({'error': 'Token is missing!'}), 401
-        
-        try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            user_id = data['sub']
-            request.user_id = user_id
-
-        except jose.exceptions.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired!'}), 401
-        except jose.exceptions.JWTError:
-            return jsonify({'error': 'Invalid token!'}), 401
-        
+        data, error = authenticate()
+        if error:
+            return error
+
         return f(*args, **kwargs)
     
     return decorated
@@ -49,28 +122,13 @@ def token_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        # Check if token is passed in the headers
-        if 'Authorization' in request.headers:
-            # headers dictionary in rewuests, authorization key
-            token = request.headers['Authorization'].split()[1]
-
-        if not token:
-            return jsonify({'error': 'Token is missing!'}), 401
-        
-        try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            user_id = data['sub']
-            request.user_id = user_id
-            if not data['role'] == 'mechanic':
-                return jsonify({'error': 'Admin privileges required!'}), 403
-
-        except jose.exceptions.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired!'}), 401
-        except jose.exceptions.JWTError:
-            return jsonify({'error': 'Invalid token!'}), 401
-        
+        data, error = authenticate()
+        if error:
+            return error
+
+        if not data.get('role') == 'mechanic':
+            return jsonify({'error': 'Admin privileges required!'}), 403
+
         return f(*args, **kwargs)
     
-    return decorated
\ No newline at end of file
+    return decorated
@@ -0,0 +1,7 @@
+from flask import current_app
+
+DEFAULT_LABOR_RATE = 95.0  # charged per mechanic on a ticket
+
+
+def labor_rate():
+    return float(current_app.config.get('INVOICE_LABOR_RATE', DEFAULT_LABOR_RATE))
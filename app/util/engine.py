@@ -0,0 +1,27 @@
+from sqlalchemy import event
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA name=value for each item on every new connection of a SQLite engine."""
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def init_engine_profile(app, db):
+    """Apply the config's SQLITE_PRAGMAS when the app runs on SQLite.
+
+    Pool sizing for server databases needs no hook, Flask-SQLAlchemy passes
+    SQLALCHEMY_ENGINE_OPTIONS straight to create_engine.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        set_sqlite_pragmas(engine, pragmas)
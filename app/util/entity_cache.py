@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import inspect
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+from flask import has_app_context, request, make_response, current_app
+from sqlalchemy import event, inspect as inspect_state
+from sqlalchemy.orm import Session
+from app.extensions import cache
+from app.models import Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart
+
+
+def entity_cache_key(entity, entity_id):
+    return f'entity/{entity}/{entity_id}'
+
+
+def version_cache_key(entity, entity_id=None):
+    # entity_id None is the version of the whole collection, bumped by any write to it
+    if entity_id is None:
+        return f'version/{entity}'
+    return f'version/{entity}/{entity_id}'
+
+
+def cached_entity(entity, timeout=None):
+    """cache.cached for single-entity GETs, keyed on the entity's version stamp.
+
+    A write drops the stamp on commit, so the next GET starts a new one and misses;
+    old entries just expire. timeout defaults to CACHE_DEFAULT_TIMEOUT, which can be
+    much longer than a plain TTL cache would allow. Async views (the ASGI read path)
+    share the same entries.
+    """
+    def make_cache_key(*args, **kwargs):
+        entity_id, = kwargs.values()
+        # the stamp is read before the view queries, so a GET racing a write stores
+        # what it loaded under the stamp the write drops, never under the next one
+        _, token = current_version(entity, entity_id)
+        key = f'{entity_cache_key(entity, entity_id)}?v={token}'
+        fields = request.args.get('fields')
+        if fields is None:
+            return key
+        return f'{key}&fields={fields}'
+
+    def decorator(f):
+        if not inspect.iscoroutinefunction(f):
+            return cache.cached(timeout=timeout, make_cache_key=make_cache_key)(f)
+
+        # cache.cached can't await, this stores the view's return value the same way;
+        # cache calls can block (SQLiteCache), so they stay off the event loop
+        @wraps(f)
+        async def decorated(**kwargs):
+            key = await asyncio.to_thread(make_cache_key, **kwargs)
+            rv = await asyncio.to_thread(cache.get, key)
+            if rv is None:
+                rv = await f(**kwargs)
+                await asyncio.to_thread(cache.set, key, rv, timeout=timeout)
+            return rv
+
+        return decorated
+
+    return decorator
+
+
+def current_version(entity, entity_id=None):
+    """Return (stamp, token) for an entity or collection, starting a new one if none is cached.
+
+    Writes delete the stamp after commit, so a stamp read before touching the
+    database can only ever describe data at least as new as what it is served with.
+    """
+    key = version_cache_key(entity, entity_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, (time.time(), uuid.uuid4().hex), timeout=0)
+        version = cache.get(key) or (time.time(), uuid.uuid4().hex)
+    return version
+
+
+def conditional_get(entity):
+    """ETag/Last-Modified for a GET, answering If-None-Match with a 304 before the view runs.
+
+    Detail routes are stamped per entity id, list routes per collection. On a match
+    no serialization happens, and no query either while the stamp is cached.
+    """
+    def validators(kwargs):
+        entity_id = next(iter(kwargs.values()), None)
+        stamp, token = current_version(entity, entity_id)
+        etag = hashlib.sha1(f'{token}:{request.full_path}'.encode()).hexdigest()
+        return etag, datetime.fromtimestamp(stamp, timezone.utc)
+
+    def stamp(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+        return response
+
+    def decorator(f):
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated(*args, **kwargs):
+                etag, last_modified = await asyncio.to_thread(validators, kwargs)
+                if request.if_none_match.contains(etag):
+                    return stamp(current_app.response_class(status=304), etag, last_modified)
+                return stamp(make_response(await f(*args, **kwargs)), etag, last_modified)
+        else:
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                etag, last_modified = validators(kwargs)
+                if request.if_none_match.contains(etag):
+                    return stamp(current_app.response_class(status=304), etag, last_modified)
+                return stamp(make_response(f(*args, **kwargs)), etag, last_modified)
+
+        return decorated
+
+    return decorator
+
+
+def mark_stale(session, entity, *entity_ids):
+    # for writes that bypass the ORM unit of work (Core updates/inserts)
+    stale = session.info.setdefault('stale_entities', set())
+    stale.update((entity, entity_id) for entity_id in entity_ids)
+
+
+def _related_ids(state, attr):
+    # every value the attribute had or has in this flush, without loading anything new
+    history = state.attrs[attr].history
+    return [value for value in history.sum() if value is not None]
+
+
+def _stale_entities(obj):
+    state = inspect_state(obj)
+
+    if isinstance(obj, Customer):
+        yield 'customer', obj.id
+    elif isinstance(obj, Mechanic):
+        yield 'mechanic', obj.id
+    elif isinstance(obj, PartDescription):
+        yield 'part_description', obj.id
+    elif isinstance(obj, ServiceTicket):
+        yield 'service_ticket', obj.id
+        # customer and mechanic payloads list their ticket ids
+        for customer_id in _related_ids(state, 'customer_id'):
+            yield 'customer', customer_id
+        for mechanic in _related_ids(state, 'mechanics'):
+            yield 'mechanic', mechanic.id
+    elif isinstance(obj, SerializedPart):
+        yield 'serialized_part', obj.id
+        # part description payloads list their serialized part ids
+        for desc_id in _related_ids(state, 'desc_id'):
+            yield 'part_description', desc_id
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_entities(session, flush_context):
+    stale = session.info.setdefault('stale_entities', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        stale.update(_stale_entities(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_entities(session):
+    stale = session.info.pop('stale_entities', None)
+    if not stale or not has_app_context():
+        return
+
+    # dropping the stamps is enough, cached entities are keyed on them
+    keys = {version_cache_key(entity) for entity, _ in stale}
+    for entity, entity_id in stale:
+        keys.add(version_cache_key(entity, entity_id))
+
+    # not delete_many, it stops at the first key that isn't cached
+    for key in keys:
+        cache.delete(key)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_entities(session):
+    session.info.pop('stale_entities', None)
@@ -0,0 +1,75 @@
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import RelationshipProperty, load_only, selectinload, raiseload
+
+# (schema, fields) -> (sparse schema, loader options), so each fieldset is built
+# and compiled once; only valid fieldsets get here, which bounds its size
+_fieldsets = {}
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+def requested_fields():
+    """The names in ?fields=a,b as a sorted tuple, or None when the client wants every field."""
+    fields = request.args.get('fields')
+    if fields is None:
+        return None
+
+    names = tuple(sorted({name.strip() for name in fields.split(',') if name.strip()}))
+    if not names:
+        raise FieldsetError('fields must name at least one field')
+    return names
+
+
+def sparse_fieldset(schema, load_options):
+    """Return the schema and loader options to serve the request's ?fields= with.
+
+    Without ?fields= that is schema and load_options unchanged. With it, the
+    schema only dumps the requested fields and the options load only their
+    columns and the primary key, so relationships nobody asked for are never
+    queried. Raises FieldsetError for names the schema doesn't dump.
+    """
+    fields = requested_fields()
+    if fields is None:
+        return schema, load_options
+
+    fieldset = _fieldsets.get((schema, fields))
+    if fieldset is None:
+        unknown = set(fields) - set(schema.dump_fields)
+        if unknown:
+            raise FieldsetError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        sparse = type(schema)(only=fields, many=schema.many, load_only=schema.load_only)
+        fieldset = _fieldsets[(schema, fields)] = (sparse, fieldset_load_options(sparse))
+    return fieldset
+
+
+def fieldset_load_options(schema):
+    # the schema's columns plus the primary key, and a key-only selectinload per
+    # relationship it dumps; raiseload('*') keeps every other relationship unloaded
+    model = schema.opts.model
+    mapper = inspect(model)
+    columns = [getattr(model, mapper.get_property_by_column(column).key) for column in mapper.primary_key]
+    relationships = []
+
+    for name, field in schema.dump_fields.items():
+        prop = mapper.attrs.get(field.attribute or name)
+        if prop is None:
+            continue
+        attribute = getattr(model, prop.key)
+
+        if not isinstance(prop, RelationshipProperty):
+            columns.append(attribute)
+            continue
+
+        # Related and RelatedList dump only the related keys, so only those are loaded
+        related = getattr(field, 'inner', field)
+        if hasattr(related, 'related_keys'):
+            keys = [getattr(prop.mapper.class_, key.key) for key in related.related_keys]
+            relationships.append(selectinload(attribute).load_only(*keys))
+        else:
+            relationships.append(selectinload(attribute))
+
+    return (load_only(*columns), *relationships, raiseload('*'))
@@ -0,0 +1,25 @@
+import os
+import stat
+
+
+def create_private_file(path):
+    """Create path (if missing) readable and writable by this user only.
+
+    For the SQLite files workers share (cache, rate limits): anyone who can write
+    one can poison what it holds, and the cache unpickles its values. A file owned
+    by another user is refused rather than used; SQLite gives -wal/-shm files the
+    same mode.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        info = os.fstat(fd)
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            raise PermissionError(f"{path} is owned by another user")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            # tighten files left readable by an earlier version
+            os.fchmod(fd, 0o600)
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.chmod(path + suffix, 0o600)
+    finally:
+        os.close(fd)
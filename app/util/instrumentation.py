@@ -0,0 +1,105 @@
+import json
+import logging
+from time import perf_counter
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('mechanic_shop.timing')
+
+
+class RequestTiming:
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.cache_hits = 0
+
+    def server_timing_header(self):
+        total = perf_counter() - self.started
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits"',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+    def as_log(self, response):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'serialize_ms': round(self.serialize_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'total_ms': round((perf_counter() - self.started) * 1000, 2),
+        }
+
+
+def current_timing():
+    # None unless instrumentation is on and we are inside an instrumented request
+    if not has_app_context():
+        return None
+    return g.get('request_timing')
+
+
+def instrument_engine(engine):
+    """Count and time every query on engine against the current request's timing.
+
+    For an AsyncEngine pass engine.sync_engine, its events fire there.
+    """
+    # the start time lives on the execution context, which is dropped with the statement
+    # even when it raises and after_cursor_execute never runs
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        context._timing_started = perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._timing_started
+        timing = current_timing()
+        if timing is not None:
+            timing.queries += 1
+            timing.db_time += elapsed
+
+
+def init_instrumentation(app, db, cache):
+    """Record queries, DB time, serialization time and cache hits per request.
+
+    Only wired up when SERVER_TIMING is on; otherwise the only cost left is the
+    current_timing() lookup in BaseSchema.dump.
+    """
+    with app.app_context():
+        instrument_engine(db.engine)
+    # so the ASGI read path times queries on its asyncio engine too
+    app.extensions['request_timing'] = instrument_engine
+
+    # count response and entity cache hits by watching this app's cache backend
+    with app.app_context():
+        backend = cache.cache
+    backend_get = backend.get
+
+    def _counting_get(key):
+        value = backend_get(key)
+        timing = current_timing()
+        # version stamps (entity_cache.version_cache_key) are read on every cached GET,
+        # hit or miss, so they would only inflate the count
+        if timing is not None and value is not None and not key.startswith('version/'):
+            timing.cache_hits += 1
+        return value
+
+    backend.get = _counting_get
+
+    @app.before_request
+    def _start_timing():
+        g.request_timing = RequestTiming()
+
+    @app.after_request
+    def _report_timing(response):
+        timing = g.pop('request_timing', None)
+        if timing is not None:
+            response.headers['Server-Timing'] = timing.server_timing_header()
+            logger.info(json.dumps(timing.as_log(response)))
+        return response
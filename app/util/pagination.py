@@ -0,0 +1,143 @@
+import base64
+import json
+from flask import request, current_app, url_for
+from app.models import db
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(last_id, **keys):
+    # opaque to clients, only we know it's the sort key of the last row they saw
+    raw = json.dumps({'id': last_id, **keys}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor_keys(cursor, *keys):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        values = [data[key] for key in ('id',) + keys]
+    except (ValueError, TypeError, KeyError):
+        raise PaginationError('Invalid cursor')
+
+    for value in values:
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise PaginationError('Invalid cursor')
+    return values
+
+
+def decode_cursor(cursor):
+    return decode_cursor_keys(cursor)[0]
+
+
+def get_per_page(arg='per_page', default=DEFAULT_PER_PAGE):
+    max_per_page = current_app.config.get('PAGINATION_MAX_PER_PAGE', MAX_PER_PAGE)
+    per_page = request.args.get(arg, default)
+
+    try:
+        per_page = int(per_page)
+    except (TypeError, ValueError):
+        raise PaginationError(f'{arg} must be an integer')
+
+    if per_page < 1:
+        raise PaginationError(f'{arg} must be at least 1')
+    return min(per_page, max_per_page)
+
+
+def get_page():
+    try:
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        raise PaginationError('page must be an integer')
+    if page < 1:
+        raise PaginationError('page must be at least 1')
+    return page
+
+
+def keyset_paginate(query, key_column):
+    """Page through query ordered by key_column using the ?after= cursor.
+
+    Returns (items, next_cursor). next_cursor is None on the last page.
+    The legacy ?page= offset form is still honoured, but capped the same way.
+    """
+    query, per_page = keyset_page_query(query, key_column)
+    return keyset_page(db.session.execute(query).scalars().all(), key_column, per_page)
+
+
+def keyset_page_query(query, key_column):
+    # the statement keyset_paginate runs, for sessions other than db.session
+    per_page = get_per_page()
+
+    if 'page' in request.args:
+        query = query.order_by(key_column).offset((get_page() - 1) * per_page)
+    elif request.args.get('after'):
+        query = query.where(key_column > decode_cursor(request.args['after'])).order_by(key_column)
+    else:
+        query = query.order_by(key_column)
+
+    # fetch one extra row so we know whether there is a next page without a COUNT
+    return query.limit(per_page + 1), per_page
+
+
+def keyset_page(items, key_column, per_page):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+    return items, next_cursor
+
+
+def offset_paginate(query, scalars=True):
+    """Page through an already ordered query with ?page=, for orders with no usable cursor key.
+
+    Returns (items, next_page). next_page is None on the last page. With
+    scalars=False items are whole rows rather than their first column.
+    """
+    query, page, per_page = offset_page_query(query)
+    result = db.session.execute(query)
+    return offset_page(result.scalars().all() if scalars else result.all(), page, per_page)
+
+
+def offset_page_query(query):
+    # the statement offset_paginate runs, for sessions other than db.session
+    per_page = get_per_page()
+    page = get_page()
+    return query.limit(per_page + 1).offset((page - 1) * per_page), page, per_page
+
+
+def offset_page(items, page, per_page):
+    next_page = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_page = page + 1
+    return items, next_page
+
+
+def add_next_page_headers(response, next_page):
+    if next_page:
+        args = request.args.to_dict()
+        args['page'] = next_page
+        response.headers['X-Next-Page'] = str(next_page)
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
+
+
+def add_pagination_headers(response, next_cursor):
+    if next_cursor:
+        args = request.args.to_dict()
+        args.pop('page', None)
+        args['after'] = next_cursor
+        next_url = url_for(request.endpoint, **(request.view_args or {}), **args)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def paginated_response(schema, items, next_cursor):
+    response = schema.jsonify(items)
+    return add_pagination_headers(response, next_cursor)
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+DEFAULT_HASH_METHOD = 'scrypt'
+# hashes waiting or running per worker process before new ones are turned away
+DEFAULT_PENDING_PER_WORKER = 4
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def hash_method(method):
+    # the method string werkzeug writes into a hash, with its defaults filled in
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        hash_name = args[0] if args else 'sha256'
+        return f'pbkdf2:{hash_name}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+def _verify(pwhash, password, method):
+    # runs in the pool; a hash made with an older cost is redone in the same round trip
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if pwhash.split('$', 1)[0] == method:
+        return True, None
+    return True, generate_password_hash(password, method)
+
+
+class PasswordHasher:
+    """Password hashing and checks, inline or in a bounded pool of worker processes.
+
+    Hashing is deliberately slow and memory hungry (scrypt's default needs 32 MiB).
+    By default it runs inline in the request. With PASSWORD_HASH_WORKERS set, it runs
+    in a pool of that many processes, which caps how many hashes run at once. Once
+    PASSWORD_HASH_MAX_PENDING are waiting or running, new ones raise
+    PasswordHasherBusy instead of queueing behind them.
+
+    The request still waits for its hash, so the pool only helps threaded or async
+    servers (gunicorn gthread, uvicorn), where other requests keep being served
+    meanwhile. It never frees a sync worker. Each server process starts its own
+    pool on first use, so keep server processes x PASSWORD_HASH_WORKERS within
+    the host's cores and memory.
+
+    Configured per app: PASSWORD_HASH_METHOD (werkzeug method, e.g. 'scrypt:32768:8:1'),
+    PASSWORD_HASH_WORKERS (processes, default 0, inline) and PASSWORD_HASH_MAX_PENDING.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._pool_key = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method())
+
+    def verify(self, pwhash, password):
+        """Return (valid, new_hash); new_hash is set when pwhash was made with another method."""
+        return self._run(_verify, pwhash, password, self.method())
+
+    def method(self):
+        return hash_method(current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD)
+
+    def _run(self, fn, *args):
+        workers = current_app.config.get('PASSWORD_HASH_WORKERS')
+        if not workers:
+            return fn(*args)
+        max_pending = current_app.config.get('PASSWORD_HASH_MAX_PENDING') or workers * DEFAULT_PENDING_PER_WORKER
+
+        with self._lock:
+            if self._pending >= max_pending:
+                raise PasswordHasherBusy("Too many logins in progress, try again shortly")
+            self._pending += 1
+            pool = self._get_pool(workers)
+
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory), the next call starts a new pool
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _get_pool(self, workers):
+        # a pool can't be used across a fork (e.g. gunicorn --preload), so it is per process
+        key = (os.getpid(), workers)
+        if self._pool is None or self._pool_key != key:
+            if self._pool is not None and self._pool_key[0] == key[0]:
+                self._pool.shutdown(wait=False)
+            # spawned rather than forked, forking a threaded server process is unsafe
+            self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            self._pool_key = key
+        return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_key[0] == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
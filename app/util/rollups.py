@@ -0,0 +1,49 @@
+import click
+from sqlalchemy import select, insert, delete, func, and_
+from app.models import db, Customer, ServiceTicket, PartDescription, SerializedPart, CustomerTicketCount, PartStockCount
+
+
+def rebuild_customer_ticket_counts():
+    # one-off backfill, the ServiceTicket events keep the table current after this
+    counts = CustomerTicketCount.__table__
+    db.session.execute(delete(counts))
+    db.session.execute(
+        insert(counts).from_select(
+            ["customer_id", "ticket_count"],
+            # every customer gets a row, even with no tickets, so later writes keep it current
+            select(Customer.id, func.count(ServiceTicket.id))
+            .outerjoin(ServiceTicket, ServiceTicket.customer_id == Customer.id)
+            .group_by(Customer.id),
+        )
+    )
+    db.session.commit()
+
+
+def rebuild_part_stock_counts():
+    # one-off backfill, the SerializedPart events keep the table current after this
+    counts = PartStockCount.__table__
+    db.session.execute(delete(counts))
+    db.session.execute(
+        insert(counts).from_select(
+            ["desc_id", "on_hand"],
+            # every description gets a row, even with none on hand, so later writes keep it current
+            select(PartDescription.id, func.count(SerializedPart.id))
+            .outerjoin(SerializedPart, and_(SerializedPart.desc_id == PartDescription.id, SerializedPart.ticket_id.is_(None)))
+            .group_by(PartDescription.id),
+        )
+    )
+    db.session.commit()
+
+
+@click.command("rebuild-ticket-counts")
+def rebuild_ticket_counts_command():
+    """Recompute the per-customer ticket count rollup from service_tickets."""
+    rebuild_customer_ticket_counts()
+    click.echo("Rebuilt customer ticket counts")
+
+
+@click.command("rebuild-stock-counts")
+def rebuild_stock_counts_command():
+    """Recompute the per-description on-hand counts from serialized_parts."""
+    rebuild_part_stock_counts()
+    click.echo("Rebuilt part stock counts")
@@ -0,0 +1,149 @@
+import click
+import math
+from sqlalchemy import DDL, event, func, literal_column, table, column, case, inspect
+from app.models import db, Customer, PartDescription
+
+MIN_SEARCH_LENGTH = 3  # trigram tokens can't match anything shorter
+
+
+class FullTextIndex:
+    """SQLite FTS5 index over some text columns of a model.
+
+    The index is an external-content FTS5 table kept in sync by triggers on the
+    model's table, so every write path (ORM or Core) updates it in the same
+    transaction. It is created and dropped along with the model's table, and at
+    startup for tables that existed before it (init_search_indexes); on other
+    databases it is simply not there and callers fall back to LIKE.
+    """
+
+    registry = []
+
+    def __init__(self, model, columns, tokenize='trigram'):
+        self.model = model
+        self.columns = columns
+        self.source = model.__tablename__
+        self.name = f'{self.source}_fts'
+        self.table = table(self.name, column('rowid'))
+        self.tokenize = tokenize
+
+        for statement in self.ddl():
+            event.listen(model.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        event.listen(model.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {self.name}').execute_if(dialect='sqlite'))
+        FullTextIndex.registry.append(self)
+
+    def ddl(self):
+        cols = ', '.join(self.columns)
+        new = ', '.join(f'new.{c}' for c in self.columns)
+        old = ', '.join(f'old.{c}' for c in self.columns)
+        delete_old = f"INSERT INTO {self.name} ({self.name}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+        insert_new = f"INSERT INTO {self.name} (rowid, {cols}) VALUES (new.id, {new});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5("
+            f"{cols}, content='{self.source}', content_rowid='id', tokenize='{self.tokenize}')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_insert AFTER INSERT ON {self.source} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_delete AFTER DELETE ON {self.source} BEGIN {delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_update AFTER UPDATE ON {self.source} BEGIN {delete_old} {insert_new} END",
+        ]
+
+    def is_supported(self, session):
+        return session.get_bind().dialect.name == 'sqlite'
+
+    def rebuild(self, session):
+        # for databases created before the index existed, or loaded with drop_triggers()
+        for statement in self.ddl():
+            session.execute(DDL(statement))
+        session.execute(DDL(f"INSERT INTO {self.name} ({self.name}) VALUES ('rebuild')"))
+
+    def drop_triggers(self, session):
+        # bulk loads index everything once with rebuild() afterwards instead of row by row
+        for trigger in ('insert', 'delete', 'update'):
+            session.execute(DDL(f'DROP TRIGGER IF EXISTS {self.name}_{trigger}'))
+
+    def match(self, query, expression, weights=None):
+        """Restrict select(model) to rows matching an FTS5 expression, best bm25 rank first."""
+        pk = self.model.id
+        index = literal_column(self.name)
+        rank = func.bm25(index, *weights) if weights else literal_column(f'{self.name}.rank')
+        return (
+            query.join(self.table, self.table.c.rowid == pk)
+            .where(index.op('MATCH')(expression))
+            .order_by(rank, pk)
+        )
+
+    def fuzzy_match(self, query, term, weights=None, min_similarity=0.5):
+        """Like match(), but tolerant of typos in term.
+
+        Rows are candidates when they share any trigram with a word of term, and
+        are kept when they share at least min_similarity of them. Exact substring
+        matches share all of them and so rank first, then bm25 rank as in match().
+        """
+        grams = sorted(trigrams(term))
+        if not grams:
+            return query.where(False)
+
+        pk = self.model.id
+        index = literal_column(self.name)
+        rank = func.bm25(index, *weights) if weights else literal_column(f'{self.name}.rank')
+        haystack = func.lower(self.model.__table__.c[self.columns[0]])
+        for name in self.columns[1:]:
+            haystack = haystack + ' ' + func.lower(self.model.__table__.c[name])
+        shared = sum(case((func.instr(haystack, gram) > 0, 1), else_=0) for gram in grams)
+
+        return (
+            query.join(self.table, self.table.c.rowid == pk)
+            .where(index.op('MATCH')(' OR '.join(fts_phrase(gram) for gram in grams)))
+            .where(shared >= math.ceil(len(grams) * min_similarity))
+            .order_by(shared.desc(), rank, pk)
+        )
+
+
+customer_search_index = FullTextIndex(Customer, ['name', 'email', 'phone'])
+part_search_index = FullTextIndex(PartDescription, ['part_name', 'brand'])
+
+
+def init_search_indexes(app, db):
+    """Create and fill any full-text index missing from an existing SQLite database.
+
+    create_all skips tables that already exist, so a database made before an index
+    was added never gets it from there, and searches would fail on the missing table.
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.begin() as connection:
+        tables = set(inspect(connection).get_table_names())
+        for index in FullTextIndex.registry:
+            if index.source in tables and index.name not in tables:
+                index.rebuild(connection)
+
+
+def include_in_migrations(name, type_, parent_names):
+    # the FTS tables and their shadow tables belong to FullTextIndex, not to migrations
+    if type_ == 'table':
+        return not any(name == index.name or name.startswith(f'{index.name}_') for index in FullTextIndex.registry)
+    return True
+
+
+def fts_phrase(term):
+    # quote user input so FTS5 operators in it are matched literally
+    return '"' + term.replace('"', '""') + '"'
+
+
+def trigrams(term):
+    # per word, so word order and which column a word is in don't matter
+    return {word[i:i + 3] for word in term.lower().split() for i in range(len(word) - 2)}
+
+
+@click.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Create any missing full-text indexes and repopulate them from their tables."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo("Full-text indexes are only used on SQLite")
+        return
+
+    for index in FullTextIndex.registry:
+        index.rebuild(db.session)
+        click.echo(f"Rebuilt {index.name}")
+    db.session.commit()
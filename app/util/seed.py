@@ -0,0 +1,207 @@
+import random
+import time
+from datetime import date, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select, func
+from app.extensions import cache
+from app.models import db, Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart, service_mechanic
+from app.util.rollups import rebuild_customer_ticket_counts, rebuild_part_stock_counts
+from app.util.search import FullTextIndex
+
+BATCH_SIZE = 50000
+
+# default row counts, roughly a busy shop after a few years
+DEFAULT_SCALE = {
+    'customers': 1000,
+    'mechanics': 20,
+    'part_descriptions': 200,
+    'tickets': 5000,
+    'serialized_parts': 10000,
+}
+
+# only for the load connection: a crash mid-seed means seeding again anyway
+SQLITE_LOAD_PRAGMAS = {'synchronous': 'OFF', 'cache_size': -256 * 1024}
+
+PART_NAMES = [
+    'Brake Pads', 'Brake Rotor', 'Oil Filter', 'Air Filter', 'Cabin Filter', 'Spark Plug', 'Alternator',
+    'Starter Motor', 'Water Pump', 'Thermostat', 'Timing Belt', 'Serpentine Belt', 'Wiper Blade',
+    'Headlight Bulb', 'Battery', 'Radiator', 'Fuel Pump', 'Oxygen Sensor', 'Ignition Coil', 'Shock Absorber',
+]
+BRANDS = ['Bosch', 'ACDelco', 'Denso', 'NGK', 'Brembo', 'Monroe', 'Gates', 'Fram', 'Motorcraft', 'Mopar']
+SERVICES = ['Brake job', 'Oil change', 'Tune up', 'Diagnostics', 'Cooling system flush', 'Electrical repair']
+FIRST_SERVICE_DATE = date(2022, 1, 1)
+SERVICE_DATES = [FIRST_SERVICE_DATE + timedelta(days=day) for day in range(3 * 365)]
+
+
+def seed_database(scale=None, seed=0, batch_size=BATCH_SIZE, progress=None):
+    """Bulk load deterministic synthetic rows into empty tables.
+
+    The same seed and scale always produce the same rows. Ids are assigned here
+    rather than by the database, so foreign keys are picked in memory and every
+    table goes in with Core executemany inserts of batch_size rows. Secondary
+    indexes and the full-text triggers are dropped for the load and built once
+    at the end, and the rollup tables are rebuilt since Core inserts skip the
+    ORM events that normally maintain them. Returns rows inserted per table.
+
+    progress, if given, is called with (table name, rows so far) after each batch.
+    """
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    rng = random.Random(seed)
+
+    customers = scale['customers']
+    mechanics = scale['mechanics']
+    descriptions = scale['part_descriptions']
+    tickets = scale['tickets']
+
+    def customer_rows():
+        for i in range(1, customers + 1):
+            yield {'id': i, 'name': f'Customer {i}', 'email': f'customer{i}@example.com',
+                   'phone': f'555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}'}
+
+    def mechanic_rows():
+        # not a usable password hash, seeded mechanics can't log in
+        for i in range(1, mechanics + 1):
+            yield {'id': i, 'name': f'Mechanic {i}', 'email': f'mechanic{i}@example.com',
+                   'salary': float(rng.randrange(40000, 90000, 500)), 'password': '!seeded'}
+
+    def description_rows():
+        for i in range(1, descriptions + 1):
+            yield {'id': i, 'part_name': f'{rng.choice(PART_NAMES)} {i}', 'brand': rng.choice(BRANDS),
+                   'price': round(rng.uniform(5, 500), 2)}
+
+    def ticket_rows():
+        # one vehicle per customer, so repeat visits share a VIN
+        for i in range(1, tickets + 1):
+            customer_id = rng.randint(1, customers)
+            yield {'id': i, 'customer_id': customer_id, 'service_date': rng.choice(SERVICE_DATES),
+                   'VIN': f'1SEED{customer_id:012d}', 'service_desc': rng.choice(SERVICES)}
+
+    def service_mechanic_rows():
+        for ticket_id in range(1, tickets + 1):
+            for mechanic_id in rng.sample(range(1, mechanics + 1), k=min(mechanics, rng.choice((1, 1, 2)))):
+                yield {'ticket_id': ticket_id, 'mechanic_id': mechanic_id}
+
+    def part_rows():
+        # about a third of the parts are still on the shelf
+        for i in range(1, scale['serialized_parts'] + 1):
+            ticket_id = rng.randint(1, tickets) if tickets and rng.random() < 0.65 else None
+            yield {'id': i, 'desc_id': rng.randint(1, descriptions), 'ticket_id': ticket_id}
+
+    loads = [
+        (Customer.__table__, customer_rows()),
+        (Mechanic.__table__, mechanic_rows()),
+        (PartDescription.__table__, description_rows()),
+        (ServiceTicket.__table__, ticket_rows()),
+        (service_mechanic, service_mechanic_rows() if mechanics else iter(())),
+        (SerializedPart.__table__, part_rows() if descriptions else iter(())),
+    ]
+    sqlite = db.engine.dialect.name == 'sqlite'
+    indexes = [index for table, _ in loads for index in table.indexes]
+
+    counts = {}
+    with db.engine.connect() as connection:
+        if sqlite:
+            restore = {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in SQLITE_LOAD_PRAGMAS}
+            for name, value in SQLITE_LOAD_PRAGMAS.items():
+                connection.exec_driver_sql(f'PRAGMA {name}={value}')
+            for search_index in FullTextIndex.registry:
+                search_index.drop_triggers(connection)
+        for index in indexes:
+            index.drop(connection)
+        connection.commit()
+
+        # put the indexes back even if the load fails, the schema shouldn't depend on it
+        try:
+            for table, rows in loads:
+                counts[table.name] = bulk_insert(connection, table, rows, batch_size, progress)
+        finally:
+            connection.rollback()
+            for index in indexes:
+                index.create(connection)
+            if sqlite:
+                for search_index in FullTextIndex.registry:
+                    search_index.rebuild(connection)
+            connection.commit()
+            # outside any transaction, SQLite refuses to change synchronous inside one
+            if sqlite:
+                for name, value in restore.items():
+                    connection.exec_driver_sql(f'PRAGMA {name}={value}')
+
+        if connection.dialect.name == 'postgresql':
+            advance_sequences(connection, [table for table, _ in loads])
+
+    rebuild_customer_ticket_counts()
+    rebuild_part_stock_counts()
+    # Core inserts skip the commit hook that drops cached payloads and ETag stamps
+    cache.clear()
+    return counts
+
+
+def bulk_insert(connection, table, rows, batch_size=BATCH_SIZE, progress=None):
+    # executemany of plain dicts, one commit per batch so memory stays flat
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            total += _insert_batch(connection, table, batch)
+            batch = []
+            if progress:
+                progress(table.name, total)
+    if batch:
+        total += _insert_batch(connection, table, batch)
+        if progress:
+            progress(table.name, total)
+    return total
+
+
+def advance_sequences(connection, tables):
+    # the load gives explicit ids, which leaves each Postgres serial sequence at 1 and
+    # the next ordinary insert colliding with a seeded row
+    for table in tables:
+        if 'id' in table.c:
+            connection.execute(select(func.setval(func.pg_get_serial_sequence(table.name, 'id'), func.max(table.c.id))))
+    connection.commit()
+
+
+def _insert_batch(connection, table, batch):
+    connection.execute(insert(table), batch)
+    connection.commit()
+    return len(batch)
+
+
+@click.command("seed")
+@click.option("--customers", default=DEFAULT_SCALE['customers'], show_default=True)
+@click.option("--mechanics", default=DEFAULT_SCALE['mechanics'], show_default=True)
+@click.option("--part-descriptions", default=DEFAULT_SCALE['part_descriptions'], show_default=True)
+@click.option("--tickets", default=DEFAULT_SCALE['tickets'], show_default=True)
+@click.option("--serialized-parts", default=DEFAULT_SCALE['serialized_parts'], show_default=True)
+@click.option("--seed", default=0, show_default=True, help="Same seed and counts, same data.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+@click.option("--drop", is_flag=True, help="Drop and recreate every table first.")
+@with_appcontext
+def seed_command(seed, batch_size, drop, **scale):
+    """Fill the database with deterministic synthetic shop data."""
+    if drop:
+        db.drop_all()
+        db.create_all()
+    elif db.session.execute(select(func.count()).select_from(Customer)).scalar():
+        raise click.ClickException("The database already has data, pass --drop to replace it")
+    db.session.close()
+
+    current = [None]
+
+    def progress(table, rows):
+        # one line per table, rewritten in place as its batches go in
+        if current[0] not in (None, table):
+            click.echo()
+        current[0] = table
+        click.echo(f"\r{table}: {rows:,}", nl=False)
+
+    started = time.perf_counter()
+    counts = seed_database(scale, seed=seed, batch_size=batch_size, progress=progress)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    click.echo()
+    click.echo(f"Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
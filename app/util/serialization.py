@@ -0,0 +1,123 @@
+import datetime as dt
+import re
+from marshmallow import Schema, fields
+from marshmallow.utils import ensure_text_type
+from marshmallow_sqlalchemy.fields import Related, RelatedList
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, responses fall back to the stdlib encoder
+    orjson = None
+
+
+# field types compile_dump knows how to inline, as expression templates over the
+# attribute value v; each one reproduces that field's _serialize exactly
+def _number(field, num_type):
+    if field.as_string:
+        return None
+    return f'v if v.__class__ is {num_type} or v is None else {num_type}(v)'
+
+
+def _date(field):
+    if field.format not in (None, 'iso', 'iso8601'):
+        return None
+    return 'None if v is None else _date_isoformat(v)'
+
+
+def _related_ids(field):
+    # only single-column keys, which Related dumps as the bare value
+    if type(field.inner) is not Related or len(field.inner.related_keys) != 1:
+        return None
+    key = field.inner.related_keys[0].key
+    return f'None if v is None else [getattr(x, {key!r}, None) for x in v]'
+
+
+FIELD_EXPRESSIONS = {
+    fields.Integer: lambda field: _number(field, 'int'),
+    fields.Float: lambda field: _number(field, 'float'),
+    fields.String: lambda field: 'v if v.__class__ is str or v is None else _text(v)',
+    fields.Date: _date,
+    RelatedList: _related_ids,
+    fields.Raw: lambda field: 'v',
+}
+
+
+def compile_dump(schema):
+    """Build a flat obj -> dict function equivalent to schema.dump(obj) for one model instance.
+
+    The function is generated from the schema's dump fields, so it follows
+    only/exclude/load_only and data_key the same way marshmallow does, but reads
+    each attribute directly instead of dispatching through every field. Returns
+    None when the schema has dump hooks, a custom attribute getter, or a field
+    type not in FIELD_EXPRESSIONS; those keep using marshmallow.
+    """
+    if schema._hooks['pre_dump'] or schema._hooks['post_dump']:
+        return None
+    if type(schema).get_attribute is not Schema.get_attribute:
+        return None
+
+    lines = []
+    items = []
+    for i, (name, field) in enumerate(schema.dump_fields.items()):
+        template = FIELD_EXPRESSIONS.get(type(field))
+        expression = template(field) if template else None
+        attribute = field.attribute or name
+        if expression is None or not attribute.isidentifier():
+            return None
+        # loaded values straight from the instance dict, skipping the attribute
+        # descriptor; anything not loaded goes through it and loads as usual
+        lines.append(f'    v = d[{attribute!r}] if {attribute!r} in d else obj.{attribute}')
+        lines.append(f'    v{i} = {expression}')
+        key = field.data_key if field.data_key is not None else name
+        items.append(f'{key!r}: v{i}')
+
+    source = 'def dump(obj):\n    d = obj.__dict__\n' + '\n'.join(lines) + '\n    return {' + ', '.join(items) + '}\n'
+    namespace = {'_text': ensure_text_type, '_date_isoformat': dt.date.isoformat}
+    exec(compile(source, f'<compiled {type(schema).__name__}>', 'exec'), namespace)
+    return namespace['dump']
+
+
+# orjson writes these floats differently from repr() (1e16 vs 1e+16, 0.00001 vs
+# 1e-05); a string that happens to look like one only costs a stdlib fallback
+_REPR_MISMATCH = re.compile(rb'[\[:,]-?(?:\d+(?:\.\d+)?e-?\d+|0\.0000\d*)[\],}]')
+# dates and dataclasses go to Flask's default hook, which dumps them differently from orjson
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's default JSON provider, with compact responses encoded by orjson.
+
+    Response bodies are byte-for-byte what DefaultJSONProvider produces: dates,
+    Decimals and dataclasses go through the same default hook, and any payload
+    orjson would encode differently (non-ASCII text under ensure_ascii, floats
+    repr() writes with an exponent, non-string keys, huge ints) is re-encoded
+    with the stdlib. The one exception is NaN/Infinity, which orjson writes as
+    null where the stdlib writes invalid JSON. dumps() itself is unchanged.
+    """
+
+    def _fast_dumps(self, obj):
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if self.sort_keys else _ORJSON_OPTIONS
+        try:
+            data = orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return None
+        if self.ensure_ascii and (not data.isascii() or b'\x7f' in data):
+            return None
+        if _REPR_MISMATCH.search(data):
+            return None
+        return data
+
+    def response(self, *args, **kwargs):
+        # DefaultJSONProvider indents in debug mode, only compact output is fast-pathed
+        if not ((self.compact is None and self._app.debug) or self.compact is False):
+            data = self._fast_dumps(self._prepare_response_obj(args, kwargs))
+            if data is not None:
+                return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
+
+
+def init_json_provider(app):
+    # on unless JSON_ORJSON is False, and only when orjson is installed
+    if app.config.get('JSON_ORJSON', True) and orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,191 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import click
+from flask import current_app
+from flask_caching.backends.base import BaseCache
+from app.extensions import cache
+from app.util.files import create_private_file
+
+# reads only refresh an entry's LRU stamp when it is older than this, so hot keys
+# don't turn every cache hit into a write
+ACCESS_RESOLUTION = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_meta (id, entries, bytes) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_meta_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_meta SET entries = entries + 1, bytes = bytes + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_meta_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_meta SET entries = entries - 1, bytes = bytes - old.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_meta_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_meta SET bytes = bytes - old.size + new.size WHERE id = 1;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    """A cache shared by every worker on the host, stored in one SQLite file.
+
+    Entries are evicted least-recently-used first once the cache holds more than
+    max_bytes of pickled values or more than threshold entries. Entry and byte
+    totals are kept by triggers, so checking the caps never scans the table.
+
+    :param path: the SQLite file, created if missing, with mode 0600.
+    :param threshold: maximum number of entries, 0 for no limit.
+    :param max_bytes: maximum total size of the stored values, 0 for no limit.
+    """
+
+    def __init__(self, path, threshold=500, max_bytes=64 * 1024 * 1024, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+        create_private_file(path)
+        self._connect().executescript(SCHEMA)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        # in the app's instance folder by default, never a predictable path in a shared /tmp
+        path = config.get('CACHE_SQLITE_PATH')
+        if not path:
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = os.path.join(app.instance_path, 'cache.sqlite')
+        kwargs.update(
+            threshold=config['CACHE_THRESHOLD'],
+            max_bytes=config.get('CACHE_SQLITE_MAX_BYTES', 64 * 1024 * 1024),
+        )
+        return cls(path, *args, **kwargs)
+
+    def _connect(self):
+        # one connection per thread and per process, connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        # 0 means never expire
+        return time.time() + timeout if timeout else float('inf')
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+
+        if row is None or row[1] <= now:
+            if row is not None:
+                conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            self.misses += 1
+            return None
+
+        if now - row[2] > ACCESS_RESOLUTION:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=None):
+        # an upsert rather than INSERT OR REPLACE, whose implicit delete skips the triggers
+        return self._store(
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size',
+            key, value, timeout,
+        )
+
+    def add(self, key, value, timeout=None):
+        conn = self._connect()
+        conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, time.time()))
+        return self._store('ON CONFLICT (key) DO NOTHING', key, value, timeout)
+
+    def _store(self, on_conflict, key, value, timeout):
+        conn = self._connect()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        cursor = conn.execute(
+            f'INSERT INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) {on_conflict}',
+            (key, data, self._expires_at(timeout), time.time(), len(data)),
+        )
+        self._evict(conn)
+        return cursor.rowcount > 0
+
+    def _evict(self, conn):
+        entries, size = conn.execute('SELECT entries, bytes FROM cache_meta WHERE id = 1').fetchone()
+        over_entries = self.threshold and entries > self.threshold
+        over_bytes = self.max_bytes and size > self.max_bytes
+        if not (over_entries or over_bytes):
+            return
+
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        while True:
+            entries, size = conn.execute('SELECT entries, bytes FROM cache_meta WHERE id = 1').fetchone()
+            excess = entries - self.threshold if self.threshold else 0
+            if self.max_bytes and size > self.max_bytes:
+                # drop a tenth of the cache at a time rather than one row per round trip
+                excess = max(excess, entries // 10, 1)
+            if excess <= 0:
+                return
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,)
+            )
+
+    def delete(self, key):
+        cursor = self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def has(self, key):
+        row = self._connect().execute('SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+        return True
+
+    def stats(self):
+        """Shared size of the cache plus this worker's hit ratio."""
+        entries, size = self._connect().execute('SELECT entries, bytes FROM cache_meta WHERE id = 1').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+        }
+
+
+@click.command("cache-stats")
+def cache_stats_command():
+    """Show size and hit ratio of the configured cache backend."""
+    backend = cache.cache
+    if not hasattr(backend, 'stats'):
+        click.echo(f"{current_app.config['CACHE_TYPE']} does not report stats")
+        return
+
+    for name, value in backend.stats().items():
+        click.echo(f"{name}: {value}")
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from app.util.files import create_private_file
+
+# expired counters are deleted at most this often per worker, so keys from clients
+# that never come back don't accumulate
+COMPACT_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_counters_expires ON counters (expires);
+"""
+
+# one statement, so concurrent workers can't lose an increment; an expired
+# counter starts over with a new window
+INCR = """
+INSERT INTO counters (key, count, expires) VALUES (:key, :amount, :expires)
+ON CONFLICT (key) DO UPDATE SET
+    count = CASE WHEN expires <= :now THEN excluded.count ELSE count + excluded.count END,
+    expires = CASE WHEN expires <= :now THEN excluded.expires ELSE expires END
+RETURNING count
+"""
+
+
+class SQLiteLimiterStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters shared by every worker on the host, stored in one SQLite file.
+
+    Registered for sqlite:// storage URIs, e.g.
+    RATELIMIT_STORAGE_URI = 'sqlite:////var/run/mechanic_shop/ratelimit.sqlite'.
+    The file is created with mode 0600, anyone who can write it can reset limits.
+    Supports the fixed-window and sliding-window-counter strategies; a sliding
+    window hit reads both windows and increments in one IMMEDIATE transaction,
+    so the limit holds exactly however many processes share the file.
+
+    :param compact_interval: seconds between deletes of expired counters.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, compact_interval=COMPACT_INTERVAL, **options):
+        # sqlite:///relative.sqlite or sqlite:////absolute.sqlite, as for SQLAlchemy
+        self.path = (uri or '').partition('://')[2][1:]
+        if not self.path:
+            raise ValueError("SQLite rate limit storage needs a file, e.g. sqlite:////path/to/ratelimit.sqlite")
+        self.compact_interval = float(compact_interval)
+        self._next_compaction = 0.0
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        # the default is in the instance folder, which a fresh checkout doesn't have yet
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        create_private_file(self.path)
+        self._connect().executescript(SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self):
+        # one connection per thread and per process, connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _incr(self, conn, key, expiry, amount, now):
+        if now >= self._next_compaction:
+            self._next_compaction = now + self.compact_interval
+            conn.execute('DELETE FROM counters WHERE expires <= ?', (now,))
+        params = {'key': key, 'amount': amount, 'expires': now + expiry, 'now': now}
+        return conn.execute(INCR, params).fetchone()[0]
+
+    def _get(self, conn, key, now):
+        row = conn.execute('SELECT count FROM counters WHERE key = ? AND expires > ?', (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key, expiry, amount=1):
+        return self._incr(self._connect(), key, expiry, amount, time.time())
+
+    def get(self, key):
+        return self._get(self._connect(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT expires FROM counters WHERE key = ? AND expires > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def clear(self, key):
+        self._connect().execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    def check(self):
+        try:
+            self._connect().execute('SELECT 1').fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def reset(self):
+        return self._connect().execute('DELETE FROM counters').rowcount
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(
+                conn, previous_key, current_key, expiry, now)
+            allowed = floor(previous_count * previous_ttl / expiry + current_count) + amount <= limit
+            if allowed:
+                # the current window is still weighted in while it is the previous one
+                self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window(self._connect(), previous_key, current_key, expiry, now)
+
+    def _sliding_window(self, conn, previous_key, current_key, expiry, now):
+        # same weighting as limits' own storages: the previous window counts for the
+        # part of it still inside the sliding window
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
@@ -0,0 +1,51 @@
+from flask import Response, request, current_app, jsonify, stream_with_context
+from app.models import db
+from app.util.pagination import decode_cursor, PaginationError
+
+STREAM_CHUNK_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def get_stream_format():
+    fmt = request.args.get('stream')
+    if fmt is None and request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        fmt = 'ndjson'
+    return fmt
+
+
+def stream_collection(query, key_column, schema, fmt):
+    """Stream every row of query as a JSON array or NDJSON.
+
+    Rows are fetched yield_per chunks at a time and dumped one chunk at a time,
+    so memory stays flat however big the table gets.
+    """
+    if fmt not in ('json', 'ndjson'):
+        return jsonify({"error": "stream must be 'json' or 'ndjson'"}), 400
+
+    if request.args.get('after'):
+        try:
+            query = query.where(key_column > decode_cursor(request.args['after']))
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
+
+    chunk_size = current_app.config.get('STREAM_CHUNK_SIZE', STREAM_CHUNK_SIZE)
+    query = query.order_by(key_column).execution_options(yield_per=chunk_size)
+    dumps = current_app.json.dumps
+
+    def generate():
+        result = db.session.execute(query).scalars()
+
+        if fmt == 'ndjson':
+            for partition in result.partitions():
+                yield ''.join(dumps(row) + '\n' for row in schema.dump(partition))
+            return
+
+        yield '['
+        separator = ''
+        for partition in result.partitions():
+            yield separator + ','.join(dumps(row) for row in schema.dump(partition))
+            separator = ','
+        yield ']'
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,6 @@
+from app.asgi import AsyncReadApp
+from run import app
+
+# gunicorn run:app serves everything synchronously; to serve the read routes on
+# asyncio instead: gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+application = AsyncReadApp(app)
@@ -0,0 +1,277 @@
+"""Latency, queries and peak memory of every GET route against a seeded database.
+
+    python -m benchmarks.endpoints --customers 100000 --tickets 500000 --serialized-parts 1000000
+    python -m benchmarks.endpoints --requests 200 --output after.json --compare before.json
+
+Requests go through the Flask test client with BenchmarkConfig (its own
+database, no response cache, no rate limits). The database is seeded once per
+scale and reused by later runs; --reseed starts it over. Each route is timed
+over --requests requests, then run a few more times under tracemalloc for its
+peak memory, since tracing would skew the timings.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import event, func, inspect, select
+from app import create_app
+from app.models import db, Customer, Mechanic, PartDescription, ServiceTicket, SerializedPart
+from app.util.seed import seed_database, DEFAULT_SCALE, FIRST_SERVICE_DATE, PART_NAMES, BRANDS
+
+SCALE_MODELS = {
+    'customers': Customer,
+    'mechanics': Mechanic,
+    'part_descriptions': PartDescription,
+    'tickets': ServiceTicket,
+    'serialized_parts': SerializedPart,
+}
+MEMORY_REQUESTS = 5
+WARMUP_REQUESTS = 3
+
+# URLs to request for each endpoint, as (label, make_url(rng, scale)); every GET
+# route must be listed here or in SKIPPED so new routes don't go unmeasured
+ROUTES = {
+    'customers_bp.get_customers': [
+        ('first page', lambda rng, n: '/customers/'),
+        ('deep page', lambda rng, n: f'/customers/?page={rng.randint(1, max(1, n["customers"] // 25))}'),
+    ],
+    'customers_bp.get_customer': [('by id', lambda rng, n: f'/customers/{rng.randint(1, n["customers"])}')],
+    'customers_bp.get_most_valuable': [('top 10', lambda rng, n: '/customers/most-valuable')],
+    'customers_bp.search_customer': [
+        ('email fragment', lambda rng, n: f'/customers/search?q=customer{rng.randint(1, n["customers"])}@'),
+    ],
+    'mechanics_bp.get_mechanics': [('first page', lambda rng, n: '/mechanics/')],
+    'mechanics_bp.get_mechanic': [('by id', lambda rng, n: f'/mechanics/{rng.randint(1, n["mechanics"])}')],
+    'mechanics_bp.get_leaderboard': [
+        ('one month', lambda rng, n: '/mechanics/leaderboard?' + date_range(month(rng) + '-01', days=30)),
+    ],
+    'service_tickets_bp.get_service_tickets': [('first page', lambda rng, n: '/service-tickets/')],
+    'service_tickets_bp.get_service_ticket': [
+        ('by id', lambda rng, n: f'/service-tickets/{rng.randint(1, n["tickets"])}'),
+    ],
+    'service_tickets_bp.get_invoice': [
+        ('by id', lambda rng, n: f'/service-tickets/{rng.randint(1, n["tickets"])}/invoice'),
+    ],
+    'service_tickets_bp.get_invoices': [
+        ('one day', lambda rng, n: '/service-tickets/invoices?' + date_range(day(rng), days=0)),
+        ('100 ids', lambda rng, n: '/service-tickets/invoices?ids='
+         + ','.join(str(rng.randint(1, n['tickets'])) for _ in range(100))),
+    ],
+    'part_descriptions_bp.get_part_descriptions': [('first page', lambda rng, n: '/part-descriptions/')],
+    'part_descriptions_bp.get_part_description': [
+        ('by id', lambda rng, n: f'/part-descriptions/{rng.randint(1, n["part_descriptions"])}'),
+    ],
+    'part_descriptions_bp.search_by_part_name': [
+        ('name', lambda rng, n: f'/part-descriptions/search?q={rng.choice(PART_NAMES).split()[0].lower()}'),
+        ('typo', lambda rng, n: '/part-descriptions/search?q=alternater'),
+        ('brand and price', lambda rng, n: f'/part-descriptions/search?brand={rng.choice(BRANDS)}&max_price=50'),
+    ],
+    'serialized_parts_bp.get_serialized_parts': [('first page', lambda rng, n: '/serialized-parts/')],
+    'serialized_parts_bp.get_serialized_part': [
+        ('by id', lambda rng, n: f'/serialized-parts/{rng.randint(1, n["serialized_parts"])}'),
+    ],
+    'serialized_parts_bp.get_individual_stock': [
+        ('by id', lambda rng, n: f'/serialized-parts/stock/{rng.randint(1, n["part_descriptions"])}'),
+    ],
+    'serialized_parts_bp.get_bulk_stock': [
+        ('100 ids', lambda rng, n: '/serialized-parts/stock?ids='
+         + ','.join(str(rng.randint(1, n['part_descriptions'])) for _ in range(100))),
+    ],
+}
+
+SKIPPED = {
+    'static': 'static files',
+    'swagger_ui.show': 'API docs',
+    # these sort every row in Python by a relationship the models don't have
+    'part_descriptions_bp.get_most_valuable': 'loads every part description, then fails',
+    'serialized_parts_bp.get_most_valuable': 'loads every serialized part, then fails',
+}
+
+
+def month(rng):
+    return f'{FIRST_SERVICE_DATE.year + rng.randrange(3)}-{rng.randint(1, 12):02d}'
+
+
+def day(rng):
+    return f'{month(rng)}-{rng.randint(1, 28):02d}'
+
+
+def date_range(start, days):
+    end = date.fromisoformat(start) + timedelta(days=days)
+    return f'start={start}&end={end.isoformat()}'
+
+
+class QueryCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def prepare_database(app, scale, seed, reseed):
+    with app.app_context():
+        if not reseed and seeded_scale() == scale:
+            print(f'Reusing the seeded database ({db.engine.url})')
+            return
+
+        print(f'Seeding {db.engine.url} ...')
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        counts = seed_database(scale, seed=seed)
+        print(f'Seeded {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s')
+
+
+def seeded_scale():
+    if not inspect(db.engine).has_table(Customer.__tablename__):
+        return None
+    return {
+        table: db.session.execute(select(func.count()).select_from(model)).scalar()
+        for table, model in SCALE_MODELS.items()
+    }
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+def measure(app, client, urls):
+    timings = []
+    queries = 0
+    statuses = {}
+
+    with app.app_context():
+        engine = db.engine
+    for url in urls[:WARMUP_REQUESTS]:
+        client.get(url).get_data()
+
+    with QueryCounter(engine) as counter:
+        for url in urls:
+            started = time.perf_counter()
+            response = client.get(url)
+            response.get_data()
+            timings.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        queries = counter.count
+
+    peak = 0
+    tracemalloc.start()
+    for url in urls[:MEMORY_REQUESTS]:
+        tracemalloc.reset_peak()
+        client.get(url).get_data()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'requests': len(urls),
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'queries_per_request': round(queries / len(urls), 2),
+        'peak_memory_kib': round(peak / 1024, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline):
+    print(f"\n{'route':<58}{'p50 ms':>16}{'p95 ms':>16}{'queries':>12}")
+    for name, result in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f"{name:<58}{result['p50_ms']:>16}{result['p95_ms']:>16}{result['queries_per_request']:>12}  (new)")
+            continue
+
+        def delta(key):
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0
+            return f"{result[key]} {change:+.0f}%"
+
+        print(f"{name:<58}{delta('p50_ms'):>16}{delta('p95_ms'):>16}{delta('queries_per_request'):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for table, default in DEFAULT_SCALE.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, default=default, dest=table)
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the data and the requests')
+    parser.add_argument('--reseed', action='store_true', help='drop and reseed the benchmark database')
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route')
+    parser.add_argument('--only', help='only routes whose endpoint contains this')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    scale = {table: getattr(args, table) for table in DEFAULT_SCALE}
+    app = create_app('BenchmarkConfig')
+    prepare_database(app, scale, args.seed, args.reseed)
+    client = app.test_client()
+    rng = random.Random(args.seed)
+
+    unlisted = {
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if 'GET' in rule.methods and rule.endpoint not in ROUTES and rule.endpoint not in SKIPPED
+    }
+    if unlisted:
+        parser.error(f"GET routes with no benchmark URLs: {', '.join(sorted(unlisted))}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'database': app.config['SQLALCHEMY_DATABASE_URI'],
+            'scale': scale,
+            'seed': args.seed,
+        },
+        'routes': {},
+        'skipped': SKIPPED,
+    }
+
+    for endpoint, variants in ROUTES.items():
+        if args.only and args.only not in endpoint:
+            continue
+        for label, make_url in variants:
+            name = f'{endpoint} [{label}]'
+            urls = [make_url(rng, scale) for _ in range(args.requests)]
+            result = measure(app, client, urls)
+            results['routes'][name] = result
+            print(f"{name:<58} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+                  f"p99 {result['p99_ms']:>9.2f}ms  {result['queries_per_request']:>5} queries  "
+                  f"{result['peak_memory_kib']:>9.1f} KiB")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nWrote {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
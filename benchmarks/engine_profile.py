@@ -0,0 +1,118 @@
+"""Concurrent read/write throughput of SQLite with and without the production pragmas.
+
+    python -m benchmarks.engine_profile --seconds 5 --readers 8 --writers 2
+
+Each profile gets a fresh database file seeded with customers. Reader threads
+fetch random customers, writer threads insert service tickets, each operation
+in its own transaction, for the same wall-clock time.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from app.models import Base, Customer, ServiceTicket
+from app.util.engine import set_sqlite_pragmas
+from config import SQLITE_PRODUCTION_PRAGMAS
+
+PROFILES = {
+    'default': {},
+    'production': SQLITE_PRODUCTION_PRAGMAS,
+}
+
+
+def make_engine(path, pragmas, pool_size):
+    engine = create_engine(f'sqlite:///{path}', pool_size=pool_size, max_overflow=0)
+    if pragmas:
+        set_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def seed(engine, customers):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [
+            {'name': f'customer {i}', 'email': f'customer{i}@example.com', 'phone': '555-0100'}
+            for i in range(customers)
+        ])
+
+
+def run_profile(name, pragmas, seconds, readers, writers, customers):
+    path = os.path.join(tempfile.mkdtemp(), f'{name}.sqlite')
+    engine = make_engine(path, pragmas, readers + writers)
+    seed(engine, customers)
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def read():
+        done = 0
+        while time.perf_counter() < deadline:
+            with engine.connect() as conn:
+                conn.execute(select(Customer).where(Customer.id == random.randint(1, customers))).first()
+            done += 1
+        with lock:
+            counts['reads'] += done
+
+    def write():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(ServiceTicket).values(
+                        service_date=date.today(), VIN='1HGCM82633A123456', service_desc='benchmark',
+                        customer_id=random.randint(1, customers),
+                    ))
+                done += 1
+            except OperationalError:
+                errors += 1  # database is locked
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads += [threading.Thread(target=write) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        'profile': name,
+        'reads_per_sec': round(counts['reads'] / seconds),
+        'writes_per_sec': round(counts['writes'] / seconds),
+        'write_errors': counts['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = [
+        run_profile(name, pragmas, args.seconds, args.readers, args.writers, args.customers)
+        for name, pragmas in PROFILES.items()
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'errors':>8}")
+    for result in results:
+        print(f"{result['profile']:<12}{result['reads_per_sec']:>10}{result['writes_per_sec']:>10}{result['write_errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Per-request rate limiter overhead, in-process memory vs the host-shared SQLite storage.
+
+    python -m benchmarks.limiter --requests 5000 --workers 4
+
+For each storage and strategy: the cost of one limit check and hit on its own,
+and the added latency of a Flask request through Flask-Limiter against the same
+app with no limiter. Then worker processes hammer one shared key to show that
+the SQLite storage holds the limit exactly across processes while memory://
+lets each worker through on its own.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from app.util import sqlite_limiter  # registers the sqlite:// storage scheme
+
+STRATEGY_NAMES = ['fixed-window', 'sliding-window-counter']
+
+
+def storage_uris():
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.sqlite')
+    return {'memory': 'memory://', 'sqlite': f'sqlite:///{path}'}
+
+
+def time_hits(uri, strategy, hits):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    limit = parse(f'{hits * 10}/hour')
+    start = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(limit, f'client {i % 100}')
+    return (time.perf_counter() - start) / hits * 1e6
+
+
+def make_app(uri=None, strategy=None):
+    app = Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return 'ok'
+
+    if uri:
+        app.config.update(RATELIMIT_STORAGE_URI=uri, RATELIMIT_STRATEGY=strategy)
+        Limiter(get_remote_address, app=app, default_limits=['1000000/hour'])
+    return app
+
+
+def time_requests(app, requests, repeat=3):
+    # best of a few runs, the differences measured are smaller than the run-to-run noise
+    client = app.test_client()
+    client.get('/')
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/')
+        timings.append((time.perf_counter() - start) / requests * 1e6)
+    return min(timings)
+
+
+def _worker(uri, strategy, limit, hits, results):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    start = time.perf_counter()
+    allowed = sum(limiter.hit(parse(limit), 'shared client') for _ in range(hits))
+    results.put((allowed, time.perf_counter() - start))
+
+
+def run_workers(uri, strategy, workers, hits):
+    # the limit is half of what the workers try, so every worker runs into it
+    limit = workers * hits // 2
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_worker, args=(uri, strategy, f'{limit}/hour', hits, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    elapsed = max(seconds for _, seconds in outcomes)
+    return {
+        'limit': limit,
+        'allowed': sum(allowed for allowed, _ in outcomes),
+        'hits_per_sec': round(workers * hits / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hits', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    baseline = time_requests(make_app(), args.requests)
+    results = []
+    for strategy in STRATEGY_NAMES:
+        for storage, uri in storage_uris().items():
+            result = {
+                'storage': storage,
+                'strategy': strategy,
+                'hit_us': round(time_hits(uri, strategy, args.hits), 1),
+                'request_overhead_us': round(time_requests(make_app(uri, strategy), args.requests) - baseline, 1),
+            }
+            result.update(run_workers(uri, strategy, args.workers, args.hits // args.workers))
+            results.append(result)
+
+    if args.json:
+        print(json.dumps({'baseline_request_us': round(baseline, 1), 'results': results}, indent=2))
+        return
+    print(f'request without a limiter: {baseline:.1f}us')
+    print(f"{'storage':<8}{'strategy':<24}{'hit us':>8}{'req +us':>9}{'limit':>8}{'allowed':>9}{'hits/s':>9}")
+    for r in results:
+        print(f"{r['storage']:<8}{r['strategy']:<24}{r['hit_us']:>8}{r['request_overhead_us']:>9}"
+              f"{r['limit']:>8}{r['allowed']:>9}{r['hits_per_sec']:>9}")
+
+
+if __name__ == '__main__':
+    main()
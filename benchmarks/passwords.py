@@ -0,0 +1,98 @@
+"""Login throughput and the latency of other requests during a login burst.
+
+    python -m benchmarks.passwords --seconds 5 --logins 16
+
+--logins threads check passwords back to back, as a shift's worth of mechanics
+logging in at once would, while one more thread serves a cheap JSON request in
+a loop. Each mode runs for the same wall-clock time: hashing inline in the
+request thread, then in a process pool of one worker per core at its default
+queue depth.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from app.util.passwords import password_hasher, PasswordHasherBusy, DEFAULT_HASH_METHOD
+
+MODES = {
+    'inline': {'PASSWORD_HASH_WORKERS': 0},
+    'pool': {'PASSWORD_HASH_WORKERS': os.cpu_count() or 1},
+}
+PAYLOAD = [{'id': i, 'name': f'customer {i}', 'email': f'customer{i}@example.com'} for i in range(100)]
+
+
+def run_mode(name, config, pwhash, seconds, logins):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=DEFAULT_HASH_METHOD, **config)
+    counts = {'logins': 0, 'busy': 0}
+    latencies = []
+    lock = threading.Lock()
+
+    with app.app_context():
+        password_hasher.verify(pwhash, 'password')  # start the pool outside the timing
+    deadline = time.perf_counter() + seconds
+
+    def login():
+        done = busy = 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                try:
+                    password_hasher.verify(pwhash, 'password')
+                    done += 1
+                except PasswordHasherBusy:
+                    busy += 1
+                    time.sleep(0.01)
+        with lock:
+            counts['logins'] += done
+            counts['busy'] += busy
+
+    def other_request():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            json.dumps(PAYLOAD)
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    threads.append(threading.Thread(target=other_request))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'mode': name,
+        'logins_per_sec': round(counts['logins'] / seconds, 1),
+        'refused': counts['busy'],
+        'other_p50_ms': round(statistics.median(latencies), 3),
+        'other_p99_ms': round(latencies[int(len(latencies) * 0.99)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--logins', type=int, default=16, help='concurrent login threads')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    pwhash = generate_password_hash('password', DEFAULT_HASH_METHOD)
+    results = [run_mode(name, config, pwhash, args.seconds, args.logins) for name, config in MODES.items()]
+    password_hasher.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{os.cpu_count()} cores, {args.logins} login threads")
+    print(f"{'mode':<8}{'logins/s':>10}{'refused':>9}{'other p50 ms':>14}{'other p99 ms':>14}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['logins_per_sec']:>10}{r['refused']:>9}{r['other_p50_ms']:>14}{r['other_p99_ms']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Serialization time of 1,000-row pages, marshmallow + stdlib json against compiled dumps + orjson.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+
+Rows come from the benchmark database (seeded as in benchmarks.endpoints) and
+are loaded once per schema with its loader options, so only dumping and
+encoding are timed. The baseline is what every list endpoint did before:
+Schema.dump through each field, then Flask's default JSON provider.
+"""
+import argparse
+import json
+import statistics
+import time
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema
+from sqlalchemy import select
+from app import create_app
+from app.models import db, Customer, Mechanic, PartDescription, ServiceTicket, SerializedPart
+from app.blueprints.customers.schemas import customers_schema, customer_load_options
+from app.blueprints.mechanics.schemas import mechanics_schema, mechanic_load_options
+from app.blueprints.part_descriptions.schemas import part_descriptions_schema, part_description_load_options
+from app.blueprints.serialized_parts.schemas import serialized_parts_schema, serialized_part_load_options
+from app.blueprints.service_tickets.schemas import service_tickets_schema, service_ticket_load_options
+from app.util.seed import DEFAULT_SCALE
+from app.util.serialization import OrjsonProvider
+from benchmarks.endpoints import prepare_database
+
+SCHEMAS = {
+    'customers': (customers_schema, Customer, customer_load_options),
+    'mechanics': (mechanics_schema, Mechanic, mechanic_load_options),
+    'part_descriptions': (part_descriptions_schema, PartDescription, part_description_load_options),
+    'serialized_parts': (serialized_parts_schema, SerializedPart, serialized_part_load_options),
+    'service_tickets': (service_tickets_schema, ServiceTicket, service_ticket_load_options),
+}
+
+
+def best_of(repeat, f):
+    # the median, so one GC pause doesn't decide the result
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        f()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def run_schema(app, name, rows, repeat):
+    schema, _, _ = SCHEMAS[name]
+    default = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+
+    baseline = default.response(Schema.dump(schema, rows, many=True)).get_data()
+    compiled = fast.response(schema.dump(rows, many=True)).get_data()
+    assert compiled == baseline, f'{name}: compiled output differs from marshmallow'
+
+    timings = {
+        'marshmallow_dump_ms': best_of(repeat, lambda: Schema.dump(schema, rows, many=True)),
+        'compiled_dump_ms': best_of(repeat, lambda: schema.dump(rows, many=True)),
+        'baseline_total_ms': best_of(repeat, lambda: default.response(Schema.dump(schema, rows, many=True))),
+        'fast_total_ms': best_of(repeat, lambda: fast.response(schema.dump(rows, many=True))),
+    }
+    result = {'schema': name, 'rows': len(rows), 'bytes': len(baseline)}
+    result.update({key: round(value, 3) for key, value in timings.items()})
+    result['speedup'] = round(timings['baseline_total_ms'] / timings['fast_total_ms'], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='rows per page')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    app = create_app('BenchmarkConfig')
+    prepare_database(app, DEFAULT_SCALE, seed=0, reseed=False)
+
+    results = []
+    with app.app_context():
+        for name, (_, model, load_options) in SCHEMAS.items():
+            rows = db.session.execute(
+                select(model).options(*load_options).order_by(model.id).limit(args.rows)
+            ).scalars().all()
+            results.append(run_schema(app, name, rows, args.repeat))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'schema':<20}{'rows':>6}{'marshmallow':>13}{'compiled':>10}{'baseline':>10}{'fast':>8}{'speedup':>9}")
+    for r in results:
+        print(f"{r['schema']:<20}{r['rows']:>6}{r['marshmallow_dump_ms']:>11.2f}ms{r['compiled_dump_ms']:>8.2f}ms"
+              f"{r['baseline_total_ms']:>8.2f}ms{r['fast_total_ms']:>6.2f}ms{r['speedup']:>8}x")
+
+
+if __name__ == '__main__':
+    main()
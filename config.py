@@ -1,11 +1,28 @@
 import os
 
+# the app's instance folder (Flask's default for this package), for files that
+# belong to this deployment rather than in a shared /tmp
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+# SQLite tuned for a web server: readers and the writer don't block each other (WAL),
+# commits skip the fsync WAL doesn't need for durability against app crashes, and
+# writers wait for the lock instead of failing with "database is locked"
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative is KiB, so 64 MiB per connection
+}
+
 class DevelopmentConfig:
     SQLALCHEMY_DATABASE_URI = 'sqlite:///mechanic_shop.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = True
     CACHE_TYPE = 'SimpleCache'  
     CACHE_DEFAULT_TIMEOUT = '300'  # 5 minutes
+    # Server-Timing headers and per-request timing logs, SERVER_TIMING=1 to turn on
+    SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
 
 class TestingConfig:
    SQLALCHEMY_DATABASE_URI = 'sqlite:///testing.db'
@@ -14,5 +31,46 @@ class TestingConfig:
 
 class ProductionConfig:
     SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///mechanic_shop.db'
-    CACHE_TYPE = 'SimpleCache'
+    # server databases: a pool per worker, connections checked before use and recycled
+    # before the server's idle timeout drops them
+    SQLALCHEMY_ENGINE_OPTIONS = {} if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800),
+    }
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    # one cache file shared by every gunicorn worker on the host, set CACHE_TYPE=SimpleCache to opt out
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'app.util.sqlite_cache.SQLiteCache'
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')  # default: cache.sqlite in the instance folder
+    CACHE_SQLITE_MAX_BYTES = int(os.environ.get('CACHE_SQLITE_MAX_BYTES') or 64 * 1024 * 1024)
+    CACHE_THRESHOLD = 100000
+    CACHE_DEFAULT_TIMEOUT = 3600  # entity GETs are invalidated on write, so they can live long
+    # rate limit counters shared by every worker on the host too, or limits are per worker;
+    # RATELIMIT_STORAGE_URI=memory:// to opt out
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or (
+        'sqlite:///' + os.path.join(INSTANCE_PATH, 'ratelimit.sqlite')
+    )
+    RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY') or 'sliding-window-counter'
+    # read /customers/most-valuable from customer_ticket_counts (run `flask rebuild-ticket-counts` first)
+    CUSTOMER_TICKET_ROLLUP = os.environ.get('CUSTOMER_TICKET_ROLLUP') == '1'
+    SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
+    INVOICE_LABOR_RATE = float(os.environ.get('INVOICE_LABOR_RATE') or 95.0)  # per mechanic on a ticket
+    # raising the cost here rehashes each mechanic's password at their next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # hashes run inline unless this is set; a pool per server process only pays off with
+    # threaded/async workers, see PasswordHasher
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 4 * PASSWORD_HASH_WORKERS)
 
+
+class BenchmarkConfig:
+    # benchmarks/endpoints.py, a separate database so seeding can't touch dev data
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URI') or 'sqlite:///benchmark.db'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    # measure the database path rather than cache hits, and never rate limit the load
+    CACHE_TYPE = 'NullCache'
+    RATELIMIT_ENABLED = False
+    CUSTOMER_TICKET_ROLLUP = os.environ.get('CUSTOMER_TICKET_ROLLUP') == '1'
@@ -0,0 +1,74 @@
+"""query plan indexes
+
+An index for every filter and join the routes run (see `flask db-audit`).
+Some of them db.create_all() already made on newer databases, so each one is
+only created if it is missing.
+
+Revision ID: 3c9d2e7a4b18
+Revises: 861e1679dde6
+Create Date: 2026-10-18 08:41:37.102518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d2e7a4b18'
+down_revision = '861e1679dde6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_tickets', schema=None) as batch_op:
+        # date range reports (invoices, mechanic workload)
+        batch_op.create_index('ix_service_tickets_service_date', ['service_date'], unique=False, if_not_exists=True)
+        # a customer's tickets, loaded with every customer payload
+        batch_op.create_index('ix_service_tickets_customer', ['customer_id'], unique=False, if_not_exists=True)
+        # the one-ticket-per-VIN-per-day check on update
+        batch_op.create_index('ix_service_tickets_vin_date', ['VIN', 'service_date'], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('serialized_parts', schema=None) as batch_op:
+        # free units of a description, in the order reservations take them
+        batch_op.create_index('ix_serialized_parts_free', ['desc_id', 'id'], unique=False, if_not_exists=True,
+                              sqlite_where=sa.text('ticket_id IS NULL'), postgresql_where=sa.text('ticket_id IS NULL'))
+        # parts on a ticket, for invoices
+        batch_op.create_index('ix_serialized_parts_ticket', ['ticket_id'], unique=False, if_not_exists=True)
+        # every unit of a description, free or not, loaded with description payloads
+        batch_op.create_index('ix_serialized_parts_desc', ['desc_id'], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('service_mechanic', schema=None) as batch_op:
+        # workload reads go ticket -> mechanic, ticket listings on a mechanic go the other way
+        batch_op.create_index('ix_service_mechanic_ticket', ['ticket_id', 'mechanic_id'], unique=False, if_not_exists=True)
+        batch_op.create_index('ix_service_mechanic_mechanic', ['mechanic_id', 'ticket_id'], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('customer_ticket_counts', schema=None) as batch_op:
+        # ranking reads walk this index from the highest count down
+        batch_op.create_index('ix_customer_ticket_counts_rank', ['ticket_count', 'customer_id'], unique=False,
+                              if_not_exists=True)
+
+    # the case-insensitive brand filter on catalog search
+    op.create_index('ix_part_descriptions_brand', 'part_descriptions', [sa.text('lower(brand)')], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_part_descriptions_brand', table_name='part_descriptions', if_exists=True)
+
+    with op.batch_alter_table('customer_ticket_counts', schema=None) as batch_op:
+        batch_op.drop_index('ix_customer_ticket_counts_rank', if_exists=True)
+
+    with op.batch_alter_table('service_mechanic', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_mechanic_mechanic', if_exists=True)
+        batch_op.drop_index('ix_service_mechanic_ticket', if_exists=True)
+
+    with op.batch_alter_table('serialized_parts', schema=None) as batch_op:
+        batch_op.drop_index('ix_serialized_parts_desc', if_exists=True)
+        batch_op.drop_index('ix_serialized_parts_ticket', if_exists=True)
+        batch_op.drop_index('ix_serialized_parts_free', if_exists=True)
+
+    with op.batch_alter_table('service_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_tickets_vin_date', if_exists=True)
+        batch_op.drop_index('ix_service_tickets_customer', if_exists=True)
+        batch_op.drop_index('ix_service_tickets_service_date', if_exists=True)
@@ -0,0 +1,163 @@
+"""initial schema
+
+Every table as db.create_all() has been making them, so databases created that
+way upgrade in place: tables that already exist are left alone. The rollup
+tables are recounted from the tables they summarize, and on SQLite the full-text
+indexes are created and filled, since a database older than them has neither.
+
+Revision ID: 861e1679dde6
+Revises: 
+Create Date: 2026-10-18 08:20:12.457294
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '861e1679dde6'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('customers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=320), nullable=False),
+    sa.Column('phone', sa.String(length=16), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    if_not_exists=True
+    )
+    op.create_table('mechanics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=320), nullable=False),
+    sa.Column('salary', sa.Float(), nullable=False),
+    sa.Column('password', sa.String(length=255), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    if_not_exists=True
+    )
+    op.create_table('part_descriptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('part_name', sa.String(length=255), nullable=False),
+    sa.Column('brand', sa.String(length=255), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('customer_ticket_counts',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('ticket_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('customer_id'),
+    if_not_exists=True
+    )
+    op.create_table('part_stock_counts',
+    sa.Column('desc_id', sa.Integer(), nullable=False),
+    sa.Column('on_hand', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['desc_id'], ['part_descriptions.id'], ),
+    sa.PrimaryKeyConstraint('desc_id'),
+    if_not_exists=True
+    )
+    op.create_table('service_tickets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('service_date', sa.Date(), nullable=False),
+    sa.Column('VIN', sa.String(length=17), nullable=False),
+    sa.Column('service_desc', sa.String(length=500), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('serialized_parts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('desc_id', sa.Integer(), nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['desc_id'], ['part_descriptions.id'], ),
+    sa.ForeignKeyConstraint(['ticket_id'], ['service_tickets.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('service_mechanic',
+    sa.Column('ticket_id', sa.Integer(), nullable=True),
+    sa.Column('mechanic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['mechanic_id'], ['mechanics.id'], ),
+    sa.ForeignKeyConstraint(['ticket_id'], ['service_tickets.id'], ),
+    if_not_exists=True
+    )
+
+    backfill_rollups()
+
+    # the SQLite full-text indexes are kept out of autogenerate (include_in_migrations);
+    # the same DDL as app.util.search.FullTextIndex, written out so this revision
+    # doesn't change when the app does
+    if op.get_bind().dialect.name == 'sqlite':
+        for name, source, columns in FULL_TEXT_INDEXES:
+            create_full_text_index(name, source, columns)
+
+
+# (index, content table, columns)
+FULL_TEXT_INDEXES = [
+    ('customers_fts', 'customers', ['name', 'email', 'phone']),
+    ('part_descriptions_fts', 'part_descriptions', ['part_name', 'brand']),
+]
+
+
+def create_full_text_index(name, source, columns):
+    # external-content FTS5 table, kept in sync by triggers and filled from what is there
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete_old = f"INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert_new = f"INSERT INTO {name} (rowid, {cols}) VALUES (new.id, {new});"
+    op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+               f"{cols}, content='{source}', content_rowid='id', tokenize='trigram')")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {source} BEGIN {insert_new} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {source} BEGIN {delete_old} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE ON {source} BEGIN {delete_old} {insert_new} END")
+    op.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def backfill_rollups():
+    # recounted rather than filled only when empty, a count is never wrong to redo
+    customers = sa.table('customers', sa.column('id'))
+    service_tickets = sa.table('service_tickets', sa.column('id'), sa.column('customer_id'))
+    serialized_parts = sa.table('serialized_parts', sa.column('id'), sa.column('desc_id'), sa.column('ticket_id'))
+    part_descriptions = sa.table('part_descriptions', sa.column('id'))
+    ticket_counts = sa.table('customer_ticket_counts', sa.column('customer_id'), sa.column('ticket_count'))
+    stock_counts = sa.table('part_stock_counts', sa.column('desc_id'), sa.column('on_hand'))
+
+    op.execute(ticket_counts.delete())
+    # every customer and every description gets a row, later writes only update them
+    op.execute(ticket_counts.insert().from_select(
+        ['customer_id', 'ticket_count'],
+        sa.select(customers.c.id, sa.func.count(service_tickets.c.id))
+        .select_from(customers.outerjoin(service_tickets, service_tickets.c.customer_id == customers.c.id))
+        .group_by(customers.c.id),
+    ))
+    op.execute(stock_counts.delete())
+    op.execute(stock_counts.insert().from_select(
+        ['desc_id', 'on_hand'],
+        sa.select(part_descriptions.c.id, sa.func.count(serialized_parts.c.id))
+        .select_from(part_descriptions.outerjoin(serialized_parts, sa.and_(
+            serialized_parts.c.desc_id == part_descriptions.c.id, serialized_parts.c.ticket_id.is_(None))))
+        .group_by(part_descriptions.c.id),
+    ))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for name, _, _ in FULL_TEXT_INDEXES:
+            op.execute(f'DROP TABLE IF EXISTS {name}')
+    op.drop_table('service_mechanic')
+    op.drop_table('serialized_parts')
+    op.drop_table('service_tickets')
+    op.drop_table('part_stock_counts')
+    op.drop_table('customer_ticket_counts')
+    op.drop_table('part_descriptions')
+    op.drop_table('mechanics')
+    op.drop_table('customers')
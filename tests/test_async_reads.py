@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import unittest
+from datetime import date
+from app import create_app
+from app.asgi import AsyncReadApp, scope_environ
+from app.extensions import cache
+from app.util.instrumentation import init_instrumentation
+from app.models import db, Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart
+
+# every read route with an async view, compared against the Flask view
+ASYNC_URLS = [
+    '/customers/',
+    '/customers/?per_page=2',
+    '/customers/1',
+    '/customers/99',
+    '/customers/search?q=customer',
+    '/customers/?fields=id,phone',
+    '/customers/1?fields=tickets',
+    '/customers/1?fields=nope',
+    '/mechanics/',
+    '/mechanics/1',
+    '/service-tickets/',
+    '/service-tickets/1',
+    '/part-descriptions/',
+    '/part-descriptions/1',
+    '/part-descriptions/search?q=prat',
+    '/part-descriptions/search?q=prat&fields=part_name,serialized_parts',
+    '/serialized-parts/',
+    '/serialized-parts/1',
+    '/serialized-parts/stock/1',
+    '/serialized-parts/stock?ids=1,2',
+    '/serialized-parts/stock?ids=x',
+]
+
+
+async def asgi_request(app, method, url, headers=(), body=b''):
+    path, _, query_string = url.partition('?')
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'root_path': '',
+        'query_string': query_string.encode(),
+        'headers': [(b'host', b'localhost'), (b'content-length', str(len(body)).encode()), *headers],
+        'scheme': 'http',
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = next(message for message in messages if message['type'] == 'http.response.start')
+    response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+class TestAsyncReads(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            mechanic = Mechanic(name='mechanic', email='mechanic@test.com', salary=50000, password='x')
+            for i in range(3):
+                customer = Customer(name=f'customer {i}', email=f'customer{i}@test.com', phone='123-456-7890')
+                customer.tickets.append(ServiceTicket(
+                    service_date=date(2024, 1, 1), VIN='1HGCM82633A123456', service_desc='brakes', mechanics=[mechanic]))
+                db.session.add(customer)
+            description = PartDescription(part_name='part', brand='acme', price=10.0)
+            description.serialized_parts = [SerializedPart() for _ in range(3)]
+            db.session.add(description)
+            db.session.commit()
+
+        self.asgi = AsyncReadApp(self.app)
+
+    def tearDown(self):
+        asyncio.run(self.asgi.engine.dispose())
+
+    def _clear_cache(self):
+        with self.app.app_context():
+            cache.clear()
+
+    def test_async_views_match_flask_views(self):
+        for url in ASYNC_URLS:
+            with self.subTest(url=url):
+                path, _, query_string = url.partition('?')
+                environ = scope_environ({'path': path, 'query_string': query_string.encode(), 'method': 'GET',
+                                         'headers': [(b'host', b'localhost')]})
+                self.assertIsNotNone(self.asgi.match(environ))
+
+                self._clear_cache()
+                status, headers, body = asyncio.run(asgi_request(self.asgi, 'GET', url))
+                self._clear_cache()
+                response = self.client.get(url)
+
+                self.assertEqual(status, response.status_code)
+                self.assertEqual(body, response.get_data())
+                self.assertEqual(headers.get('link'), response.headers.get('Link'))
+
+    def test_conditional_get(self):
+        status, headers, _ = asyncio.run(asgi_request(self.asgi, 'GET', '/customers/1'))
+        self.assertEqual(status, 200)
+
+        status, _, body = asyncio.run(asgi_request(
+            self.asgi, 'GET', '/customers/1', headers=[(b'if-none-match', headers['etag'].encode())]))
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_other_requests_go_to_flask(self):
+        status, _, body = asyncio.run(asgi_request(
+            self.asgi, 'POST', '/customers/', headers=[(b'content-type', b'application/json')],
+            body=b'{"name": "new", "email": "new@test.com", "phone": "123-456-7890"}'))
+        self.assertEqual(status, 201)
+
+        status, headers, body = asyncio.run(asgi_request(self.asgi, 'GET', '/customers/?stream=ndjson'))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body.splitlines()), 4)
+
+        status, _, _ = asyncio.run(asgi_request(self.asgi, 'GET', '/no-such-route'))
+        self.assertEqual(status, 404)
+
+    def test_concurrent_reads(self):
+        async def read_many():
+            return await asyncio.gather(*(
+                asgi_request(self.asgi, 'GET', f'/customers/{i % 3 + 1}') for i in range(50)
+            ))
+
+        self._clear_cache()
+        results = asyncio.run(read_many())
+        self.assertTrue(all(status == 200 for status, _, _ in results))
+
+    def test_server_timing(self):
+        init_instrumentation(self.app, db, cache)
+        asgi = AsyncReadApp(self.app)
+        try:
+            self._clear_cache()
+            _, headers, _ = asyncio.run(asgi_request(asgi, 'GET', '/customers/1'))
+        finally:
+            asyncio.run(asgi.engine.dispose())
+        self.assertIn('desc="2 queries"', headers['server-timing'])
+
+    def test_blocking_calls_off_event_loop(self):
+        # the loop runs in this thread, rate limit and cache calls must not
+        loop_thread = threading.current_thread()
+        threads = []
+        self.app.before_request(lambda: threads.append(threading.current_thread()))
+        with self.app.app_context():
+            backend = cache.cache
+        backend_get = backend.get
+
+        def recording_get(key):
+            threads.append(threading.current_thread())
+            return backend_get(key)
+
+        backend.get = recording_get
+        try:
+            self._clear_cache()
+            status, _, _ = asyncio.run(asgi_request(self.asgi, 'GET', '/customers/1'))
+        finally:
+            backend.get = backend_get
+        self.assertEqual(status, 200)
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
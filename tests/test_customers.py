@@ -1,8 +1,14 @@
 import unittest
 from app import create_app
-from app.models import db, Customer
+from app.models import db, Customer, ServiceTicket, CustomerTicketCount
+from app.util.rollups import rebuild_customer_ticket_counts
+from datetime import date
+from sqlalchemy import text, delete
+from sqlalchemy.exc import OperationalError
 from marshmallow import ValidationError
 from app.util.auth import encode_token
+from app.util.instrumentation import init_instrumentation
+from app.extensions import cache
 
 
 class TestCustomer(unittest.TestCase):
@@ -72,6 +78,223 @@ class TestCustomer(unittest.TestCase):
     #     self.assertEqual(response.status_code, 200)
     #     self.assertEqual(response.json['message'], "Customer deleted successfully")
 
+    def test_get_customers_cursor_pagination(self):
+        with self.app.app_context():
+            for i in range(2):
+                db.session.add(Customer(name=f'page {i}', email=f'page{i}@test.com', phone='123-456-7890'))
+            db.session.commit()
+
+        response = self.client.get('/customers/?per_page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json], [1, 2])
+        cursor = response.headers['X-Next-Cursor']
+
+        response = self.client.get(f'/customers/?per_page=2&after={cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json], [3])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_get_customers_invalid_cursor(self):
+        response = self.client.get('/customers/?after=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Invalid cursor')
+
+    def _add_tickets(self, counts):
+        with self.app.app_context():
+            for i, count in enumerate(counts):
+                customer = db.session.get(Customer, 1) if i == 0 else Customer(
+                    name=f'rank {i}', email=f'rank{i}@test.com', phone='123-456-7890')
+                for _ in range(count):
+                    customer.tickets.append(ServiceTicket(
+                        service_date=date(2024, 1, 1), VIN='1HGCM82633A123456', service_desc='oil change'))
+                db.session.add(customer)
+            db.session.commit()
+
+    def test_get_most_valuable(self):
+        self._add_tickets([1, 3, 2])
+
+        response = self.client.get('/customers/most-valuable?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['ticket_count'] for c in response.json], [3, 2])
+
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f'/customers/most-valuable?limit=2&after={cursor}')
+        self.assertEqual([(c['id'], c['ticket_count']) for c in response.json], [(1, 1)])
+
+    def test_get_most_valuable_from_rollup(self):
+        self._add_tickets([1, 3, 2])
+        with self.app.app_context():
+            db.session.delete(db.session.get(Customer, 2).tickets[0])
+            db.session.commit()
+
+        self.app.config['CUSTOMER_TICKET_ROLLUP'] = True
+        response = self.client.get('/customers/most-valuable')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(c['id'], c['ticket_count']) for c in response.json], [(3, 2), (2, 2), (1, 1)])
+
+    def test_ticket_count_without_counter_row(self):
+        # a customer from before the rollup: tickets but no customer_ticket_counts row
+        self._add_tickets([2])
+        with self.app.app_context():
+            db.session.execute(delete(CustomerTicketCount))
+            db.session.commit()
+
+        # new tickets don't start a counter row from a partial count
+        self._add_tickets([1, 1])
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(CustomerTicketCount, 1))
+            self.assertEqual(db.session.get(CustomerTicketCount, 2).ticket_count, 1)
+
+            rebuild_customer_ticket_counts()
+            self.assertEqual(db.session.get(CustomerTicketCount, 1).ticket_count, 3)
+
+        # a customer with no tickets still gets a row, so their first ticket is counted
+        with self.app.app_context():
+            db.session.add(Customer(name='new', email='new@test.com', phone='123-456-7890'))
+            db.session.commit()
+            rebuild_customer_ticket_counts()
+            self.assertEqual(db.session.get(CustomerTicketCount, 3).ticket_count, 0)
+
+    def test_server_timing_header(self):
+        init_instrumentation(self.app, db, cache)
+
+        response = self.client.get('/customers/1')
+        self.assertIn('db;dur=', response.headers['Server-Timing'])
+        self.assertIn('desc="2 queries"', response.headers['Server-Timing'])
+
+        response = self.client.get('/customers/1')
+        self.assertIn('desc="0 queries"', response.headers['Server-Timing'])
+        # the cached response, not the version stamp reads for the ETag and the cache key
+        self.assertIn('cache;desc="1 hits"', response.headers['Server-Timing'])
+
+    def test_server_timing_failed_query(self):
+        init_instrumentation(self.app, db, cache)
+
+        # a statement that raises leaves nothing behind on the pooled connection
+        with self.app.app_context(), db.engine.connect() as connection:
+            info = dict(connection.info)
+            with self.assertRaises(OperationalError):
+                connection.execute(text('SELECT * FROM no_such_table'))
+            self.assertEqual(connection.info, info)
+
+        response = self.client.get('/customers/1')
+        self.assertIn('desc="2 queries"', response.headers['Server-Timing'])
+
+    def test_cached_customer_invalidated_on_write(self):
+        self.assertEqual(self.client.get('/customers/1').json['name'], 'test')
+
+        update_payload = {'name': 'renamed', 'email': 'test@testing.com', 'phone': '123-456-7890'}
+        self.client.put('/customers/1', json=update_payload)
+        self.assertEqual(self.client.get('/customers/1').json['name'], 'renamed')
+
+        self._add_tickets([1])
+        self.assertEqual(self.client.get('/customers/1').json['tickets'], [1])
+
+    def test_cached_customer_racing_write(self):
+        # a write commits after this GET loaded the customer but before it cached the payload
+        with self.app.app_context():
+            backend = cache.cache
+        backend_set = backend.set
+
+        def racing_set(key, value, timeout=None):
+            if key.startswith('entity/customer/1'):
+                backend.set = backend_set
+                with self.app.app_context():
+                    db.session.get(Customer, 1).name = 'renamed'
+                    db.session.commit()
+            return backend_set(key, value, timeout)
+
+        backend.set = racing_set
+        try:
+            self.assertEqual(self.client.get('/customers/1').json['name'], 'test')
+        finally:
+            backend.set = backend_set
+        self.assertEqual(self.client.get('/customers/1').json['name'], 'renamed')
+
+    def test_search_customers(self):
+        with self.app.app_context():
+            db.session.add(Customer(name='Jane Testa', email='jane@example.com', phone='555-000-1111'))
+            db.session.commit()
+
+        response = self.client.get('/customers/search?q=testa')
+        self.assertEqual(response.status_code, 200)
+        # a name match ranks above an email match
+        self.assertEqual([c['name'] for c in response.json], ['Jane Testa'])
+
+        response = self.client.get('/customers/search?q=test')
+        self.assertEqual(len(response.json), 2)
+        self.assertEqual(response.json[0]['name'], 'test')
+
+        # the old ?email= parameter still works
+        response = self.client.get('/customers/search?email=testing.com')
+        self.assertEqual([c['id'] for c in response.json], [1])
+
+    def test_search_index_created_for_existing_database(self):
+        # a database made by create_all before the index existed
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE customers_fts'))
+            for trigger in ('insert', 'delete', 'update'):
+                db.session.execute(text(f'DROP TRIGGER customers_fts_{trigger}'))
+            db.session.commit()
+
+        client = create_app('TestingConfig').test_client()
+        response = client.get('/customers/search?q=test')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json], [1])
+
+    def test_search_customers_short_term(self):
+        response = self.client.get('/customers/search?q=te')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [])
+
+    def test_search_follows_writes(self):
+        update_payload = {'name': 'Margaret', 'email': 'marg@testing.com', 'phone': '123-456-7890'}
+        self.client.put('/customers/1', json=update_payload, headers={'Authorization': 'Bearer ' + self.token})
+        self.assertEqual(self.client.get('/customers/search?q=garet').json[0]['id'], 1)
+        self.assertEqual(self.client.get('/customers/search?q=test@').json, [])
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(Customer, 1))
+            db.session.commit()
+        self.assertEqual(self.client.get('/customers/search?q=garet').json, [])
+
+    def test_sparse_fieldsets(self):
+        self._add_tickets([1])
+
+        response = self.client.get('/customers/?fields=id,name,phone')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{'id': 1, 'name': 'test', 'phone': '123-456-7890'}])
+
+        response = self.client.get('/customers/1?fields=tickets')
+        self.assertEqual(response.json, {'tickets': [1]})
+
+        response = self.client.get('/customers/search?q=test&fields=email')
+        self.assertEqual(response.json, [{'email': 'test@testing.com'}])
+
+        response = self.client.get('/customers/most-valuable?fields=name')
+        self.assertEqual(response.json, [{'name': 'test', 'ticket_count': 1}])
+
+        for url in ('/customers/?fields=id,password', '/customers/1?fields=', '/customers/search?q=test&fields=x'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fieldsets_skip_relationships(self):
+        self._add_tickets([1])
+        init_instrumentation(self.app, db, cache)
+
+        # the ticket id list is its own query, only run when asked for
+        response = self.client.get('/customers/?fields=id,name')
+        self.assertIn('desc="1 queries"', response.headers['Server-Timing'])
+        response = self.client.get('/customers/?fields=id,tickets')
+        self.assertIn('desc="2 queries"', response.headers['Server-Timing'])
 
+    def test_sparse_fieldsets_cached_per_fieldset(self):
+        self.assertEqual(self.client.get('/customers/1?fields=name').json, {'name': 'test'})
+        self.assertEqual(self.client.get('/customers/1?fields=email').json, {'email': 'test@testing.com'})
+        etag = self.client.get('/customers/1?fields=name').headers['ETag']
+        self.assertNotEqual(etag, self.client.get('/customers/1').headers['ETag'])
 
-    
+        update_payload = {'name': 'renamed', 'email': 'test@testing.com', 'phone': '123-456-7890'}
+        self.client.put('/customers/1', json=update_payload)
+        self.assertEqual(self.client.get('/customers/1?fields=name').json, {'name': 'renamed'})
+        self.assertEqual(self.client.get('/customers/1').json['name'], 'renamed')
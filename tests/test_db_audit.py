@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest.mock import patch
+from flask_migrate import upgrade, downgrade
+from sqlalchemy import inspect, select, func, text
+from app import create_app
+from datetime import date
+from app.models import (db, Base, Customer, ServiceTicket, PartDescription, SerializedPart,
+                        CustomerTicketCount, PartStockCount)
+from app.util.audit import AUDIT_REQUESTS, SKIPPED, KNOWN_SCANS
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+class TestDbAudit(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.app.logger.disabled = True  # routes that fail in the audit are reported by it anyway
+        self.runner = self.app.test_cli_runner()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def test_every_route_audited(self):
+        endpoints = {rule.endpoint for rule in self.app.url_map.iter_rules()}
+        self.assertEqual(endpoints - SKIPPED - set(AUDIT_REQUESTS), set())
+
+    def test_audit_passes_on_current_schema(self):
+        result = self.runner.invoke(args=['db-audit'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('0 with full scans', result.output)
+        # the routes ran against a scratch copy
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(select(func.count()).select_from(Customer)).scalar(), 0)
+
+    def test_audit_flags_missing_index(self):
+        with self.app.app_context():
+            db.session.execute(text('DROP INDEX ix_service_tickets_customer'))
+            db.session.commit()
+
+        result = self.runner.invoke(args=['db-audit'])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn('FULL SCAN customers_bp.get_customer\n', result.output)
+        self.assertIn('scans service_tickets', result.output)
+
+    def test_audit_flags_aggregate_under_limit(self):
+        # the LIMIT only applies once every customer's tickets are counted and sorted
+        with patch.dict(KNOWN_SCANS):
+            del KNOWN_SCANS['customers_bp.get_most_valuable']
+            result = self.runner.invoke(args=['db-audit'])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn('FULL SCAN customers_bp.get_most_valuable\n', result.output)
+        self.assertIn('sorts every row in a temp b-tree for ORDER BY', result.output)
+        self.assertIn('1 with full scans', result.output)
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+            db.session.commit()
+            db.drop_all()
+
+    def indexes(self):
+        # from sqlite_master, reflection skips expression indexes
+        rows = db.session.execute(text("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+        return {tuple(row) for row in rows}
+
+    def test_upgrade_creates_model_indexes(self):
+        with self.app.app_context():
+            upgrade(directory=MIGRATIONS)
+
+            expected = {(table.name, index.name) for table in Base.metadata.sorted_tables for index in table.indexes}
+            self.assertEqual(self.indexes(), expected)
+
+            downgrade(directory=MIGRATIONS, revision='base')
+            self.assertEqual(inspect(db.engine).get_table_names(), ['alembic_version'])
+
+    def test_upgrade_existing_database(self):
+        # a database made by create_all before the indexes, rollups and search index
+        # existed keeps its rows and gets all three
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name='Ada', email='ada@example.com', phone='555-0101')
+            customer.tickets = [ServiceTicket(service_date=date(2024, 1, 1), VIN='1HGCM82633A123456',
+                                              service_desc='brakes') for _ in range(2)]
+            description = PartDescription(part_name='Brake Pads', brand='acme', price=45.0)
+            description.serialized_parts = [SerializedPart() for _ in range(3)]
+            db.session.add_all([customer, description, Customer(name='Bob', email='bob@example.com', phone='555-0102')])
+            db.session.commit()
+
+            for _, name in self.indexes():
+                db.session.execute(text(f'DROP INDEX {name}'))
+            for name in ('customer_ticket_counts', 'part_stock_counts', 'customers_fts', 'part_descriptions_fts'):
+                db.session.execute(text(f'DROP TABLE {name}'))
+            for name in ('customers_fts', 'part_descriptions_fts'):
+                for trigger in ('insert', 'delete', 'update'):
+                    db.session.execute(text(f'DROP TRIGGER {name}_{trigger}'))
+            db.session.commit()
+
+            upgrade(directory=MIGRATIONS)
+
+            self.assertIn(('service_tickets', 'ix_service_tickets_vin_date'), self.indexes())
+            self.assertEqual(db.session.execute(select(func.count()).select_from(Customer)).scalar(), 2)
+            self.assertEqual(db.session.get(CustomerTicketCount, 1).ticket_count, 2)
+            self.assertEqual(db.session.get(CustomerTicketCount, 2).ticket_count, 0)
+            self.assertEqual(db.session.get(PartStockCount, 1).on_hand, 3)
+
+        client = self.app.test_client()
+        self.assertEqual([c['id'] for c in client.get('/customers/search?q=ada').json], [1])
+        self.assertEqual(client.get('/serialized-parts/stock/1').json['quantity'], 3)
+        self.assertEqual([p['id'] for p in client.get('/part-descriptions/search?q=brake').json], [1])
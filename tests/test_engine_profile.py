@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, text
+from app import create_app
+from app.models import db
+from app.util.engine import init_engine_profile, set_sqlite_pragmas
+from config import SQLITE_PRODUCTION_PRAGMAS
+
+
+class TestEngineProfile(unittest.TestCase):
+
+    def test_config_pragmas_applied_to_app_engine(self):
+        app = create_app('TestingConfig')
+        app.config['SQLITE_PRAGMAS'] = {'busy_timeout': 1234, 'cache_size': -2048}
+        init_engine_profile(app, db)
+
+        with app.app_context():
+            db.engine.dispose()  # pragmas run on connect
+            self.assertEqual(db.session.execute(text('PRAGMA busy_timeout')).scalar(), 1234)
+            self.assertEqual(db.session.execute(text('PRAGMA cache_size')).scalar(), -2048)
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_production_pragmas(self):
+        path = os.path.join(tempfile.mkdtemp(), 'profile.sqlite')
+        engine = create_engine(f'sqlite:///{path}')
+        set_sqlite_pragmas(engine, SQLITE_PRODUCTION_PRAGMAS)
+
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(conn.execute(text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+        engine.dispose()
@@ -1,8 +1,12 @@
 import unittest
 from app import create_app
-from app.models import db, Mechanic
-from app.util.auth import encode_token
-from werkzeug.security import generate_password_hash
+from app.models import db, Mechanic, Customer, ServiceTicket, PartDescription, SerializedPart
+from datetime import date
+from app.util.auth import encode_token, token_cache, SECRET_KEY
+from datetime import datetime, timedelta, timezone
+from jose import jwt
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.util.passwords import password_hasher
 
 class TestMechanic(unittest.TestCase):
     
@@ -61,4 +65,108 @@ class TestMechanic(unittest.TestCase):
         headers = {'Authorization': 'Bearer '+ self.token}
         response = self.client.put('/mechanics/1', json=update_payload, headers=headers)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['name'], 'new name')
\ No newline at end of file
+        self.assertEqual(response.json['name'], 'new name')
+
+        with self.app.app_context():
+            self.assertTrue(check_password_hash(db.session.get(Mechanic, 1).password, '123'))
+
+    def test_login_rehashes_when_cost_changes(self):
+        self.app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+        payload = {'email': 'test@test.com', 'password': '123'}
+
+        self.assertEqual(self.client.post('/mechanics/login', json=payload).status_code, 200)
+        with self.app.app_context():
+            password = db.session.get(Mechanic, 1).password
+        self.assertTrue(password.startswith('pbkdf2:sha256:1000$'))
+
+        # a wrong password never rehashes
+        self.client.post('/mechanics/login', json={**payload, 'password': 'wrong'})
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Mechanic, 1).password, password)
+
+        self.assertEqual(self.client.post('/mechanics/login', json=payload).status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Mechanic, 1).password, password)
+
+    def test_login_refused_when_hashing_backed_up(self):
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        self.app.config['PASSWORD_HASH_MAX_PENDING'] = 1
+        password_hasher._pending = 1
+        try:
+            response = self.client.post('/mechanics/login', json={'email': 'test@test.com', 'password': '123'})
+        finally:
+            password_hasher._pending = 0
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_login_hashing_in_pool(self):
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        response = self.client.post('/mechanics/login', json={'email': 'test@test.com', 'password': '123'})
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_token_cache_skips_reverification(self):
+        token_cache.clear()
+        headers = {'Authorization': 'Bearer ' + self.token}
+
+        for _ in range(3):
+            self.client.delete('/mechanics/99', headers=headers)
+
+        self.assertEqual(token_cache.stats()['misses'], 1)
+        self.assertEqual(token_cache.stats()['hits'], 2)
+
+    def test_expired_token_rejected(self):
+        token = jwt.encode({'sub': '1', 'exp': datetime.now(timezone.utc) - timedelta(seconds=1)}, SECRET_KEY, algorithm='HS256')
+        response = self.client.delete('/mechanics/1', headers={'Authorization': 'Bearer ' + token})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['error'], 'Token has expired!')
+
+    def _add_workload(self):
+        with self.app.app_context():
+            self.app.config['INVOICE_LABOR_RATE'] = 100.0
+            first = db.session.get(Mechanic, 1)
+            second = Mechanic(name='second', email='second@test.com', salary=50000, password='x')
+            pads = PartDescription(part_name='Brake Pads', brand='acme', price=50.0)
+            customer = Customer(name='customer', email='customer@test.com', phone='123-456-7890')
+
+            def ticket(service_date, mechanics, parts):
+                return ServiceTicket(service_date=service_date, VIN='1HGCM82633A123456', service_desc='brakes',
+                                     mechanics=mechanics,
+                                     serialized_parts=[SerializedPart(description=pads) for _ in range(parts)])
+
+            # first: 1 ticket, 4 parts. second: 2 tickets (one shared), 4 + 0 parts
+            customer.tickets = [
+                ticket(date(2024, 1, 5), [first, second], 4),
+                ticket(date(2024, 1, 6), [second], 0),
+                ticket(date(2024, 3, 1), [first], 1),
+            ]
+            db.session.add(customer)
+            db.session.commit()
+
+    def test_leaderboard(self):
+        self._add_workload()
+
+        response = self.client.get('/mechanics/leaderboard?start=2024-01-01&end=2024-01-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [
+            {'mechanic_id': 2, 'name': 'second', 'tickets': 2, 'parts': 4, 'revenue': 400.0},
+            {'mechanic_id': 1, 'name': 'test', 'tickets': 1, 'parts': 4, 'revenue': 300.0},
+        ])
+
+        response = self.client.get('/mechanics/leaderboard?sort=parts')
+        self.assertEqual([(row['mechanic_id'], row['parts']) for row in response.json], [(1, 5), (2, 4)])
+
+    def test_leaderboard_paginated(self):
+        self._add_workload()
+
+        response = self.client.get('/mechanics/leaderboard?sort=tickets&per_page=1')
+        self.assertEqual([row['mechanic_id'] for row in response.json], [1])
+        self.assertEqual(response.headers['X-Next-Page'], '2')
+
+        response = self.client.get('/mechanics/leaderboard?sort=tickets&per_page=1&page=2')
+        self.assertEqual([row['mechanic_id'] for row in response.json], [2])
+
+    def test_leaderboard_invalid_args(self):
+        self.assertEqual(self.client.get('/mechanics/leaderboard?start=soon').status_code, 400)
+        self.assertEqual(self.client.get('/mechanics/leaderboard?sort=salary').status_code, 400)
@@ -3,6 +3,7 @@ from app import create_app
 from app.models import db, PartDescription
 from app.util.auth import encode_token
 from werkzeug.security import generate_password_hash
+from sqlalchemy import event, text
 
 class Test_part_description(unittest.TestCase):
     
@@ -48,4 +49,103 @@ class Test_part_description(unittest.TestCase):
         headers = {'Authorization': 'Bearer '+ self.token}
         response = self.client.put('/part-descriptions/1', json=update_payload, headers=headers)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['part_name'], 'new name')
\ No newline at end of file
+        self.assertEqual(response.json['part_name'], 'new name')
+    def test_part_descriptions_conditional_get(self):
+        response = self.client.get('/part-descriptions/')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        response = self.client.get('/part-descriptions/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        self.client.put('/part-descriptions/1', json={'part_name': 'new name', 'brand': 'new brand', 'price': 49.99})
+        response = self.client.get('/part-descriptions/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_part_description_304_skips_database(self):
+        etag = self.client.get('/part-descriptions/1').headers['ETag']
+
+        queries = []
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+        response = self.client.get('/part-descriptions/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, [])
+
+    def _add_catalog(self):
+        with self.app.app_context():
+            db.session.add_all([
+                PartDescription(part_name='Alternator', brand='Bosch', price=250.0),
+                PartDescription(part_name='Brake Pads', brand='Bosch', price=45.0),
+                PartDescription(part_name='Brake Rotor', brand='Brembo', price=80.0),
+            ])
+            db.session.commit()
+
+    def test_search_part_descriptions(self):
+        self._add_catalog()
+
+        response = self.client.get('/part-descriptions/search?q=brake')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(p['part_name'] for p in response.json), ['Brake Pads', 'Brake Rotor'])
+
+        # typo tolerant
+        response = self.client.get('/part-descriptions/search?q=alternater')
+        self.assertEqual([p['part_name'] for p in response.json], ['Alternator'])
+
+        # short prefix
+        response = self.client.get('/part-descriptions/search?q=br')
+        self.assertEqual([p['part_name'] for p in response.json], ['Brake Pads', 'Brake Rotor'])
+
+        # the old ?name= parameter still works
+        response = self.client.get('/part-descriptions/search?name=test_')
+        self.assertEqual([p['part_name'] for p in response.json], ['test_part'])
+
+    def test_search_part_descriptions_existing_database(self):
+        # a catalog made by create_all before the search index existed
+        self._add_catalog()
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE part_descriptions_fts'))
+            for trigger in ('insert', 'delete', 'update'):
+                db.session.execute(text(f'DROP TRIGGER part_descriptions_fts_{trigger}'))
+            db.session.commit()
+
+        client = create_app('TestingConfig').test_client()
+        response = client.get('/part-descriptions/search?q=brake')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(p['part_name'] for p in response.json), ['Brake Pads', 'Brake Rotor'])
+        response = client.get('/part-descriptions/search?q=alternater')
+        self.assertEqual([p['part_name'] for p in response.json], ['Alternator'])
+
+    def test_search_part_descriptions_filters(self):
+        self._add_catalog()
+
+        response = self.client.get('/part-descriptions/search?q=brake&brand=bosch')
+        self.assertEqual([p['part_name'] for p in response.json], ['Brake Pads'])
+
+        response = self.client.get('/part-descriptions/search?min_price=50&max_price=100')
+        self.assertEqual([p['part_name'] for p in response.json], ['test_part', 'Brake Rotor'])
+
+        response = self.client.get('/part-descriptions/search?min_price=cheap')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_part_descriptions_paginated(self):
+        self._add_catalog()
+
+        response = self.client.get('/part-descriptions/search?q=bosch&per_page=1')
+        self.assertEqual(len(response.json), 1)
+        self.assertEqual(response.headers['X-Next-Page'], '2')
+
+        response = self.client.get('/part-descriptions/search?q=bosch&per_page=1&page=2')
+        self.assertEqual(len(response.json), 1)
+        self.assertNotIn('X-Next-Page', response.headers)
+
+    def test_search_follows_part_description_writes(self):
+        payload = {'part_name': 'Oil Filter', 'brand': 'Fram', 'price': 9.99}
+        self.client.put('/part-descriptions/1', json=payload)
+        self.assertEqual([p['id'] for p in self.client.get('/part-descriptions/search?q=filter').json], [1])
+        self.assertEqual(self.client.get('/part-descriptions/search?q=test_part').json, [])
+
+        self.client.delete('/part-descriptions/1')
+        self.assertEqual(self.client.get('/part-descriptions/search?q=filter').json, [])
@@ -0,0 +1,88 @@
+import unittest
+from datetime import date
+from sqlalchemy import event
+from app import create_app
+from app.models import db, Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart
+from werkzeug.security import generate_password_hash
+
+# Every read endpoint must answer in this many queries no matter how many rows it returns
+QUERY_BUDGET = 3
+
+READ_ENDPOINTS = [
+    '/customers/',
+    '/customers/?stream=json',
+    '/customers/1',
+    '/customers/1?fields=name',
+    '/customers/most-valuable',
+    '/customers/search?q=customer',
+    '/mechanics/',
+    '/mechanics/?stream=ndjson',
+    '/mechanics/1',
+    '/mechanics/leaderboard?start=2024-01-01',
+    '/service-tickets/',
+    '/service-tickets/1',
+    '/service-tickets/1/invoice',
+    '/service-tickets/invoices?start=2024-01-01',
+    '/part-descriptions/',
+    '/part-descriptions/1',
+    '/part-descriptions/search?q=part',
+    '/serialized-parts/',
+    '/serialized-parts/?fields=id,ticket_id&stream=ndjson',
+    '/serialized-parts/1',
+    '/serialized-parts/stock/1',
+    '/serialized-parts/stock?ids=1,2',
+]
+
+
+class QueryCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+class TestQueryBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            mechanics = [
+                Mechanic(name=f'mechanic {i}', email=f'mechanic{i}@test.com', salary=50000, password=generate_password_hash('123'))
+                for i in range(5)
+            ]
+            for i in range(6):
+                customer = Customer(name=f'customer {i}', email=f'customer{i}@test.com', phone='123-456-7890')
+                for _ in range(2):
+                    customer.tickets.append(ServiceTicket(
+                        service_date=date(2024, 1, 1), VIN='1HGCM82633A123456', service_desc='brakes', mechanics=mechanics))
+                db.session.add(customer)
+
+            for i in range(2):
+                description = PartDescription(part_name=f'part {i}', brand='acme', price=10.0)
+                description.serialized_parts = [SerializedPart() for _ in range(5)]
+                db.session.add(description)
+            db.session.commit()
+
+    def test_read_endpoints_stay_within_query_budget(self):
+        for url in READ_ENDPOINTS:
+            with self.subTest(url=url), self.app.app_context():
+                with QueryCounter(db.engine) as counter:
+                    response = self.client.get(url)
+                    response.get_data()  # streamed bodies only query as they are read
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(counter.count, QUERY_BUDGET)
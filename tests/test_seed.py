@@ -0,0 +1,101 @@
+import unittest
+from sqlalchemy import select, func
+from app import create_app
+from app.models import db, Customer, ServiceTicket, SerializedPart, PartStockCount, CustomerTicketCount, service_mechanic
+from app.util.seed import seed_database
+from app.util.entity_cache import current_version
+
+SCALE = {'customers': 50, 'mechanics': 5, 'part_descriptions': 10, 'tickets': 120, 'serialized_parts': 300}
+
+
+class TestSeed(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def _reseed(self, seed):
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            seed_database(SCALE, seed=seed, batch_size=40)
+            return [tuple(row) for row in db.session.execute(
+                select(ServiceTicket.id, ServiceTicket.customer_id, ServiceTicket.VIN, ServiceTicket.service_date)
+            )]
+
+    def test_seed_counts(self):
+        with self.app.app_context():
+            counts = seed_database(SCALE, batch_size=40)
+
+            self.assertEqual(counts['customers'], 50)
+            self.assertEqual(counts['serialized_parts'], 300)
+            self.assertEqual(db.session.execute(select(func.count()).select_from(service_mechanic)).scalar(),
+                             counts['service_mechanic'])
+
+    def test_seed_is_deterministic(self):
+        self.assertEqual(self._reseed(1), self._reseed(1))
+        self.assertNotEqual(self._reseed(1), self._reseed(2))
+
+    def test_seed_rebuilds_rollups(self):
+        with self.app.app_context():
+            seed_database(SCALE)
+
+            on_hand = db.session.execute(select(func.sum(PartStockCount.on_hand))).scalar()
+            free = db.session.execute(
+                select(func.count(SerializedPart.id)).where(SerializedPart.ticket_id.is_(None))).scalar()
+            self.assertEqual(on_hand, free)
+
+            ticket_total = db.session.execute(select(func.sum(CustomerTicketCount.ticket_count))).scalar()
+            self.assertEqual(ticket_total, 120)
+
+            # the search index was rebuilt after the load
+            response = self.app.test_client().get('/customers/search?q=customer7@')
+            self.assertEqual([c['id'] for c in response.json], [7])
+
+    def test_seed_drops_version_stamps(self):
+        # collection ETags and cached entities are keyed on these
+        with self.app.app_context():
+            before = current_version('customer')
+            seed_database(SCALE)
+            self.assertNotEqual(current_version('customer'), before)
+
+    def test_search_triggers_restored(self):
+        with self.app.app_context():
+            seed_database(SCALE)
+
+        client = self.app.test_client()
+        client.post('/customers/', json={'name': 'Late Arrival', 'email': 'late@example.com', 'phone': '555-000-0000'})
+        response = client.get('/customers/search?q=late@')
+        self.assertEqual([c['email'] for c in response.json], ['late@example.com'])
+
+
+class TestSeedCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.runner = self.app.test_cli_runner()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def test_seed_command(self):
+        result = self.runner.invoke(args=['seed', '--customers', '30', '--tickets', '60', '--serialized-parts', '90'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('customers: 30', result.output)
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(select(func.count()).select_from(ServiceTicket)).scalar(), 60)
+
+    def test_seed_command_refuses_existing_data(self):
+        self.runner.invoke(args=['seed', '--customers', '10'])
+
+        result = self.runner.invoke(args=['seed', '--customers', '10'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('--drop', result.output)
+
+        result = self.runner.invoke(args=['seed', '--customers', '20', '--drop'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(select(func.count()).select_from(Customer)).scalar(), 20)
@@ -0,0 +1,140 @@
+import unittest
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields
+from sqlalchemy import select
+from app import create_app
+from app.extensions import cache
+from app.models import db, Customer, Mechanic, ServiceTicket, PartDescription, SerializedPart
+from app.blueprints.customers.schemas import customers_schema, CustomerSchema
+from app.blueprints.mechanics.schemas import mechanics_schema, login_schema
+from app.blueprints.part_descriptions.schemas import part_descriptions_schema
+from app.blueprints.serialized_parts.schemas import serialized_parts_schema
+from app.blueprints.service_tickets.schemas import service_tickets_schema
+from app.util.serialization import OrjsonProvider, compile_dump, init_json_provider
+
+LIST_URLS = [
+    '/customers/?per_page=100',
+    '/mechanics/?per_page=100',
+    '/service-tickets/?per_page=100',
+    '/part-descriptions/?per_page=100',
+    '/serialized-parts/?per_page=100',
+    '/customers/1',
+    '/service-tickets/1/invoice',
+    '/mechanics/leaderboard',
+]
+
+
+@dataclass
+class Point:
+    x: int
+    y: float
+
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            mechanic = Mechanic(name='Zoë', email='zoe@test.com', salary=1e16, password='scrypt:32768:8:1$ab12e4')
+            for i in range(5):
+                customer = Customer(name=f'customer {i}', email=f'customer{i}@test.com', phone='123-456-7890')
+                customer.tickets.append(ServiceTicket(
+                    service_date=date(2024, 1, i + 1), VIN='1HGCM82633A123456', service_desc='brakes\x7f',
+                    mechanics=[mechanic]))
+                db.session.add(customer)
+            description = PartDescription(part_name='part', brand='acme', price=0.00001)
+            description.serialized_parts = [SerializedPart(ticket_id=1), SerializedPart()]
+            db.session.add(description)
+            db.session.commit()
+
+    def test_compiled_dump_matches_marshmallow(self):
+        models = [
+            (customers_schema, Customer),
+            (mechanics_schema, Mechanic),
+            (login_schema, Mechanic),
+            (service_tickets_schema, ServiceTicket),
+            (part_descriptions_schema, PartDescription),
+            (serialized_parts_schema, SerializedPart),
+        ]
+        with self.app.app_context():
+            for schema, model in models:
+                with self.subTest(schema=type(schema).__name__):
+                    self.assertIsNotNone(schema._compiled_dump)
+                    rows = db.session.execute(select(model)).scalars().all()
+                    self.assertEqual(schema.dump(rows, many=True), Schema.dump(schema, rows, many=True))
+                    # same key order too, for encoders that don't sort keys
+                    self.assertEqual(
+                        list(schema.dump(rows[0], many=False)), list(Schema.dump(schema, rows[0], many=False)))
+
+    def test_compiled_dump_follows_only(self):
+        schema = CustomerSchema(only=['id', 'email'])
+        with self.app.app_context():
+            customer = db.session.get(Customer, 1)
+            self.assertEqual(schema.dump(customer), {'id': 1, 'email': 'customer0@test.com'})
+
+    def test_compiled_dump_loads_expired_attributes(self):
+        with self.app.app_context():
+            customer = db.session.get(Customer, 1)
+            customer.name = 'renamed'
+            db.session.commit()
+
+            self.assertNotIn('name', customer.__dict__)
+            self.assertEqual(customers_schema.dump(customer, many=False)['name'], 'renamed')
+
+    def test_unsupported_fields_use_marshmallow(self):
+        class CustomerWithUrl(CustomerSchema):
+            url = fields.Url()
+
+        self.assertIsNone(compile_dump(CustomerWithUrl()))
+
+    def test_responses_match_default_provider(self):
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+
+        for url in LIST_URLS:
+            with self.subTest(url=url):
+                with self.app.app_context():
+                    cache.clear()
+                fast = self.client.get(url)
+
+                self.app.json = DefaultJSONProvider(self.app)
+                with self.app.app_context():
+                    cache.clear()
+                reference = self.client.get(url)
+                self.app.json = OrjsonProvider(self.app)
+
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.get_data(), reference.get_data())
+
+    def test_provider_matches_default_provider(self):
+        payloads = [
+            {'b': 1, 'a': [1.5, None, True, 'x']},
+            {'name': 'Zoë', 'control': '\x00\x1f\x7f', 'quote': '"\\/'},
+            [1e16, 1e-05, 0.0001, -2.5e-300, 123456789.125, 0.1],
+            {'when': date(2024, 1, 2), 'at': datetime(2024, 1, 2, 3, 4, 5)},
+            {'price': Decimal('9.99'), 'id': UUID(int=7), 'point': Point(1, 2.0)},
+            {1: 'int key', 2: 'sorted numerically by the stdlib'},
+            {'big': 2 ** 70},
+            [],
+            'plain',
+        ]
+        with self.app.app_context():
+            default = DefaultJSONProvider(self.app)
+            fast = OrjsonProvider(self.app)
+            for payload in payloads:
+                with self.subTest(payload=payload):
+                    self.assertEqual(fast.response(payload).get_data(), default.response(payload).get_data())
+
+    def test_provider_can_be_disabled(self):
+        self.app.json = DefaultJSONProvider(self.app)
+        self.app.config['JSON_ORJSON'] = False
+        init_json_provider(self.app)
+        self.assertNotIsInstance(self.app.json, OrjsonProvider)
@@ -1,9 +1,12 @@
 import unittest
 from app import create_app
-from app.models import db, PartDescription, SerializedPart, ServiceTicket, Customer
+from sqlalchemy import delete
+from app.models import db, PartDescription, SerializedPart, ServiceTicket, Customer, PartStockCount
+from app.util.rollups import rebuild_part_stock_counts
 from app.util.auth import encode_token
 from werkzeug.security import generate_password_hash
 from datetime import date
+import json
 
 
 class TestSerializedPart(unittest.TestCase):  # Fixed class name convention
@@ -105,4 +108,112 @@ class TestSerializedPart(unittest.TestCase):  # Fixed class name convention
         headers = {'Authorization': 'Bearer '+ self.token}
         response = self.client.put('/serialized-parts/1', json=update_payload, headers=headers)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['desc_id'], 1)
\ No newline at end of file
+        self.assertEqual(response.json['desc_id'], 1)
+
+    def test_stream_serialized_parts_ndjson(self):
+        with self.app.app_context():
+            db.session.add_all([SerializedPart(desc_id=1) for _ in range(3)])
+            db.session.commit()
+
+        response = self.client.get('/serialized-parts/?stream=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [1, 2, 3, 4])
+
+    def test_stream_serialized_parts_json_array(self):
+        response = self.client.get('/serialized-parts/?stream=json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))[0]['desc_id'], 1)
+
+    def test_stock_counter_follows_parts(self):
+        with self.app.app_context():
+            db.session.add_all([SerializedPart(desc_id=1) for _ in range(3)])
+            db.session.commit()
+
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 3)
+
+        self.client.put('/service-tickets/1/add-part/2')
+        self.client.delete('/serialized-parts/3')
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 1)
+
+        response = self.client.delete('/service-tickets/1/remove-part/2')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 2)
+
+    def test_stock_without_counter_row(self):
+        # a database from before the counters: parts on hand but no part_stock_counts row
+        with self.app.app_context():
+            db.session.add_all([SerializedPart(desc_id=1) for _ in range(3)])
+            db.session.execute(delete(PartStockCount))
+            db.session.commit()
+
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 3)
+
+        # writes don't start a counter row from a partial count
+        self.client.post('/serialized-parts/bulk', json={'desc_id': 1, 'quantity': 2})
+        self.client.put('/service-tickets/1/add-to-cart/1?quantity=1')
+        response = self.client.get('/serialized-parts/stock?ids=1')
+        self.assertEqual(response.json[0]['quantity'], 4)
+
+        with self.app.app_context():
+            rebuild_part_stock_counts()
+            self.assertEqual(db.session.get(PartStockCount, 1).on_hand, 4)
+
+    def test_bulk_stock(self):
+        with self.app.app_context():
+            db.session.add(PartDescription(part_name='filter', brand='acme', price=5.0))
+            db.session.add(SerializedPart(desc_id=1))
+            db.session.commit()
+
+        response = self.client.get('/serialized-parts/stock?ids=1,2,99')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['desc_id'], row['quantity']) for row in response.json],
+            [(1, 1), (2, 0)]
+        )
+
+    def test_bulk_create_serialized_parts(self):
+        response = self.client.post('/serialized-parts/bulk', json={'desc_id': 1, 'quantity': 500})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json['first_id'], response.json['last_id']), (2, 501))
+
+        response = self.client.post('/serialized-parts/bulk', json={'parts': [{'desc_id': 1}, {'desc_id': 1, 'ticket_id': 1}]})
+        self.assertEqual(response.json['count'], 2)
+
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 501)
+
+    def test_bulk_create_without_insert_returning(self):
+        with self.app.app_context():
+            dialect = db.engine.dialect
+        dialect.insert_returning = False
+        try:
+            response = self.client.post('/serialized-parts/bulk', json={'desc_id': 1, 'quantity': 3})
+        finally:
+            dialect.insert_returning = True
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json['first_id'], response.json['last_id']), (2, 4))
+
+        response = self.client.get('/serialized-parts/stock/1')
+        self.assertEqual(response.json['quantity'], 3)
+
+    def test_bulk_create_changes_list_etag(self):
+        response = self.client.get('/serialized-parts/')
+        etag = response.headers['ETag']
+
+        self.client.post('/serialized-parts/bulk', json={'desc_id': 1, 'quantity': 3})
+        response = self.client.get('/serialized-parts/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 4)
+
+    def test_bulk_create_rejects_whole_batch(self):
+        response = self.client.post('/serialized-parts/bulk', json={'parts': [{'desc_id': 1}, {'desc_id': 42}]})
+        self.assertEqual(response.status_code, 400)
+
+        with self.app.app_context():
+            self.assertEqual(db.session.query(SerializedPart).count(), 1)
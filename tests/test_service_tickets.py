@@ -1,4 +1,6 @@
+import threading
 import unittest
+from datetime import date
 from app import create_app
 from app.models import db, PartDescription, SerializedPart, ServiceTicket
 from app.util.auth import encode_token
@@ -7,7 +9,7 @@ from app.blueprints.serialized_parts.schemas import serialized_part_schema, seri
 # from app.blueprints.part_descriptions.schemas import part, part_description_schema, part_descriptions_schpart_descriptions_schema
 # from app.blueprints.customers.schemas import customer_schema, customers_schema
 # from app.blueprints.mechanics.schemas import mechanic_schema, mechanics_schema
-from app.models import Customer, Mechanic
+from app.models import Customer, Mechanic, PartStockCount
 
 class TestServiceTickets(unittest.TestCase):
     def setUp(self):
@@ -81,4 +83,140 @@ class TestServiceTickets(unittest.TestCase):
             headers = {'Authorization': 'Bearer '+ self.token}
             response = self.client.put('/service-tickets/1', json=update_payload, headers=headers)
             self.assertEqual(response.status_code, 200)
-            self.assertEqual(response.json['name'], 'new name')
\ No newline at end of file
+            self.assertEqual(response.json['name'], 'new name')
+
+class TestAddToCart(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            customer = Customer(name='test', email='test_customer@testme.com', phone='123-456-7890')
+            for _ in range(8):
+                customer.tickets.append(ServiceTicket(
+                    service_date=date(2020, 1, 1), VIN='1HGCM82633A123456', service_desc='Test service'))
+            description = PartDescription(part_name='Brake Pads', brand='acme', price=45.0)
+            description.serialized_parts = [SerializedPart() for _ in range(10)]
+            db.session.add_all([customer, description])
+            db.session.commit()
+
+    def _on_hand(self):
+        with self.app.app_context():
+            return db.session.get(PartStockCount, 1).on_hand
+
+    def test_add_to_cart_reserves_quantity(self):
+        response = self.client.put('/service-tickets/1/add-to-cart/1?quantity=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json['parts']], [1, 2, 3])
+        self.assertEqual(self._on_hand(), 7)
+
+        response = self.client.put('/service-tickets/2/add-to-cart/1', json={'quantity': 2})
+        self.assertEqual([p['id'] for p in response.json['parts']], [4, 5])
+        self.assertEqual(self._on_hand(), 5)
+
+    def test_add_to_cart_shortage(self):
+        response = self.client.put('/service-tickets/1/add-to-cart/1?quantity=11')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json['requested'], 11)
+        self.assertEqual(response.json['available'], 10)
+
+        # nothing was reserved
+        self.assertEqual(self._on_hand(), 10)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(SerializedPart).filter(SerializedPart.ticket_id.isnot(None)).count(), 0)
+
+    def test_add_to_cart_concurrent(self):
+        statuses = []
+
+        def reserve(ticket_id):
+            client = self.app.test_client()
+            statuses.append(client.put(f'/service-tickets/{ticket_id}/add-to-cart/1?quantity=3').status_code)
+
+        threads = [threading.Thread(target=reserve, args=(ticket_id,)) for ticket_id in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 10 units, 3 per ticket: exactly 3 tickets get theirs, no unit is handed out twice
+        self.assertEqual(statuses.count(200), 3)
+        self.assertEqual(statuses.count(409), 5)
+        with self.app.app_context():
+            reserved = db.session.query(SerializedPart).filter(SerializedPart.ticket_id.isnot(None)).all()
+            self.assertEqual(len(reserved), 9)
+            tickets = [part.ticket_id for part in reserved]
+            self.assertTrue(all(tickets.count(ticket_id) == 3 for ticket_id in set(tickets)))
+        self.assertEqual(self._on_hand(), 1)
+
+    def test_add_part_already_used(self):
+        self.assertEqual(self.client.put('/service-tickets/1/add-part/1').status_code, 200)
+        self.assertEqual(self.client.put('/service-tickets/2/add-part/1').status_code, 400)
+        self.assertEqual(self._on_hand(), 9)
+
+    def test_add_to_cart_without_update_returning(self):
+        with self.app.app_context():
+            dialect = db.engine.dialect
+        dialect.update_returning = False
+        try:
+            response = self.client.put('/service-tickets/1/add-to-cart/1?quantity=3')
+            self.assertEqual([p['id'] for p in response.json['parts']], [1, 2, 3])
+            self.assertEqual(self.client.put('/service-tickets/2/add-part/1').status_code, 400)
+            self.assertEqual(self.client.put('/service-tickets/2/add-part/4').status_code, 200)
+        finally:
+            dialect.update_returning = True
+        self.assertEqual(self._on_hand(), 6)
+
+
+class TestInvoices(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('TestingConfig')
+        self.app.config['INVOICE_LABOR_RATE'] = 100.0
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            mechanics = [
+                Mechanic(name=f'mechanic {i}', email=f'mechanic{i}@test.com', salary=50000, password='x')
+                for i in range(2)
+            ]
+            customer = Customer(name='test', email='test_customer@testme.com', phone='123-456-7890')
+            pads = PartDescription(part_name='Brake Pads', brand='acme', price=45.5)
+            rotor = PartDescription(part_name='Brake Rotor', brand='acme', price=80.0)
+
+            first = ServiceTicket(service_date=date(2024, 1, 1), VIN='1HGCM82633A123456', service_desc='brakes',
+                                  mechanics=mechanics)
+            first.serialized_parts = [SerializedPart(description=pads), SerializedPart(description=pads),
+                                      SerializedPart(description=rotor)]
+            second = ServiceTicket(service_date=date(2024, 2, 1), VIN='1HGCM82633A123456', service_desc='check')
+            customer.tickets = [first, second]
+            db.session.add(customer)
+            db.session.commit()
+
+    def test_invoice(self):
+        response = self.client.get('/service-tickets/1/invoice')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['parts'], {'count': 3, 'total': 171.0})
+        self.assertEqual(response.json['labor'], {'mechanics': 2, 'rate': 100.0, 'total': 200.0})
+        self.assertEqual(response.json['total'], 371.0)
+
+        self.assertEqual(self.client.get('/service-tickets/99/invoice').status_code, 400)
+
+    def test_invoices_by_ids(self):
+        response = self.client.get('/service-tickets/invoices?ids=1,2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['total'] for item in response.json['invoices']], [371.0, 0])
+        self.assertEqual(response.json['total'], 371.0)
+
+    def test_invoices_by_date_range(self):
+        response = self.client.get('/service-tickets/invoices?start=2024-01-15&end=2024-02-28')
+        self.assertEqual([item['ticket_id'] for item in response.json['invoices']], [2])
+
+        self.assertEqual(self.client.get('/service-tickets/invoices?start=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/service-tickets/invoices').status_code, 400)
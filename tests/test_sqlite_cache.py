@@ -0,0 +1,73 @@
+import os
+import stat
+import tempfile
+import time
+import unittest
+from flask import Flask
+from app.util.sqlite_cache import SQLiteCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+        self.cache = SQLiteCache(self.path, threshold=3, max_bytes=0)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_set_get_shared_between_workers(self):
+        self.cache.set('customer', {'id': 1})
+        other_worker = SQLiteCache(self.path, threshold=3, max_bytes=0)
+
+        self.assertEqual(other_worker.get('customer'), {'id': 1})
+        self.assertIsNone(other_worker.get('missing'))
+        self.assertEqual(other_worker.stats()['hit_ratio'], 0.5)
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set('short', 'value', timeout=1)
+        self.cache.set('forever', 'value', timeout=0)
+        self.cache._connect().execute('UPDATE cache SET expires = ? WHERE key = ?', (time.time() - 1, 'short'))
+
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_least_recently_used_evicted_at_threshold(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.cache._connect().execute("UPDATE cache SET accessed = 0 WHERE key = 'b'")
+
+        self.cache.set('d', 'd')
+        self.assertFalse(self.cache.has('b'))
+        self.assertEqual(self.cache.stats()['entries'], 3)
+
+    def test_byte_cap_and_overwrite_accounting(self):
+        capped = SQLiteCache(self.path, threshold=0, max_bytes=1000)
+        capped.set('big', 'x' * 400)
+        capped.set('big', 'x' * 100)
+        self.assertLess(capped.stats()['bytes'], 200)
+
+        for i in range(10):
+            capped.set(f'key {i}', 'x' * 300)
+        self.assertLessEqual(capped.stats()['bytes'], 1000)
+
+    def test_file_private_to_owner(self):
+        os.chmod(self.path, 0o644)
+        SQLiteCache(self.path)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        # by default in the instance folder, not a shared temp directory
+        instance = tempfile.mkdtemp()
+        app = Flask(__name__, instance_path=instance)
+        app.config.update(CACHE_TYPE='app.util.sqlite_cache.SQLiteCache', CACHE_THRESHOLD=500)
+        try:
+            backend = SQLiteCache.factory(app, app.config, (), {})
+            self.assertEqual(backend.path, os.path.join(instance, 'cache.sqlite'))
+            self.assertEqual(stat.S_IMODE(os.stat(backend.path).st_mode), 0o600)
+        finally:
+            for name in os.listdir(instance):
+                os.remove(os.path.join(instance, name))
+            os.rmdir(instance)
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import stat
+import tempfile
+import time
+import unittest
+from unittest import mock
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+from app.util.sqlite_limiter import SQLiteLimiterStorage
+
+
+def hit_until_refused(path, limit, hits, results):
+    # one worker process, with its own storage instance on the shared file
+    limiter = SlidingWindowCounterRateLimiter(SQLiteLimiterStorage(f'sqlite:///{path}'))
+    results.put(sum(limiter.hit(parse(limit), 'client') for _ in range(hits)))
+
+
+class TestSQLiteLimiterStorage(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+        self.storage = storage_from_string(f'sqlite:///{self.path}')
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_registered_for_sqlite_uris(self):
+        self.assertIsInstance(self.storage, SQLiteLimiterStorage)
+        self.assertEqual(self.storage.path, self.path)
+        self.assertTrue(self.storage.check())
+
+    def test_file_private_to_owner(self):
+        os.chmod(self.path, 0o644)
+        SQLiteLimiterStorage(f'sqlite:///{self.path}')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        # never a default file somewhere shared
+        with self.assertRaises(ValueError):
+            SQLiteLimiterStorage('sqlite://')
+
+    def test_fixed_window_shared_between_workers(self):
+        limit = parse('3/minute')
+        self.assertTrue(all(FixedWindowRateLimiter(self.storage).hit(limit, 'client') for _ in range(2)))
+
+        other_worker = FixedWindowRateLimiter(SQLiteLimiterStorage(f'sqlite:///{self.path}'))
+        self.assertTrue(other_worker.hit(limit, 'client'))
+        self.assertFalse(other_worker.hit(limit, 'client'))
+        self.assertTrue(other_worker.hit(limit, 'another client'))
+
+    def test_expired_counter_starts_over(self):
+        self.assertEqual(self.storage.incr('key', 60), 1)
+        self.assertEqual(self.storage.incr('key', 60), 2)
+        self.storage._connect().execute('UPDATE counters SET expires = ?', (time.time() - 1,))
+
+        self.assertEqual(self.storage.get('key'), 0)
+        self.assertEqual(self.storage.incr('key', 60), 1)
+        self.assertGreater(self.storage.get_expiry('key'), time.time() + 50)
+
+    def test_sliding_window_weights_previous_window(self):
+        limiter = SlidingWindowCounterRateLimiter(self.storage)
+        limit = parse('4/minute')
+        # a second into a window, so the previous one still weighs 59/60
+        now = time.time() // 60 * 60 + 1
+        with mock.patch('time.time', return_value=now):
+            self.assertEqual(sum(limiter.hit(limit, 'client') for _ in range(6)), 4)
+
+            # the same hits, made a full window ago, still mostly count against the limit
+            previous_key, current_key = self.storage.sliding_window_keys(limit.key_for('client'), 60, now)
+            self.storage._connect().execute('UPDATE counters SET key = ? WHERE key = ?', (previous_key, current_key))
+            stats = limiter.get_window_stats(limit, 'client')
+        self.assertEqual(stats.remaining, 1)
+
+    def test_compaction_drops_expired_counters(self):
+        self.storage.incr('old', 60)
+        self.storage._connect().execute('UPDATE counters SET expires = ?', (time.time() - 1,))
+        self.storage._next_compaction = 0
+
+        self.storage.incr('new', 60)
+        keys = [row[0] for row in self.storage._connect().execute('SELECT key FROM counters')]
+        self.assertEqual(keys, ['new'])
+
+    def test_limit_holds_across_processes(self):
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=hit_until_refused, args=(self.path, '25/hour', 20, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sum(results.get() for _ in workers), 25)
+
+    def test_flask_limiter_with_sqlite_storage(self):
+        app = Flask(__name__)
+        app.config.update(RATELIMIT_STORAGE_URI=f'sqlite:///{self.path}', RATELIMIT_STRATEGY='sliding-window-counter')
+        limiter = Limiter(get_remote_address, app=app)
+
+        @app.route('/')
+        @limiter.limit('2/hour')
+        def index():
+            return 'ok'
+
+        client = app.test_client()
+        self.assertEqual([client.get('/').status_code for _ in range(3)], [200, 200, 429])